@@ -4,33 +4,155 @@ from dotenv import load_dotenv
 import cloudinary
 
 from db import init_db
+from services.db_tuning import engine_options, sqlalchemy_url
+from services.images import srcset
+from services.metrics import init_metrics, metrics_response
+from services.query_budget import init_query_budget
+from services.replicas import REPLICA, init_replicas
+from services.response_cache import init_response_cache
 
 load_dotenv()
 
 
-def create_app():
+def create_app(maintenance=False):
+    """
+    Build the app. Command-line maintenance jobs (migrations, index
+    rebuilds, reconciles) pass maintenance=True, which lifts the
+    statement timeout meant for web requests.
+    """
     app = Flask(__name__)
 
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret")
     app.config["MAX_CONTENT_LENGTH"] = int(
         os.getenv("MAX_CONTENT_LENGTH", 10 * 1024 * 1024)
     )
+    app.config["DOGS_PAGE_SIZE"] = int(os.getenv("DOGS_PAGE_SIZE", 25))
+    app.config["CHAT_PAGE_SIZE"] = int(os.getenv("CHAT_PAGE_SIZE", 50))
+
+    # Photos and documents shown on a dog's page, newest first.
+    app.config["DOG_DETAIL_ITEMS"] = int(os.getenv("DOG_DETAIL_ITEMS", 100))
+
+    # Seconds a worker answers breed lookups from memory before checking
+    # whether the breed dictionary changed.
+    app.config["BREED_INDEX_TTL"] = float(os.getenv("BREED_INDEX_TTL", 5))
+
+    # Uploaded images wait here until the worker sends them to Cloudinary.
+    # The web and worker processes must share this folder.
+    app.config["SPOOL_FOLDER"] = os.getenv(
+        "SPOOL_FOLDER",
+        os.path.join(app.instance_path, "spool")
+    )
+
+    # Chunked document uploads: partial files, chunk size and total limit.
+    # Each chunk must fit in MAX_CONTENT_LENGTH.
+    app.config["CHUNK_UPLOAD_FOLDER"] = os.getenv(
+        "CHUNK_UPLOAD_FOLDER",
+        os.path.join(app.instance_path, "partial_uploads")
+    )
+    app.config["UPLOAD_CHUNK_SIZE"] = int(os.getenv("UPLOAD_CHUNK_SIZE", 4 * 1024 * 1024))
+    app.config["DOCUMENT_MAX_SIZE"] = int(
+        os.getenv("DOCUMENT_MAX_SIZE", 500 * 1024 * 1024)
+    )
+
+    # Chunked uploads idle this long are deleted by the worker.
+    app.config["UPLOAD_SESSION_TTL_HOURS"] = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+
+    # Document storage. Files live outside /static and are only reachable
+    # through the download route. DOCUMENT_SENDFILE ("x-accel-redirect"
+    # or "x-sendfile") hands the transfer to the front proxy; with nginx,
+    # DOCUMENT_ACCEL_PREFIX must be an `internal` location aliased to
+    # UPLOAD_FOLDER.
+    app.config["UPLOAD_FOLDER"] = os.getenv(
+        "UPLOAD_FOLDER",
+        os.path.join(app.instance_path, "documents")
+    )
+    app.config["DOCUMENT_SENDFILE"] = os.getenv("DOCUMENT_SENDFILE", "").strip().lower()
+    app.config["DOCUMENT_ACCEL_PREFIX"] = os.getenv(
+        "DOCUMENT_ACCEL_PREFIX",
+        "/protected-documents/"
+    )
+    app.config["DOCUMENT_CACHE_SECONDS"] = int(os.getenv("DOCUMENT_CACHE_SECONDS", 3600))
+
+    # Response cache for the dog list: "memory" (per worker), "sqlite"
+    # (one file shared by all workers on the host) or "none".
+    app.config["RESPONSE_CACHE"] = os.getenv("RESPONSE_CACHE", "memory").strip().lower()
+    app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", 256))
+    app.config["RESPONSE_CACHE_PATH"] = os.getenv(
+        "RESPONSE_CACHE_PATH",
+        os.path.join(app.instance_path, "response_cache.sqlite3")
+    )
+
+    # Per-route SQL statement budgets: "raise", "warn" or "off". Defaults
+    # to "raise" in debug/test mode and "off" in production.
+    app.config["QUERY_BUDGET"] = os.getenv("QUERY_BUDGET", "").strip().lower()
+
+    # Slow-query log: statements slower than SLOW_QUERY_MS (off when 0 or
+    # unset) are logged as JSON with their plan, unless SLOW_QUERY_EXPLAIN
+    # is "0".
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", 0) or 0)
+    app.config["SLOW_QUERY_EXPLAIN"] = os.getenv("SLOW_QUERY_EXPLAIN", "1").strip() != "0"
+
+    # Bearer token required to scrape /metrics (open if unset).
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN", "").strip()
+
+    # Live chat: streams/long-polls per worker, and how long each may run.
+    # gunicorn.conf.py gives each worker this many threads on top of
+    # WEB_THREADS, so the two must match.
+    app.config["LIVE_MAX_WAITERS"] = int(os.getenv("LIVE_MAX_WAITERS", 16))
+    app.config["LIVE_POLL_INTERVAL"] = int(os.getenv("LIVE_POLL_INTERVAL", 2))
+    app.config["LIVE_STREAM_SECONDS"] = int(os.getenv("LIVE_STREAM_SECONDS", 30))
+    app.config["LONG_POLL_SECONDS"] = int(os.getenv("LONG_POLL_SECONDS", 20))
+
+    # Connection pool, per worker process. The default pool holds one
+    # connection per request thread (WEB_THREADS, see gunicorn.conf.py);
+    # live chat waiters only borrow one for each check.
+    app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE", os.getenv("WEB_THREADS", 4)))
+    app.config["DB_MAX_OVERFLOW"] = int(os.getenv("DB_MAX_OVERFLOW", 2))
+    app.config["DB_POOL_TIMEOUT"] = int(os.getenv("DB_POOL_TIMEOUT", 10))
+    app.config["DB_POOL_RECYCLE"] = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    app.config["DB_POOL_PRE_PING"] = os.getenv("DB_POOL_PRE_PING", "1").strip() != "0"
+
+    # Postgres cancels statements that run longer than this (0 disables),
+    # so a runaway query can't hold a worker thread past gunicorn's timeout.
+    # Maintenance jobs run without it: a cancelled CREATE INDEX CONCURRENTLY
+    # leaves an invalid index behind.
+    app.config["DB_STATEMENT_TIMEOUT_MS"] = (
+        0 if maintenance else int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))
+    )
+
+    # SQLite connection pragmas (WAL is always on for file databases).
+    app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config["SQLITE_CACHE_KB"] = int(os.getenv("SQLITE_CACHE_KB", 20000))
+    app.config["SQLITE_MMAP_BYTES"] = int(os.getenv("SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
 
     database_url = os.getenv("DATABASE_URL", "").strip()
 
     if database_url:
-        if database_url.startswith("postgres://"):
-            database_url = database_url.replace("postgres://", "postgresql+psycopg://", 1)
-        elif database_url.startswith("postgresql://"):
-            database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
-
-        app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+        app.config["SQLALCHEMY_DATABASE_URI"] = sqlalchemy_url(database_url)
     else:
         app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///dogs.db"
 
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+    # Optional read replica. GET requests read from it; writes, and the
+    # next REPLICA_STICKY_SECONDS of the writing user's reads, use the
+    # primary. For local testing, point it at a copy of a SQLite file
+    # (see sync_replica.py).
+    replica_url = os.getenv("DATABASE_REPLICA_URL", "").strip()
+    app.config["REPLICA_STICKY_SECONDS"] = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+
+    if replica_url:
+        replica_url = sqlalchemy_url(replica_url)
+        app.config["SQLALCHEMY_BINDS"] = {
+            REPLICA: {"url": replica_url, **engine_options(app.config, replica_url)}
+        }
 
     init_db(app)
+    init_replicas(app)
+    init_response_cache(app)
+    init_metrics(app)
+    init_query_budget(app)
 
     if os.getenv("CLOUDINARY_URL"):
         cloudinary.config(cloudinary_url=os.getenv("CLOUDINARY_URL"))
@@ -42,20 +164,28 @@ def create_app():
             secure=True,
         )
 
+    from routes.api import api_bp
     from routes.auth import auth_bp
     from routes.chat import chat_bp
     from routes.documents import documents_bp
     from routes.dogs import dogs_bp
 
+    app.register_blueprint(api_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(documents_bp)
     app.register_blueprint(dogs_bp)
 
+    app.add_template_filter(srcset)
+
     @app.route("/health")
     def health():
         return "ok", 200
 
+    @app.route("/metrics")
+    def metrics():
+        return metrics_response()
+
     return app
 
 
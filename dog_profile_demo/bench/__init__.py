@@ -0,0 +1,6 @@
+"""
+Benchmark tooling: a synthetic data generator (bench.generate), a load
+driver that reports per-route latency (bench.run), and a comparison of
+the dog detail loaders (bench.detail). Run them from the app folder,
+e.g. `python -m bench.generate --scale 0.1`.
+"""
@@ -0,0 +1,134 @@
+"""
+Compare the dog detail loaders: the one-statement load_dog_detail with
+the previous four queries (dog, documents, messages, photos).
+
+    DATABASE_URL=postgresql://user:pw@db-host/dogs python -m bench.detail
+    python -m bench.detail --latency-ms 1        # SQLite, simulated hop
+
+The difference is mostly network round trips, so run it against a
+Postgres server on another host. Without one, --latency-ms adds a sleep
+before every statement to stand in for the round trip.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import create_app
+from bench.run import git_commit, summarize
+from models import db, Dog, DogMessage, DogPhoto, Document
+from services.dog_detail import DEFAULT_DETAIL_ITEMS, load_dog_detail
+from services.messages import DEFAULT_MESSAGE_PAGE_SIZE, recent_messages
+
+
+def load_four_queries(dog_id, item_limit, message_limit):
+    """
+    The detail view's loading before load_dog_detail, with the same limits.
+    """
+    dog = db.session.get(Dog, dog_id)
+
+    documents = Document.query.filter_by(dog_id=dog_id).order_by(
+        Document.uploaded_at.desc(), Document.id.desc()
+    ).limit(item_limit + 1).all()
+
+    messages = recent_messages(dog_id, message_limit)
+
+    photos = DogPhoto.query.filter_by(dog_id=dog_id).order_by(
+        DogPhoto.uploaded_at.desc(), DogPhoto.id.desc()
+    ).limit(item_limit + 1).all()
+
+    return dog, documents, messages, photos
+
+
+LOADERS = {
+    "four_queries": load_four_queries,
+    "one_statement": load_dog_detail,
+}
+
+
+def busiest_dog_ids(count):
+    """
+    The dogs with the longest chat threads, where the page is heaviest.
+    """
+    rows = db.session.query(DogMessage.dog_id).group_by(DogMessage.dog_id).order_by(
+        db.func.count(DogMessage.id).desc()
+    ).limit(count).all()
+    return [row.dog_id for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dog detail loaders.")
+    parser.add_argument("-n", "--iterations", type=int, default=500,
+                        help="Page loads per loader.")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="Sleep this long before each statement (simulated round trip).")
+    parser.add_argument("--items", type=int, default=DEFAULT_DETAIL_ITEMS)
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGE_PAGE_SIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args()
+
+    app = create_app()
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        all_ids = db.session.scalars(db.select(Dog.id)).all()
+        if not all_ids:
+            raise SystemExit("No dogs in the database. Run `python -m bench.generate` first.")
+
+        dog_ids = {"busiest": busiest_dog_ids(20) or all_ids, "random": all_ids}
+
+        if args.latency_ms:
+            delay = args.latency_ms / 1000.0
+
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def simulate_round_trip(conn, cursor, statement, parameters, context, executemany):
+                time.sleep(delay)
+
+        samples = {}
+        started = time.perf_counter()
+
+        for name, loader in LOADERS.items():
+            for dog_group, ids in dog_ids.items():
+                for i in range(args.warmup + args.iterations):
+                    dog_id = rng.choice(ids)
+
+                    # A fresh session per load, as each request gets.
+                    db.session.remove()
+                    load_started = time.perf_counter()
+                    loader(dog_id, args.items, args.messages)
+                    seconds = time.perf_counter() - load_started
+
+                    if i >= args.warmup:
+                        samples.setdefault(f"{name}:{dog_group}", []).append((seconds, True))
+
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "commit": git_commit(),
+            "database": (os.getenv("DATABASE_URL") or "sqlite").split(":", 1)[0],
+            "simulated_latency_ms": args.latency_ms,
+            "items": args.items,
+            "messages": args.messages,
+            "dogs": len(all_ids)
+        },
+        "loaders": summarize(samples, elapsed)
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Fill the configured database (DATABASE_URL) with synthetic shelter data.
+
+    python -m bench.generate                 # 50k dogs, 2M messages, ...
+    python -m bench.generate --scale 0.05    # 5% of that, for a laptop
+
+Rows go in with batched executemany inserts, one transaction per batch.
+A fixed --seed makes runs repeatable so results compare across commits.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models import db, Dog, DogMessage, DogPhoto, Document, User
+from services.breeds import link_dog_breeds
+from services.dog_stats import reconcile_dog_stats
+from services.migrations import run_migrations
+from services.response_cache import invalidate_responses
+from services.versions import DOGS_VERSION, bump_version
+
+
+DEFAULT_COUNTS = {
+    "dogs": 50_000,
+    "messages": 2_000_000,
+    "documents": 200_000,
+    "photos": 200_000,
+}
+
+BATCH_SIZE = 5_000
+
+# Login used by bench.run.
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench"
+
+BREEDS = (
+    "Labrador Retriever", "German Shepherd", "Golden Retriever", "Beagle",
+    "Pit Bull Terrier", "Chihuahua", "Boxer", "Dachshund", "Husky",
+    "Border Collie", "Poodle", "Shih Tzu", "Australian Shepherd", "Mixed"
+)
+NAMES = (
+    "Bella", "Max", "Luna", "Charlie", "Daisy", "Rocky", "Molly", "Buddy",
+    "Sadie", "Duke", "Maggie", "Bear", "Lucy", "Tucker", "Rosie", "Zeus"
+)
+STATUSES = ("Available", "Available", "Available", "Intake", "Fostered", "Hold", "Adopted")
+SIZES = ("Small", "Medium", "Large")
+GENDERS = ("Male", "Female")
+FRIENDLINESS = ("Good with dogs", "Good with kids", "Cat friendly", "Shy", "Needs experience")
+DOCUMENT_TYPES = ("Vet Record", "Intake Form", "Vaccination", "Adoption Contract")
+WORDS = (
+    "walked", "fed", "vet", "visit", "today", "great", "with", "kids", "needs",
+    "meds", "playful", "crate", "trained", "foster", "update", "adopter", "meet"
+)
+
+SPAN = timedelta(days=3 * 365)
+
+
+def batched_insert(table, rows):
+    """
+    Insert rows from a generator in executemany batches. Returns the count.
+    """
+    total = 0
+    batch = []
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+
+    return total
+
+
+def random_time(rng, start, end):
+    return start + timedelta(seconds=rng.random() * (end - start).total_seconds())
+
+
+def skewed_dog_id(rng, dog_ids):
+    """
+    Pick a dog so activity is uneven: half the rows go to a few popular
+    dogs (Pareto), the rest are spread evenly.
+    """
+    if rng.random() < 0.5:
+        index = min(int(rng.paretovariate(1.2)) - 1, len(dog_ids) - 1)
+    else:
+        index = rng.randrange(len(dog_ids))
+    return dog_ids[index]
+
+
+def generate(counts, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    start = now - SPAN
+
+    if not User.query.filter_by(username=BENCH_USERNAME).first():
+        db.session.add(User(
+            username=BENCH_USERNAME,
+            password_hash=generate_password_hash(BENCH_PASSWORD),
+            role="admin"
+        ))
+        db.session.commit()
+
+    previous_max_id = db.session.query(db.func.max(Dog.id)).scalar() or 0
+
+    dogs = batched_insert(Dog.__table__, (
+        {
+            "name": f"{rng.choice(NAMES)} {n}",
+            "breed": rng.choice(BREEDS),
+            "age": f"{rng.randint(1, 14)} years",
+            "gender": rng.choice(GENDERS),
+            "size": rng.choice(SIZES),
+            "friendliness": rng.choice(FRIENDLINESS),
+            "status": rng.choice(STATUSES),
+            "immediate_foster": rng.random() < 0.05,
+            "image_url": f"https://res.cloudinary.example/bench/dog-{n}.jpg",
+            "created_at": random_time(rng, start, now)
+        }
+        for n in range(counts["dogs"])
+    ))
+    print(f"Inserted {dogs} dogs.")
+
+    if not dogs:
+        return
+
+    dog_ids = [
+        row[0] for row in
+        db.session.query(Dog.id).filter(Dog.id > previous_max_id).order_by(Dog.id)
+    ]
+
+    messages = batched_insert(DogMessage.__table__, (
+        {
+            "dog_id": skewed_dog_id(rng, dog_ids),
+            "sender_name": rng.choice(NAMES),
+            "sender_role": rng.choice(("staff", "foster", "coordinator")),
+            "message": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25))),
+            "created_at": random_time(rng, start, now)
+        }
+        for _ in range(counts["messages"])
+    ))
+    print(f"Inserted {messages} messages.")
+
+    documents = batched_insert(Document.__table__, (
+        {
+            "dog_id": skewed_dog_id(rng, dog_ids),
+            "filename": f"record-{n}.pdf",
+            "file_url": f"/static/uploads/documents/bench-{n}.pdf",
+            "document_type": rng.choice(DOCUMENT_TYPES),
+            "uploaded_by_name": rng.choice(NAMES),
+            "uploaded_at": random_time(rng, start, now)
+        }
+        for n in range(counts["documents"])
+    ))
+    print(f"Inserted {documents} documents.")
+
+    photos = batched_insert(DogPhoto.__table__, (
+        {
+            "dog_id": skewed_dog_id(rng, dog_ids),
+            "image_url": f"https://res.cloudinary.example/bench/photo-{n}.jpg",
+            "image_variants": json.dumps({
+                fmt: {
+                    str(width): f"https://res.cloudinary.example/bench/photo-{n}-{width}.{ext}"
+                    for width in (160, 320, 640)
+                }
+                for fmt, ext in (("jpeg", "jpg"), ("webp", "webp"))
+            }),
+            "uploaded_at": random_time(rng, start, now)
+        }
+        for n in range(counts["photos"])
+    ))
+    print(f"Inserted {photos} photos.")
+
+    bump_version(DOGS_VERSION)
+    invalidate_responses()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic shelter data.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every default count by this.")
+    parser.add_argument("--seed", type=int, default=42)
+
+    for name, count in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{name}", type=int, default=None,
+                            help=f"Rows to insert (default {count} x scale).")
+
+    args = parser.parse_args()
+    counts = {
+        name: getattr(args, name) if getattr(args, name) is not None else int(count * args.scale)
+        for name, count in DEFAULT_COUNTS.items()
+    }
+
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        run_migrations(log=lambda message: None)
+
+        started = time.perf_counter()
+        generate(counts, args.seed)
+
+        # Rows went in without the ORM, so build the per-dog summaries
+        # and link the dogs to the breed dictionary.
+        with db.engine.begin() as conn:
+            reconcile_dog_stats(conn)
+            link_dog_breeds(conn)
+
+        # Fresh planner statistics, so benchmarks see realistic plans.
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            conn.commit()
+
+        print(f"Done in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Drive the app with a fixed request mix and report latency per route.
+
+    python -m bench.run                          # in-process test client
+    python -m bench.run --mode gunicorn -c 8     # real gunicorn, 8 clients
+
+Uses the database in DATABASE_URL (fill it with bench.generate first).
+The response cache is off unless --response-cache turns it on, so the
+list and detail timings measure their queries, not cache hits.
+Results are printed, and written as JSON with --output so runs can be
+compared across commits.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from bench.generate import BENCH_PASSWORD, BENCH_USERNAME
+
+
+# (name, method, path template, weight). {dog_id} is filled per request.
+ROUTES = (
+    ("dog_list", "GET", "/", 30),
+    ("dog_list_filtered", "GET", "/?status=Available", 10),
+    ("dog_list_search", "GET", "/?q=lab", 10),
+    ("dog_detail", "GET", "/dog/{dog_id}", 35),
+    ("add_message", "POST", "/dog/{dog_id}/messages/add", 15),
+)
+
+
+# -------------------------
+# Statistics
+# -------------------------
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """
+    Turn {route: [(seconds, ok), ...]} into per-route stats in ms.
+    """
+    routes = {}
+
+    for name, results in sorted(samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, ok in results)
+        routes[name] = {
+            "requests": len(results),
+            "errors": sum(1 for _, ok in results if not ok),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None
+        }
+
+    return routes
+
+
+# -------------------------
+# Clients
+# -------------------------
+class TestClientDriver:
+    """
+    Calls the app in-process through Flask's test client. No network or
+    server overhead, so it isolates the app's own cost.
+    """
+
+    def __init__(self):
+        from bench.stub_app import app
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+        client.post("/login", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+
+        def send(method, path, data=None):
+            response = client.open(path, method=method, data=data)
+            return response.status_code < 400
+
+        return send
+
+    def dog_ids(self):
+        from models import db, Dog
+        with self.app.app_context():
+            return [row[0] for row in db.session.query(Dog.id)]
+
+    def close(self):
+        pass
+
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    Hand redirects back as the response, as the test client does, so a
+    POST that redirects is timed as one request rather than two.
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class GunicornDriver:
+    """
+    Starts gunicorn with the stubbed app on a free local port and sends
+    real HTTP requests, so the numbers include the server and threads.
+    """
+
+    def __init__(self, workers, threads):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "bench.stub_app:app",
+                "--workers", str(workers),
+                "--threads", str(threads),
+                "--worker-class", "gthread",
+                "--bind", f"127.0.0.1:{port}",
+                "--log-level", "warning"
+            ],
+            cwd=os.getcwd()
+        )
+        self.wait_until_ready()
+
+    def wait_until_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("gunicorn exited before it was ready.")
+
+            try:
+                urllib.request.urlopen(self.base_url + "/health", timeout=1)
+                return
+            except OSError:
+                time.sleep(0.2)
+
+        self.close()
+        raise RuntimeError("gunicorn did not start in time.")
+
+    def session(self):
+        opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            NoRedirectHandler()
+        )
+
+        # Logging in answers with a redirect, which urllib raises as an
+        # HTTPError once it isn't followed; the cookie is already set.
+        try:
+            opener.open(
+                self.base_url + "/login",
+                urllib.parse.urlencode(
+                    {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+                ).encode()
+            ).read()
+        except urllib.error.HTTPError as e:
+            e.read()
+            if e.code >= 400:
+                raise
+
+        def send(method, path, data=None):
+            body = urllib.parse.urlencode(data).encode() if data is not None else None
+            request = urllib.request.Request(self.base_url + path, data=body, method=method)
+
+            try:
+                with opener.open(request, timeout=30) as response:
+                    response.read()
+                    return response.status < 400
+            except urllib.error.HTTPError as e:
+                e.read()
+                return e.code < 400
+            except OSError:
+                return False
+
+        return send
+
+    def dog_ids(self):
+        from models import db, Dog
+        from app import create_app
+        with create_app().app_context():
+            return [row[0] for row in db.session.query(Dog.id)]
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+# -------------------------
+# Load loop
+# -------------------------
+def run_client(driver, dog_ids, requests_per_client, seed, samples, lock):
+    rng = random.Random(seed)
+    send = driver.session()
+    weights = [route[3] for route in ROUTES]
+    local = {}
+
+    for _ in range(requests_per_client):
+        name, method, template, _ = rng.choices(ROUTES, weights)[0]
+        path = template.format(dog_id=rng.choice(dog_ids))
+        data = {"message": "benchmark message", "sender_name": "bench"} if method == "POST" else None
+
+        started = time.perf_counter()
+        ok = send(method, path, data)
+        local.setdefault(name, []).append((time.perf_counter() - started, ok))
+
+    with lock:
+        for name, results in local.items():
+            samples.setdefault(name, []).extend(results)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the main routes.")
+    parser.add_argument("--mode", choices=("client", "gunicorn"), default="client")
+    parser.add_argument("-n", "--requests", type=int, default=2000,
+                        help="Total requests across all clients.")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=50,
+                        help="Requests per client sent before timing starts.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--response-cache", choices=("none", "memory", "sqlite"), default="none",
+                        help="RESPONSE_CACHE backend for the app under test.")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args()
+
+    # Read by create_app, in this process or the gunicorn workers.
+    os.environ["RESPONSE_CACHE"] = args.response_cache
+
+    if args.mode == "gunicorn":
+        driver = GunicornDriver(args.workers, args.threads)
+    else:
+        driver = TestClientDriver()
+
+    try:
+        dog_ids = driver.dog_ids()
+        if not dog_ids:
+            raise SystemExit("No dogs in the database. Run `python -m bench.generate` first.")
+
+        per_client = max(1, args.requests // args.concurrency)
+        lock = threading.Lock()
+
+        if args.warmup:
+            run_client(driver, dog_ids, args.warmup, args.seed, {}, lock)
+
+        samples = {}
+        threads = [
+            threading.Thread(
+                target=run_client,
+                args=(driver, dog_ids, per_client, args.seed + i, samples, lock)
+            )
+            for i in range(args.concurrency)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        driver.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "commit": git_commit(),
+            "mode": args.mode,
+            "database": (os.getenv("DATABASE_URL") or "sqlite").split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.mode == "gunicorn" else None,
+            "threads": args.threads if args.mode == "gunicorn" else None,
+            "response_cache": args.response_cache,
+            "dogs": len(dog_ids),
+            "elapsed_s": round(elapsed, 3),
+            "total_rps": round(sum(len(v) for v in samples.values()) / elapsed, 2)
+        },
+        "routes": summarize(samples, elapsed)
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
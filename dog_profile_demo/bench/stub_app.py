@@ -0,0 +1,26 @@
+"""
+The app with Cloudinary stubbed out, for benchmark runs:
+
+    gunicorn bench.stub_app:app
+
+Uploads return a fake URL immediately, so timings measure this app
+rather than the network.
+"""
+import cloudinary.uploader
+
+from app import create_app
+
+
+def fake_upload(file, **options):
+    name = getattr(file, "filename", None) or str(file)
+    return {"secure_url": f"https://res.cloudinary.example/bench/{abs(hash(name))}.jpg"}
+
+
+def fake_uploader(file_path):
+    return fake_upload(file_path)["secure_url"]
+
+
+cloudinary.uploader.upload = fake_upload
+
+app = create_app()
+app.config["IMAGE_UPLOADER"] = fake_uploader
@@ -1,9 +1,13 @@
 from models import db
+from services.db_tuning import init_db_tuning
+from services.slow_queries import init_slow_query_log
 
 
 def init_db(app):
     db.init_app(app)
 
+    with app.app_context():
+        for engine in db.engines.values():
+            init_db_tuning(app, engine)
 
-
-
+        init_slow_query_log(app, db.engines.values())
@@ -0,0 +1,16 @@
+import sys
+
+from app import create_app
+from services.bulk_dogs import export_dogs
+
+
+def export_file(fmt="csv"):
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        for chunk in export_dogs(fmt):
+            sys.stdout.write(chunk)
+
+
+if __name__ == "__main__":
+    export_file(sys.argv[1] if len(sys.argv) > 1 else "csv")
@@ -0,0 +1,35 @@
+import os
+import shutil
+
+
+# Shared folder for per-worker metric files, so /metrics reports totals
+# for all workers. Set before the workers start and import the app, and
+# before anything here imports prometheus_client: it picks in-process or
+# file-backed values once, on first import, and the workers fork from
+# this process.
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "metrics")
+)
+
+
+# Threads per worker: WEB_THREADS for page and API requests, plus one
+# per live chat stream or long-poll the worker allows (LIVE_MAX_WAITERS,
+# as in app.py). Idle live clients park on their own threads and never
+# take one a page request needs.
+threads = int(os.getenv("WEB_THREADS", 4)) + int(os.getenv("LIVE_MAX_WAITERS", 16))
+
+
+def on_starting(server):
+    """
+    Start each server run with an empty metrics folder, so samples from
+    a previous run's processes don't linger.
+    """
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
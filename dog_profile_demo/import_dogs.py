@@ -0,0 +1,25 @@
+import sys
+
+from app import create_app
+from services.bulk_dogs import format_from_filename, import_dogs
+
+
+def import_file(path, fmt=None):
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        with open(path, "rb") as f:
+            result = import_dogs(f, fmt or format_from_filename(path))
+
+        print(f"Imported {result.inserted} dog(s), skipped {result.failed}.")
+
+        for error in result.errors:
+            print(f"  line {error['line']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python import_dogs.py <file.csv|file.jsonl> [csv|jsonl]")
+        sys.exit(1)
+
+    import_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
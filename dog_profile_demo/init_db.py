@@ -1,12 +1,12 @@
 from app import create_app
-from models import db
+from services.migrations import run_migrations
 
 
 def init_database():
-    app = create_app()
+    app = create_app(maintenance=True)
 
     with app.app_context():
-        db.create_all()
+        run_migrations()
         print("Database initialized successfully.")
 
 
@@ -1,6 +1,6 @@
 import os
 from app import create_app
-from models import db
+from services.migrations import run_migrations
 
 
 def init_postgres_database():
@@ -9,10 +9,10 @@ def init_postgres_database():
     if not database_url:
         raise RuntimeError("DATABASE_URL is not set.")
 
-    app = create_app()
+    app = create_app(maintenance=True)
 
     with app.app_context():
-        db.create_all()
+        run_migrations()
         print("PostgreSQL database initialized successfully.")
 
 
@@ -0,0 +1,25 @@
+import sys
+
+from app import create_app
+from services.migrations import pending_migrations, run_migrations
+
+
+def migrate(dry_run=False):
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        if dry_run:
+            for m in pending_migrations():
+                print(f"Pending migration {m.version}: {m.description}")
+            return
+
+        applied = run_migrations()
+
+        if applied:
+            print(f"Applied {len(applied)} migration(s).")
+        else:
+            print("Database is up to date.")
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
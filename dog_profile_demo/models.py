@@ -1,7 +1,9 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from services.replicas import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 # =========================
@@ -57,6 +59,15 @@ class User(db.Model):
 class Dog(db.Model):
     __tablename__ = "dogs"
 
+    # Back keyset pagination of the dog list, alone and under the
+    # status filter or the foster view. Keep in sync with migrations.
+    __table_args__ = (
+        db.Index("ix_dogs_created_at_id", "created_at", "id"),
+        db.Index("ix_dogs_status_created_at", "status", "created_at", "id"),
+        db.Index("ix_dogs_foster_created_at", "immediate_foster", "created_at", "id"),
+        db.Index("ix_dogs_breed_created_at", "breed_id", "created_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     name = db.Column(
@@ -64,7 +75,15 @@ class Dog(db.Model):
         nullable=False
     )
 
+    # The breed as entered; breed_id links it to the breed dictionary
+    # (services/breeds.py sets it whenever breed changes).
     breed = db.Column(db.String(100))
+
+    breed_id = db.Column(
+        db.Integer,
+        db.ForeignKey("breeds.id")
+    )
+
     age = db.Column(db.String(50))
     gender = db.Column(db.String(20))
     size = db.Column(db.String(50))
@@ -78,6 +97,9 @@ class Dog(db.Model):
 
     image_url = db.Column(db.String(500))
 
+    # JSON map of resized variant URLs, see services/images.py.
+    image_variants = db.Column(db.Text)
+
     immediate_foster = db.Column(
         db.Boolean,
         default=False,
@@ -90,6 +112,9 @@ class Dog(db.Model):
         nullable=False
     )
 
+    # Relevance score, only populated on full-text search queries.
+    search_rank = db.query_expression()
+
     documents = db.relationship(
         "Document",
         backref="dog",
@@ -111,16 +136,122 @@ class Dog(db.Model):
         cascade="all, delete-orphan"
     )
 
+    # Maintained by services/dog_stats.py, not through this relationship.
+    stats = db.relationship(
+        "DogStats",
+        uselist=False,
+        lazy=True,
+        viewonly=True
+    )
+
     def __repr__(self):
         return f"<Dog {self.name}>"
 
 
+# =========================
+# BREED DICTIONARY MODELS
+# =========================
+class Breed(db.Model):
+    """
+    A canonical breed. `key` is the normalized name (see
+    services/breeds.normalize_breed) and is what lookups match on.
+    """
+    __tablename__ = "breeds"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    name = db.Column(
+        db.String(100),
+        nullable=False,
+        unique=True
+    )
+
+    key = db.Column(
+        db.String(100),
+        nullable=False,
+        unique=True
+    )
+
+    aliases = db.relationship(
+        "BreedAlias",
+        backref="breed",
+        lazy=True,
+        cascade="all, delete-orphan"
+    )
+
+    def __repr__(self):
+        return f"<Breed {self.name}>"
+
+
+class BreedAlias(db.Model):
+    """
+    Another normalized spelling of a breed ("lab", "gsd", "husky").
+    """
+    __tablename__ = "breed_aliases"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    breed_id = db.Column(
+        db.Integer,
+        db.ForeignKey("breeds.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    key = db.Column(
+        db.String(100),
+        nullable=False,
+        unique=True
+    )
+
+    def __repr__(self):
+        return f"<BreedAlias {self.key}>"
+
+
+# =========================
+# DOG ACTIVITY SUMMARY MODEL
+# =========================
+class DogStats(db.Model):
+    """
+    Per-dog counts and latest activity for the dog list, updated in the
+    same transaction as the messages, documents and photos they count.
+    """
+    __tablename__ = "dog_stats"
+
+    # Backs the "recent activity" sort of the dog list.
+    __table_args__ = (
+        db.Index("ix_dog_stats_last_activity_at", "last_activity_at", "dog_id"),
+    )
+
+    dog_id = db.Column(
+        db.Integer,
+        db.ForeignKey("dogs.id"),
+        primary_key=True
+    )
+
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    photo_count = db.Column(db.Integer, nullable=False, default=0)
+
+    last_activity_at = db.Column(
+        db.DateTime,
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<DogStats for Dog {self.dog_id}>"
+
+
 # =========================
 # DOG PHOTO MODEL
 # =========================
 class DogPhoto(db.Model):
     __tablename__ = "dog_photos"
 
+    __table_args__ = (
+        db.Index("ix_dog_photos_dog_id_uploaded_at", "dog_id", "uploaded_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     dog_id = db.Column(
@@ -134,6 +265,9 @@ class DogPhoto(db.Model):
         nullable=False
     )
 
+    # JSON map of resized variant URLs, see services/images.py.
+    image_variants = db.Column(db.Text)
+
     caption = db.Column(db.String(255))
 
     uploaded_at = db.Column(
@@ -152,6 +286,10 @@ class DogPhoto(db.Model):
 class Document(db.Model):
     __tablename__ = "documents"
 
+    __table_args__ = (
+        db.Index("ix_documents_dog_id_uploaded_at", "dog_id", "uploaded_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     dog_id = db.Column(
@@ -170,6 +308,13 @@ class Document(db.Model):
         nullable=False
     )
 
+    # Shared content blob. Null for documents stored before deduplication.
+    blob_sha256 = db.Column(
+        db.String(64),
+        db.ForeignKey("document_blobs.sha256"),
+        index=True
+    )
+
     document_type = db.Column(db.String(100))
     notes = db.Column(db.Text)
 
@@ -197,6 +342,10 @@ class Document(db.Model):
 class DogMessage(db.Model):
     __tablename__ = "dog_messages"
 
+    __table_args__ = (
+        db.Index("ix_dog_messages_dog_id_created_at", "dog_id", "created_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     dog_id = db.Column(
@@ -227,3 +376,175 @@ class DogMessage(db.Model):
 
     def __repr__(self):
         return f"<Message {self.id} for Dog {self.dog_id}>"
+
+
+# =========================
+# CACHE VERSION MODEL
+# =========================
+class CacheVersion(db.Model):
+    """
+    A version stamp per cached data set. Writers bump it in the same
+    transaction as their change so every gunicorn worker can tell when
+    its in-process copy is stale.
+    """
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+
+    version = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
+
+
+# =========================
+# BACKGROUND JOB MODEL
+# =========================
+class Job(db.Model):
+    """
+    A unit of background work, run by `python worker.py`.
+    """
+    __tablename__ = "jobs"
+
+    __table_args__ = (
+        db.Index("ix_jobs_status_run_after", "status", "run_after", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    kind = db.Column(
+        db.String(100),
+        nullable=False
+    )
+
+    # JSON-encoded arguments for the job handler.
+    payload = db.Column(
+        db.Text,
+        nullable=False,
+        default="{}"
+    )
+
+    # queued -> running -> done, or back to queued for a retry,
+    # or failed once max_attempts is used up.
+    status = db.Column(
+        db.String(20),
+        nullable=False,
+        default="queued"
+    )
+
+    attempts = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+
+    max_attempts = db.Column(
+        db.Integer,
+        nullable=False,
+        default=5
+    )
+
+    run_after = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status}>"
+
+
+# =========================
+# CHUNKED UPLOAD SESSION MODEL
+# =========================
+class UploadSession(db.Model):
+    """
+    An in-progress chunked document upload. The bytes received so far
+    live in a partial file on disk; the Document row is only created
+    when the upload is completed.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)
+
+    dog_id = db.Column(
+        db.Integer,
+        db.ForeignKey("dogs.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    filename = db.Column(
+        db.String(255),
+        nullable=False
+    )
+
+    total_size = db.Column(
+        db.BigInteger,
+        nullable=False
+    )
+
+    document_type = db.Column(db.String(100))
+    notes = db.Column(db.Text)
+    uploaded_by = db.Column(db.Integer)
+    uploaded_by_name = db.Column(db.String(100))
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<UploadSession {self.id} for Dog {self.dog_id}>"
+
+
+# =========================
+# DOCUMENT BLOB MODEL
+# =========================
+class DocumentBlob(db.Model):
+    """
+    Stored document bytes, keyed by SHA-256. Documents with identical
+    content share one blob; the file is removed when ref_count hits zero.
+    """
+    __tablename__ = "document_blobs"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+
+    # Path relative to the document upload folder.
+    stored_filename = db.Column(
+        db.String(255),
+        nullable=False
+    )
+
+    size = db.Column(
+        db.BigInteger,
+        nullable=False
+    )
+
+    ref_count = db.Column(
+        db.Integer,
+        nullable=False,
+        default=0
+    )
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<DocumentBlob {self.sha256[:12]} refs={self.ref_count}>"
@@ -0,0 +1,14 @@
+from app import create_app
+from services.search import rebuild_search_index
+
+
+def rebuild_index():
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        rebuild_search_index()
+        print("Search index rebuilt successfully.")
+
+
+if __name__ == "__main__":
+    rebuild_index()
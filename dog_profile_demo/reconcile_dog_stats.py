@@ -0,0 +1,20 @@
+from app import create_app
+from models import db
+from services.dog_stats import reconcile_dog_stats
+
+
+def reconcile():
+    app = create_app(maintenance=True)
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            result = reconcile_dog_stats(conn)
+
+        print(
+            f"Dog stats reconciled: {result['created']} created, "
+            f"{result['removed']} removed, {result['repaired']} repaired."
+        )
+
+
+if __name__ == "__main__":
+    reconcile()
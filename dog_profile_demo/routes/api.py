@@ -0,0 +1,319 @@
+import hashlib
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, session, url_for, current_app
+
+from models import db, Dog, DogPhoto, Document, DogMessage
+from services.query_budget import query_budget
+from routes.dogs import DOG_FILTER_FIELDS, search_dogs
+from services.messages import message_to_dict
+from services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    InvalidCursor,
+    paginate_keyset,
+    parse_page_size,
+)
+from services.serializers import (
+    DOCUMENT_FIELDS,
+    DOG_FIELDS,
+    MESSAGE_FIELDS,
+    PHOTO_FIELDS,
+    document_to_dict,
+    dog_to_dict,
+    parse_fields,
+    photo_to_dict,
+    select_fields,
+)
+from services.versions import RESPONSES_VERSION, get_version
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+# Bulk fetch limits: dogs per request and latest messages per dog.
+MAX_BULK_IDS = 100
+DEFAULT_BULK_MESSAGES = 5
+MAX_BULK_MESSAGES = 50
+
+
+# -------------------------
+# Helpers
+# -------------------------
+class ApiError(Exception):
+    """
+    Raised inside an API view to return a JSON error with a status code.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({"error": error.message}), error.status
+
+
+@api_bp.errorhandler(404)
+def handle_not_found(error):
+    return jsonify({"error": "Not found."}), 404
+
+
+def api_view(view_func):
+    """
+    Wrap an API GET view: require a logged-in session (401 rather than a
+    login redirect) and answer conditional GETs.
+
+    The ETag comes from the response generation that every write bumps,
+    plus the role and full URL, so a matching If-None-Match returns 304
+    after one primary-key read, without running the view's queries.
+    """
+    @wraps(view_func)
+    def wrapped_view(*args, **kwargs):
+        if "user_id" not in session:
+            return jsonify({"error": "Authentication required."}), 401
+
+        raw = f"{get_version(RESPONSES_VERSION)}|{session.get('role')}|{request.full_path}"
+        etag = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(view_func(*args, **kwargs))
+
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return wrapped_view
+
+
+def requested_fields(allowed):
+    try:
+        return parse_fields(request.args.get("fields", ""), allowed)
+    except ValueError as e:
+        raise ApiError(str(e))
+
+
+def parse_ids(value):
+    """
+    Turn "?ids=3,1,2" into a list of unique ints, keeping their order.
+    """
+    try:
+        ids = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise ApiError("ids must be a comma-separated list of integers.")
+
+    ids = list(dict.fromkeys(ids))
+
+    if not ids:
+        raise ApiError("At least one id is required.")
+    if len(ids) > MAX_BULK_IDS:
+        raise ApiError(f"At most {MAX_BULK_IDS} ids can be fetched at once.")
+
+    return ids
+
+
+def page_payload(query, sort_col, id_col, serialize, fields, sort_attr=None, **url_args):
+    """
+    Run one keyset page and build {"items", "next", "prev"} with links
+    that keep the current fields and filters.
+    """
+    page_size = parse_page_size(request.args.get("per_page"), default=DEFAULT_PAGE_SIZE)
+
+    try:
+        page = paginate_keyset(
+            query,
+            sort_col,
+            id_col,
+            page_size,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            sort_attr=sort_attr
+        )
+    except InvalidCursor as e:
+        raise ApiError(str(e))
+
+    link_args = dict(url_args)
+    for name in ("fields", "per_page"):
+        if request.args.get(name):
+            link_args[name] = request.args[name]
+
+    return {
+        "items": [select_fields(serialize(row), fields) for row in page.items],
+        "next": url_for(request.endpoint, after=page.next_cursor, **link_args)
+        if page.has_next else None,
+        "prev": url_for(request.endpoint, before=page.prev_cursor, **link_args)
+        if page.has_prev else None
+    }
+
+
+# -------------------------
+# Bulk loading
+# -------------------------
+def latest_messages_by_dog(dog_ids, per_dog):
+    """
+    The newest `per_dog` messages for each dog, in one query, using
+    ROW_NUMBER() over each dog's thread.
+    """
+    row_number = db.func.row_number().over(
+        partition_by=DogMessage.dog_id,
+        order_by=(DogMessage.created_at.desc(), DogMessage.id.desc())
+    ).label("row_number")
+
+    ranked = db.session.query(DogMessage.id, row_number).filter(
+        DogMessage.dog_id.in_(dog_ids)
+    ).subquery()
+
+    messages = DogMessage.query.join(
+        ranked, ranked.c.id == DogMessage.id
+    ).filter(
+        ranked.c.row_number <= per_dog
+    ).order_by(
+        DogMessage.dog_id, DogMessage.created_at.desc(), DogMessage.id.desc()
+    ).all()
+
+    grouped = {dog_id: [] for dog_id in dog_ids}
+    for message in messages:
+        grouped[message.dog_id].append(message)
+    return grouped
+
+
+def photos_by_dog(dog_ids):
+    photos = DogPhoto.query.filter(
+        DogPhoto.dog_id.in_(dog_ids)
+    ).order_by(
+        DogPhoto.dog_id, DogPhoto.uploaded_at.desc(), DogPhoto.id.desc()
+    ).all()
+
+    grouped = {dog_id: [] for dog_id in dog_ids}
+    for photo in photos:
+        grouped[photo.dog_id].append(photo)
+    return grouped
+
+
+def bulk_dogs(ids, fields):
+    """
+    Dogs for `ids` with their photos and latest messages, in three
+    queries however many ids are asked for. Unknown ids are listed in
+    "missing" rather than failing the whole request.
+    """
+    per_dog = parse_page_size(
+        request.args.get("messages"),
+        default=DEFAULT_BULK_MESSAGES,
+        maximum=MAX_BULK_MESSAGES
+    )
+
+    dogs = {dog.id: dog for dog in Dog.query.filter(Dog.id.in_(ids)).all()}
+    found = [dog_id for dog_id in ids if dog_id in dogs]
+
+    photos = photos_by_dog(found) if found else {}
+    messages = latest_messages_by_dog(found, per_dog) if found else {}
+
+    items = []
+    for dog_id in found:
+        item = select_fields(dog_to_dict(dogs[dog_id]), fields)
+        item["photos"] = [photo_to_dict(photo) for photo in photos[dog_id]]
+        item["latest_messages"] = [message_to_dict(m) for m in messages[dog_id]]
+        items.append(item)
+
+    return {
+        "items": items,
+        "missing": [dog_id for dog_id in ids if dog_id not in dogs]
+    }
+
+
+# -------------------------
+# Dogs
+# -------------------------
+@api_bp.route("/dogs")
+@query_budget(6)
+@api_view
+def list_dogs():
+    """
+    List dogs, newest first (best match first for ?q=).
+
+    Accepts the same filters as the dog list page, plus fields=, per_page=,
+    after= and before=. With ?ids=1,2,3 it returns exactly those dogs
+    with their photos and latest messages instead.
+    """
+    fields = requested_fields(DOG_FIELDS)
+
+    if request.args.get("ids"):
+        return bulk_dogs(parse_ids(request.args["ids"]), fields)
+
+    filters = {
+        field: request.args[field].strip()
+        for field in DOG_FILTER_FIELDS
+        if request.args.get(field, "").strip()
+    }
+    query, rank_col = search_dogs(filters)
+
+    if rank_col is not None:
+        return page_payload(
+            query, rank_col, Dog.id, dog_to_dict, fields, sort_attr="search_rank", **filters
+        )
+
+    return page_payload(query, Dog.created_at, Dog.id, dog_to_dict, fields, **filters)
+
+
+@api_bp.route("/dogs/<int:dog_id>")
+@query_budget(3)
+@api_view
+def get_dog(dog_id):
+    dog = Dog.query.get_or_404(dog_id)
+    return select_fields(dog_to_dict(dog), requested_fields(DOG_FIELDS))
+
+
+# -------------------------
+# Per-dog collections
+# -------------------------
+@api_bp.route("/dogs/<int:dog_id>/photos")
+@query_budget(4)
+@api_view
+def list_photos(dog_id):
+    Dog.query.get_or_404(dog_id)
+
+    return page_payload(
+        DogPhoto.query.filter_by(dog_id=dog_id),
+        DogPhoto.uploaded_at,
+        DogPhoto.id,
+        photo_to_dict,
+        requested_fields(PHOTO_FIELDS),
+        dog_id=dog_id
+    )
+
+
+@api_bp.route("/dogs/<int:dog_id>/documents")
+@query_budget(4)
+@api_view
+def list_documents(dog_id):
+    Dog.query.get_or_404(dog_id)
+
+    return page_payload(
+        Document.query.filter_by(dog_id=dog_id),
+        Document.uploaded_at,
+        Document.id,
+        document_to_dict,
+        requested_fields(DOCUMENT_FIELDS),
+        dog_id=dog_id
+    )
+
+
+@api_bp.route("/dogs/<int:dog_id>/messages")
+@query_budget(4)
+@api_view
+def list_messages(dog_id):
+    """
+    A dog's chat thread, newest first.
+    """
+    Dog.query.get_or_404(dog_id)
+
+    return page_payload(
+        DogMessage.query.filter_by(dog_id=dog_id),
+        DogMessage.created_at,
+        DogMessage.id,
+        message_to_dict,
+        requested_fields(MESSAGE_FIELDS),
+        dog_id=dog_id
+    )
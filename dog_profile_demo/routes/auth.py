@@ -2,11 +2,13 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from models import db, User
+from services.query_budget import query_budget
 
 auth_bp = Blueprint("auth", __name__)
 
 
 @auth_bp.route("/register", methods=["GET", "POST"])
+@query_budget(3)
 def register():
     """
     Register a new user.
@@ -60,6 +62,7 @@ def register():
 
 
 @auth_bp.route("/login", methods=["GET", "POST"])
+@query_budget(2)
 def login():
     """
     Log a user in by saving basic user info into the session.
@@ -93,6 +96,7 @@ def login():
 
 
 @auth_bp.route("/logout")
+@query_budget(0)
 def logout():
     """
     Log the user out by clearing the session.
@@ -1,10 +1,328 @@
-from flask import Blueprint, request, redirect, url_for, flash
+import json
+
+from flask import (
+    Blueprint, request, redirect, url_for, flash, current_app, jsonify,
+    render_template, abort, Response, stream_with_context
+)
 from models import db, Dog, DogMessage
+from services.live import (
+    acquire_waiter_slot,
+    current_version,
+    deadline,
+    notify_thread_changed,
+    remaining,
+    wait_for_message,
+)
+from services.messages import (
+    DEFAULT_MESSAGE_PAGE_SIZE,
+    MAX_MESSAGE_PAGE_SIZE,
+    first_messages,
+    message_from,
+    message_ids_between,
+    message_to_dict,
+    messages_after,
+    messages_before,
+    recent_messages,
+)
+from services.pagination import parse_page_size
+from services.permissions import login_required
+from services.query_budget import query_budget
+from services.replicas import use_primary
+from services.response_cache import invalidate_responses
 
 chat_bp = Blueprint("chat", __name__)
 
 
+def wants_fragment():
+    """
+    Return True if the request came from the page's fetch() calls and
+    expects an HTML fragment instead of a redirect.
+    """
+    return request.headers.get("X-Requested-With") == "fetch"
+
+
+def wants_json():
+    """
+    Return True if the client asked for JSON rather than an HTML fragment.
+    """
+    if request.args.get("format") == "json":
+        return True
+
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"])
+    return best == "application/json"
+
+
+@chat_bp.route("/dog/<int:dog_id>/messages")
+@query_budget(4)
+@login_required
+def list_messages(dog_id):
+    """
+    Return part of a dog's chat thread as an HTML fragment or JSON.
+
+    ?before=<message_id> returns older messages, ?after=<message_id>
+    returns newer ones, and neither returns the most recent page.
+    """
+    limit = parse_page_size(
+        request.args.get("limit"),
+        default=current_app.config.get("CHAT_PAGE_SIZE", DEFAULT_MESSAGE_PAGE_SIZE),
+        maximum=MAX_MESSAGE_PAGE_SIZE
+    )
+
+    before_id = request.args.get("before", type=int)
+    after_id = request.args.get("after", type=int)
+
+    if before_id or after_id:
+        anchor = DogMessage.query.filter_by(
+            id=before_id or after_id,
+            dog_id=dog_id
+        ).first()
+
+        if anchor is None:
+            abort(404)
+
+    if before_id:
+        messages, has_more = messages_before(dog_id, anchor, limit)
+    elif after_id:
+        messages, has_more = messages_after(dog_id, anchor, limit)
+    else:
+        messages, has_more = recent_messages(dog_id, limit)
+
+    return messages_response(messages, has_more)
+
+
+def messages_response(messages, has_more, sync=None):
+    """
+    Render a slice of a thread as JSON or as an HTML fragment. `sync`
+    (see thread_sync) goes in the JSON, or the X-Thread-Sync header.
+    """
+    if wants_json():
+        payload = {
+            "messages": [message_to_dict(message) for message in messages],
+            "has_more": has_more
+        }
+        if sync is not None:
+            payload["sync"] = sync
+        return jsonify(payload)
+
+    response = current_app.make_response(
+        render_template("_messages.html", messages=messages)
+    )
+    response.headers["X-Has-More"] = "1" if has_more else "0"
+    if sync is not None:
+        response.headers["X-Thread-Sync"] = json.dumps(sync)
+    return response
+
+
+# -------------------------
+# Live updates
+# -------------------------
+def resolve_live_anchor(dog_id, after):
+    """
+    Work out which message a stream or poll should continue after.
+
+    `after` is the id of the last message the client has. "0" means the
+    client has none. If it is missing, or names a message that has since
+    been deleted, only messages posted from now on are sent.
+    """
+    if after == "0":
+        return None
+
+    if after and after.isdigit():
+        anchor = DogMessage.query.filter_by(id=int(after), dog_id=dog_id).first()
+        if anchor is not None:
+            return anchor
+
+    latest, _ = recent_messages(dog_id, 1)
+    return latest[0] if latest else None
+
+
+def new_messages(dog_id, anchor, limit):
+    if anchor is None:
+        return first_messages(dog_id, limit)
+    return messages_after(dog_id, anchor, limit)
+
+
+def thread_sync(dog_id, from_id, first, last, to_id):
+    """
+    What a live client needs to drop deleted messages: the ids still in
+    the part of the thread it shows, ids `from_id` to `to_id`. `first`
+    and `last` are the first and last messages still there (or None).
+    Only the newest MAX_MESSAGE_PAGE_SIZE are listed, with "from" moved
+    up to match.
+    """
+    ids = []
+    if first is not None and last is not None:
+        ids = message_ids_between(dog_id, first, last, MAX_MESSAGE_PAGE_SIZE)
+
+    if len(ids) == MAX_MESSAGE_PAGE_SIZE:
+        from_id = ids[0]
+
+    return {"from": from_id, "to": to_id, "ids": ids}
+
+
+def last_id(after, last):
+    """
+    The id of the newest message a live client has: the one it sent as
+    `after`, or `last` if that's newer.
+    """
+    after_id = int(after) if after and after.isdigit() else 0
+    return max(after_id, last.id if last is not None else 0)
+
+
+def sse_event(message):
+    payload = json.dumps({
+        "id": message.id,
+        "html": render_template("_messages.html", messages=[message])
+    })
+    return f"id: {message.id}\nevent: message\ndata: {payload}\n\n"
+
+
+def sse_sync_event(sync):
+    return f"event: sync\ndata: {json.dumps(sync)}\n\n"
+
+
+@chat_bp.route("/dog/<int:dog_id>/messages/stream")
+@query_budget(4)
+@use_primary
+@login_required
+def stream_messages(dog_id):
+    """
+    Server-Sent Events stream of new messages for one dog.
+
+    With ?from=<id>, the id of the oldest message the page shows, a
+    "sync" event (see thread_sync) is sent when the stream opens and
+    whenever one of those messages is deleted.
+
+    Streams are capped per worker and end after LIVE_STREAM_SECONDS.
+    The browser then reconnects with Last-Event-ID. When every slot is
+    taken this answers 204, which tells EventSource to stop, and the
+    page falls back to long-polling.
+    """
+    config = current_app.config
+    acquired, semaphore = acquire_waiter_slot(config["LIVE_MAX_WAITERS"])
+
+    if not acquired:
+        return "", 204
+
+    try:
+        after = request.headers.get("Last-Event-ID") or request.args.get("after")
+        anchor = resolve_live_anchor(dog_id, after)
+        from_id = request.args.get("from", type=int)
+        first = message_from(dog_id, from_id) if from_id else None
+        db.session.close()
+    except Exception:
+        semaphore.release()
+        raise
+
+    poll_interval = config["LIVE_POLL_INTERVAL"]
+    until = deadline(config["LIVE_STREAM_SECONDS"])
+
+    def generate():
+        last = anchor
+        to_id = last_id(after, anchor)
+        kept = None
+        version = current_version(dog_id)
+
+        try:
+            yield "retry: 3000\n\n"
+
+            while remaining(until) > 0:
+                messages, _ = new_messages(dog_id, last, MAX_MESSAGE_PAGE_SIZE)
+                events = [sse_event(message) for message in messages]
+
+                if messages:
+                    last = messages[-1]
+                    to_id = max(to_id, last.id)
+
+                if from_id:
+                    sync = thread_sync(dog_id, from_id, first, last, to_id)
+                    if kept is None or set(kept) - set(sync["ids"]):
+                        events.append(sse_sync_event(sync))
+                    kept = sync["ids"]
+
+                # Hand the connection back to the pool while we wait.
+                db.session.close()
+
+                yield "".join(events) if events else ": keepalive\n\n"
+
+                version = wait_for_message(
+                    dog_id,
+                    version,
+                    min(poll_interval, remaining(until))
+                )
+        finally:
+            semaphore.release()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@chat_bp.route("/dog/<int:dog_id>/messages/poll")
+# Re-queries once per LIVE_POLL_INTERVAL while it waits.
+@query_budget(None)
+@use_primary
+@login_required
+def poll_messages(dog_id):
+    """
+    Long-poll fallback for clients without a stream.
+
+    Waits up to LONG_POLL_SECONDS for messages after ?after=<id>. Given
+    ?from=<id>&count=<n>, the oldest message the page shows and how many
+    it shows, it also answers when one of those is deleted, with a sync
+    (see thread_sync). When the worker's slots are all taken, it answers
+    at once with Retry-After so the client backs off instead of holding
+    a thread.
+    """
+    config = current_app.config
+    after = request.args.get("after")
+    anchor = resolve_live_anchor(dog_id, after)
+    from_id = request.args.get("from", type=int)
+    shown = request.args.get("count", type=int)
+    first = message_from(dog_id, from_id) if from_id and shown else None
+    acquired, semaphore = acquire_waiter_slot(config["LIVE_MAX_WAITERS"])
+
+    try:
+        until = deadline(config["LONG_POLL_SECONDS"] if acquired else 0)
+        version = current_version(dog_id)
+
+        while True:
+            messages, has_more = new_messages(dog_id, anchor, MAX_MESSAGE_PAGE_SIZE)
+
+            sync = None
+            if from_id and shown:
+                sync = thread_sync(dog_id, from_id, first, anchor, last_id(after, anchor))
+                if len(sync["ids"]) >= shown:
+                    sync = None
+
+            if messages or sync or remaining(until) <= 0:
+                break
+
+            db.session.close()
+            version = wait_for_message(
+                dog_id,
+                version,
+                min(config["LIVE_POLL_INTERVAL"], remaining(until))
+            )
+    finally:
+        if acquired:
+            semaphore.release()
+
+    response = messages_response(messages, has_more, sync)
+
+    if not acquired:
+        response.headers["Retry-After"] = str(config["LIVE_POLL_INTERVAL"])
+
+    return response
+
+
 @chat_bp.route("/dog/<int:dog_id>/messages/add", methods=["POST"])
+@query_budget(7)
 def add_message(dog_id):
     """
     Add a new chat/message entry for a specific dog.
@@ -16,6 +334,9 @@ def add_message(dog_id):
     message_text = request.form.get("message", "").strip()
 
     if not message_text:
+        if wants_fragment():
+            return "Message cannot be empty.", 400
+
         flash("Message cannot be empty.", "error")
         return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
 
@@ -28,16 +349,28 @@ def add_message(dog_id):
 
     try:
         db.session.add(new_message)
+        invalidate_responses()
         db.session.commit()
-        flash("Message added successfully.", "success")
     except Exception as e:
         db.session.rollback()
+
+        if wants_fragment():
+            return f"Error adding message: {str(e)}", 500
+
         flash(f"Error adding message: {str(e)}", "error")
+        return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
+
+    notify_thread_changed(dog.id)
+
+    if wants_fragment():
+        return render_template("_messages.html", messages=[new_message]), 201
 
+    flash("Message added successfully.", "success")
     return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
 
 
 @chat_bp.route("/messages/<int:message_id>/delete", methods=["POST"])
+@query_budget(5)
 def delete_message(message_id):
     """
     Delete a message from a dog's chat thread.
@@ -47,7 +380,9 @@ def delete_message(message_id):
 
     try:
         db.session.delete(message)
+        invalidate_responses()
         db.session.commit()
+        notify_thread_changed(dog_id)
         flash("Message deleted successfully.", "success")
     except Exception as e:
         db.session.rollback()
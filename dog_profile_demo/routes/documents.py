@@ -1,9 +1,26 @@
 import os
 import uuid
-from flask import Blueprint, request, redirect, url_for, flash, current_app
+from flask import Blueprint, request, redirect, url_for, flash, current_app, jsonify, abort
 from werkzeug.utils import secure_filename
 
-from models import db, Dog, Document
+from models import db, Dog, Document, UploadSession
+from services.blobs import document_upload_folder, store_blob
+from services.chunked_uploads import (
+    ChunkChecksumError,
+    ChunkOffsetError,
+    discard_partial,
+    file_sha256,
+    partial_path,
+    received_bytes,
+    start_partial,
+    write_chunk,
+)
+from services.downloads import send_document
+from services.permissions import current_user_id, current_username, login_required
+from services.query_budget import query_budget
+from services.replicas import use_primary
+from services.response_cache import invalidate_responses
+from services.storage import delete_local_file, save_stream_hashed
 
 documents_bp = Blueprint("documents", __name__)
 
@@ -27,7 +44,20 @@ def ensure_upload_folder(folder_path):
     os.makedirs(folder_path, exist_ok=True)
 
 
+# file_url is written once the row has an id to build the download URL from.
+PENDING_FILE_URL = ""
+
+
+def set_download_url(document):
+    """
+    Point a new document's file_url at the download route.
+    """
+    db.session.flush()
+    document.file_url = url_for("documents.download_document", document_id=document.id)
+
+
 @documents_bp.route("/dog/<int:dog_id>/documents/upload", methods=["POST"])
+@query_budget(11)
 def upload_document(dog_id):
     """
     Upload a document for a specific dog.
@@ -51,58 +81,274 @@ def upload_document(dog_id):
         flash("Invalid file type. Allowed: PDF, DOC, DOCX, PNG, JPG, JPEG, TXT.", "error")
         return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
 
-    try:
-        upload_folder = current_app.config.get(
-            "UPLOAD_FOLDER",
-            os.path.join(current_app.root_path, "static", "uploads", "documents")
-        )
-
-        ensure_upload_folder(upload_folder)
+    temp_path = None
 
+    try:
         original_filename = secure_filename(file.filename)
         ext = original_filename.rsplit(".", 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{ext}"
 
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-
-        # Relative URL for browser access
-        file_url = url_for(
-            "static",
-            filename=f"uploads/documents/{unique_filename}"
-        )
+        # Hash while the upload streams to disk, then store it once under
+        # its content hash. Re-uploads of the same file share one copy.
+        temp_path, sha256, size = save_stream_hashed(file.stream, document_upload_folder())
+        blob = store_blob(temp_path, sha256, size, ext)
 
         new_document = Document(
             dog_id=dog.id,
             filename=original_filename,
-            file_url=file_url,
+            file_url=PENDING_FILE_URL,
+            blob_sha256=blob.sha256,
             document_type=document_type or None,
             notes=notes or None
         )
 
         db.session.add(new_document)
+        set_download_url(new_document)
+        invalidate_responses()
         db.session.commit()
 
         flash(f"Document uploaded successfully for {dog.name}.", "success")
 
     except Exception as e:
         db.session.rollback()
+        if temp_path:
+            delete_local_file(temp_path)
         flash(f"Error uploading document: {str(e)}", "error")
 
     return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
 
 
+# -------------------------
+# Chunked, resumable uploads
+# -------------------------
+# 1. POST /dog/<id>/documents/uploads          -> start a session
+# 2. PUT  /documents/uploads/<upload_id>        -> send a chunk at ?offset=
+#    (optional X-Chunk-SHA256 header); repeat until done
+# 3. POST /documents/uploads/<upload_id>/complete -> verify and create Document
+#
+# GET /documents/uploads/<upload_id> reports how many bytes the server has,
+# so a client that lost its connection resumes from there.
+
+def upload_session_json(upload):
+    return {
+        "upload_id": upload.id,
+        "filename": upload.filename,
+        "size": upload.total_size,
+        "received": received_bytes(upload.id),
+        "chunk_size": current_app.config["UPLOAD_CHUNK_SIZE"],
+        "chunk_url": url_for("documents.put_upload_chunk", upload_id=upload.id),
+        "complete_url": url_for("documents.complete_upload", upload_id=upload.id)
+    }
+
+
+@documents_bp.route("/dog/<int:dog_id>/documents/uploads", methods=["POST"])
+@query_budget(6)
+@login_required
+def start_upload(dog_id):
+    """
+    Start a chunked upload session for a document.
+    """
+    dog = Dog.query.get_or_404(dog_id)
+    data = request.get_json(silent=True) or {}
+
+    filename = secure_filename(str(data.get("filename", "")))
+    total_size = data.get("size")
+
+    if not filename or not allowed_file(filename):
+        return jsonify({"error": "Invalid file type. Allowed: PDF, DOC, DOCX, PNG, JPG, JPEG, TXT."}), 400
+
+    if not isinstance(total_size, int) or total_size <= 0:
+        return jsonify({"error": "A positive file size is required."}), 400
+
+    if total_size > current_app.config["DOCUMENT_MAX_SIZE"]:
+        return jsonify({"error": "File is too large."}), 413
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        dog_id=dog.id,
+        filename=filename,
+        total_size=total_size,
+        document_type=str(data.get("document_type", "")).strip() or None,
+        notes=str(data.get("notes", "")).strip() or None,
+        uploaded_by=current_user_id(),
+        uploaded_by_name=current_username()
+    )
+
+    start_partial(upload.id)
+
+    try:
+        db.session.add(upload)
+        invalidate_responses()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        discard_partial(upload.id)
+        return jsonify({"error": f"Error starting upload: {str(e)}"}), 500
+
+    return jsonify(upload_session_json(upload)), 201
+
+
+@documents_bp.route("/documents/uploads/<upload_id>", methods=["GET"])
+@query_budget(2)
+@use_primary
+@login_required
+def upload_status(upload_id):
+    """
+    Report how far a chunked upload has got, for resuming.
+    """
+    upload = UploadSession.query.get_or_404(upload_id)
+    return jsonify(upload_session_json(upload))
+
+
+@documents_bp.route("/documents/uploads/<upload_id>", methods=["PUT"])
+@query_budget(2)
+@login_required
+def put_upload_chunk(upload_id):
+    """
+    Append one chunk to an upload. The body is the raw chunk bytes and is
+    streamed straight to disk.
+    """
+    upload = UploadSession.query.get_or_404(upload_id)
+    offset = request.args.get("offset", type=int)
+
+    if offset is None:
+        return jsonify({"error": "An offset is required."}), 400
+
+    # Release the DB connection while the body streams in.
+    total_size = upload.total_size
+    db.session.close()
+
+    try:
+        received = write_chunk(
+            upload_id,
+            offset,
+            request.stream,
+            total_size,
+            expected_sha256=request.headers.get("X-Chunk-SHA256")
+        )
+    except ChunkOffsetError as e:
+        return jsonify({"error": str(e), "received": e.received}), 409
+    except ChunkChecksumError as e:
+        return jsonify({"error": str(e), "received": offset}), 422
+    except ValueError as e:
+        return jsonify({"error": str(e), "received": offset}), 400
+
+    return jsonify({"received": received, "size": total_size})
+
+
+@documents_bp.route("/documents/uploads/<upload_id>/complete", methods=["POST"])
+@query_budget(12)
+@login_required
+def complete_upload(upload_id):
+    """
+    Finish a chunked upload: check the size and whole-file checksum, move
+    the file into document storage and create the Document row.
+    """
+    upload = UploadSession.query.get_or_404(upload_id)
+    data = request.get_json(silent=True) or {}
+    source_path = partial_path(upload.id)
+
+    received = received_bytes(upload.id)
+    if received != upload.total_size:
+        return jsonify({"error": "Upload is not complete.", "received": received}), 409
+
+    # The whole-file hash is the blob key, so it's always computed here;
+    # the client's value, if sent, is checked against it.
+    sha256 = file_sha256(source_path)
+    expected_sha256 = str(data.get("sha256", "")).lower()
+    if expected_sha256 and sha256 != expected_sha256:
+        return jsonify({"error": "File checksum did not match."}), 422
+
+    ext = upload.filename.rsplit(".", 1)[1].lower()
+
+    try:
+        blob = store_blob(source_path, sha256, upload.total_size, ext)
+
+        new_document = Document(
+            dog_id=upload.dog_id,
+            filename=upload.filename,
+            file_url=PENDING_FILE_URL,
+            blob_sha256=blob.sha256,
+            document_type=upload.document_type,
+            notes=upload.notes,
+            uploaded_by=upload.uploaded_by,
+            uploaded_by_name=upload.uploaded_by_name
+        )
+
+        db.session.add(new_document)
+        set_download_url(new_document)
+        db.session.delete(upload)
+        invalidate_responses()
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Error saving document: {str(e)}"}), 500
+
+    return jsonify({
+        "document_id": new_document.id,
+        "file_url": new_document.file_url,
+        "redirect_url": url_for("dogs.dog_detail", dog_id=new_document.dog_id)
+    }), 201
+
+
+@documents_bp.route("/documents/uploads/<upload_id>", methods=["DELETE"])
+@query_budget(5)
+@login_required
+def abort_upload(upload_id):
+    """
+    Abandon a chunked upload and delete what was received.
+    """
+    upload = UploadSession.query.get_or_404(upload_id)
+
+    db.session.delete(upload)
+    invalidate_responses()
+    db.session.commit()
+    discard_partial(upload_id)
+
+    return "", 204
+
+
+# -------------------------
+# Downloads
+# -------------------------
+@documents_bp.route("/documents/<int:document_id>/download", methods=["GET"])
+@query_budget(3)
+@login_required
+def download_document(document_id):
+    """
+    Serve a document's file with a strong ETag and Range support.
+    ?download=1 saves it instead of opening it in the browser.
+    """
+    document = Document.query.get_or_404(document_id)
+
+    # Documents hosted elsewhere (e.g. old Cloudinary links) stay there.
+    if document.file_url and document.file_url.startswith(("http://", "https://")):
+        return redirect(document.file_url)
+
+    response = send_document(document, as_attachment=request.args.get("download") == "1")
+    if response is None:
+        abort(404)
+
+    return response
+
+
 @documents_bp.route("/documents/<int:document_id>/delete", methods=["POST"])
+@query_budget(8)
 def delete_document(document_id):
     """
-    Delete a document record and remove the local file if it exists.
+    Delete a document record. A shared blob's file is removed once its
+    last document is gone; older documents own their file outright.
     """
     document = Document.query.get_or_404(document_id)
     dog_id = document.dog_id
 
     try:
-        # If the file is stored locally under /static, try deleting it too.
-        if document.file_url and document.file_url.startswith("/static/"):
+        # Documents stored before deduplication: delete their file directly.
+        if (
+            not document.blob_sha256
+            and document.file_url
+            and document.file_url.startswith("/static/")
+        ):
             relative_path = document.file_url.replace("/static/", "", 1)
             absolute_path = os.path.join(current_app.root_path, "static", relative_path)
 
@@ -110,6 +356,7 @@ def delete_document(document_id):
                 os.remove(absolute_path)
 
         db.session.delete(document)
+        invalidate_responses()
         db.session.commit()
 
         flash("Document deleted successfully.", "success")
@@ -1,46 +1,102 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from models import db, Dog, Document, DogMessage, DogPhoto
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify,
+    Response, stream_with_context, abort
+)
+from models import db, Dog, DogPhoto, DogStats
+from services.breeds import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, breed_index
+from services.bulk_dogs import FORMATS, export_dogs, format_from_filename, import_dogs
+from services.dashboard import get_dashboard_counts
+from services.dog_cards import card_query, to_cards
+from services.dog_detail import DEFAULT_DETAIL_ITEMS, load_dog_detail
+from services.facets import facet_counts
+from services.messages import DEFAULT_MESSAGE_PAGE_SIZE
+from services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    InvalidCursor,
+    paginate_keyset,
+    parse_page_size,
+)
 from services.permissions import login_required, roles_required
-from services.storage import upload_image_to_cloudinary
+from services.query_budget import query_budget
+from services.response_cache import cached_response, invalidate_responses
+from services.search import ranked_search
+from services.uploads import PENDING_IMAGE, queue_dog_image, queue_dog_photo
+from services.versions import DOGS_VERSION, bump_version
 
 dogs_bp = Blueprint("dogs", __name__)
 
 
-def get_dashboard_counts():
-    total_dogs = Dog.query.count()
+DOG_FILTER_FIELDS = ("q", "status", "size", "breed", "gender", "friendliness")
 
-    available_dogs = Dog.query.filter(
-        Dog.status.in_(["Available", "Intake", "Fostered", "Hold"])
-    ).count()
+# List orders besides the default newest first (and relevance for ?q=).
+DOG_SORTS = ("activity",)
 
-    adopted_dogs = Dog.query.filter_by(status="Adopted").count()
+# Query args that change the rendered dog list; the response cache key.
+DOG_LIST_ARGS = DOG_FILTER_FIELDS + ("sort", "after", "before", "per_page", "fragment")
 
-    foster_needed_dogs = Dog.query.filter_by(immediate_foster=True).count()
 
-    return total_dogs, available_dogs, adopted_dogs, foster_needed_dogs
+def get_dog_filters():
+    """
+    Read the dog list filters from the query string.
+    Empty values are dropped so they don't end up in pagination links.
+    """
+    filters = {}
 
+    for field in DOG_FILTER_FIELDS:
+        value = request.args.get(field, "").strip()
+        if value:
+            filters[field] = value
 
-@dogs_bp.route("/")
-@login_required
-def index():
-    q = request.args.get("q", "").strip()
-    status = request.args.get("status", "").strip()
-    size = request.args.get("size", "").strip()
-    breed = request.args.get("breed", "").strip()
-    gender = request.args.get("gender", "").strip()
-    friendliness = request.args.get("friendliness", "").strip()
+    return filters
+
+
+def search_dogs(filters):
+    """
+    Build the dog list query for the given filters.
 
+    Returns (query, rank_column). When `q` is served by the full-text
+    index, rank_column orders results by relevance. Otherwise it is None
+    and `q` falls back to ILIKE matching on the list columns.
+    """
+    query, rank_col = text_search(filters.get("q"))
+    return apply_dog_filters(query, filters), rank_col
+
+
+def text_search(q):
+    """
+    The dog query narrowed by the search box alone, and its rank column
+    (see search_dogs).
+    """
     query = Dog.query
+    rank_col = None
 
     if q:
-        query = query.filter(
-            db.or_(
-                Dog.name.ilike(f"%{q}%"),
-                Dog.breed.ilike(f"%{q}%"),
-                Dog.gender.ilike(f"%{q}%"),
-                Dog.friendliness.ilike(f"%{q}%")
+        ranked_query, rank_col = ranked_search(query, q)
+
+        if ranked_query is not None:
+            query = ranked_query
+        else:
+            query = query.filter(
+                db.or_(
+                    Dog.name.ilike(f"%{q}%"),
+                    Dog.breed.ilike(f"%{q}%"),
+                    Dog.gender.ilike(f"%{q}%"),
+                    Dog.friendliness.ilike(f"%{q}%")
+                )
             )
-        )
+
+    return query, rank_col
+
+
+def apply_dog_filters(query, filters):
+    """
+    Apply the non-text dog list filters to a Dog query.
+    """
+    status = filters.get("status")
+    size = filters.get("size")
+    breed = filters.get("breed")
+    gender = filters.get("gender")
+    friendliness = filters.get("friendliness")
 
     if status:
         query = query.filter(Dog.status == status)
@@ -49,7 +105,14 @@ def index():
         query = query.filter(Dog.size == size)
 
     if breed:
-        query = query.filter(Dog.breed.ilike(f"%{breed}%"))
+        # Names and aliases resolve in memory to breed ids, an indexed
+        # IN. Text the dictionary doesn't know still matches the raw breed.
+        breed_ids = breed_index().match(breed)
+
+        if breed_ids:
+            query = query.filter(Dog.breed_id.in_(breed_ids))
+        else:
+            query = query.filter(Dog.breed.ilike(f"%{breed}%"))
 
     if gender:
         query = query.filter(Dog.gender == gender)
@@ -57,82 +120,176 @@ def index():
     if friendliness:
         query = query.filter(Dog.friendliness.ilike(f"%{friendliness}%"))
 
-    dogs = query.order_by(Dog.created_at.desc()).all()
+    return query
+
+
+def get_dog_page(query, filters, rank_col=None):
+    """
+    Fetch one keyset page of dog cards plus next/prev links that keep the
+    filters. Pages are newest first, best match first for a ranked search,
+    or most recently active first with ?sort=activity. Each card comes
+    with its activity summary from the same query.
+    """
+    page_size = parse_page_size(
+        request.args.get("per_page"),
+        default=current_app.config.get("DOGS_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    )
+    sort = request.args.get("sort") if request.args.get("sort") in DOG_SORTS else None
+    id_col = Dog.id
+
+    if rank_col is not None:
+        sort, sort_col, sort_attr = None, rank_col, "search_rank"
+    elif sort == "activity":
+        sort_col, sort_attr, id_col = DogStats.last_activity_at, "last_activity_at", DogStats.dog_id
+    else:
+        sort_col, sort_attr = Dog.created_at, None
+
+    query = card_query(query, rank_col, require_stats=sort == "activity")
+
+    try:
+        page = paginate_keyset(
+            query,
+            sort_col,
+            id_col,
+            page_size,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            sort_attr=sort_attr
+        )
+    except InvalidCursor:
+        # A next/prev link kept after the search changed: start over at
+        # the top of the new list.
+        page = paginate_keyset(query, sort_col, id_col, page_size, sort_attr=sort_attr)
+
+    page.items = to_cards(page.items)
+
+    link_args = dict(filters)
+    if sort:
+        link_args["sort"] = sort
+    if request.args.get("per_page"):
+        link_args["per_page"] = page_size
+
+    next_url = None
+    prev_url = None
+
+    if page.has_next:
+        next_url = url_for(request.endpoint, after=page.next_cursor, **link_args)
+
+    if page.has_prev:
+        prev_url = url_for(request.endpoint, before=page.prev_cursor, **link_args)
+
+    return page, next_url, prev_url
+
+
+def render_dog_list(query, filters, foster_view, rank_col=None, facets=None):
+    """
+    Render the dog list, or just the table rows when the infinite
+    scroll script asks for the next page as a fragment. `facets` is a
+    callable returning the filter counts, only run for the full page.
+    """
+    page, next_url, prev_url = get_dog_page(query, filters, rank_col)
+
+    if request.args.get("fragment"):
+        return render_template(
+            "_dog_rows.html",
+            dogs=page.items,
+            next_url=next_url
+        )
 
     total_dogs, available_dogs, adopted_dogs, foster_needed_dogs = get_dashboard_counts()
 
     return render_template(
         "index.html",
-        dogs=dogs,
+        dogs=page.items,
+        next_url=next_url,
+        prev_url=prev_url,
         total_dogs=total_dogs,
         available_dogs=available_dogs,
         adopted_dogs=adopted_dogs,
         foster_needed_dogs=foster_needed_dogs,
-        foster_view=False
+        foster_view=foster_view,
+        filters=filters,
+        facets=facets() if facets else None
+    )
+
+
+@dogs_bp.route("/")
+@query_budget(8)
+@login_required
+@cached_response(DOG_LIST_ARGS)
+def index():
+    filters = get_dog_filters()
+    base_query, rank_col = text_search(filters.get("q"))
+    query = apply_dog_filters(base_query, filters)
+
+    return render_dog_list(
+        query,
+        filters,
+        foster_view=False,
+        rank_col=rank_col,
+        facets=lambda: facet_counts(base_query, filters, apply_dog_filters)
     )
 
 
 @dogs_bp.route("/dogs")
+@query_budget(0)
 @login_required
 def list_dogs():
     return redirect(url_for("dogs.index"))
 
 
 @dogs_bp.route("/foster-needed")
+@query_budget(6)
 @login_required
+@cached_response(DOG_LIST_ARGS)
 def foster_needed():
-    dogs = Dog.query.filter_by(
-        immediate_foster=True
-    ).order_by(
-        Dog.created_at.desc()
-    ).all()
+    query = Dog.query.filter_by(immediate_foster=True)
 
-    total_dogs, available_dogs, adopted_dogs, foster_needed_dogs = get_dashboard_counts()
-
-    return render_template(
-        "index.html",
-        dogs=dogs,
-        total_dogs=total_dogs,
-        available_dogs=available_dogs,
-        adopted_dogs=adopted_dogs,
-        foster_needed_dogs=foster_needed_dogs,
-        foster_view=True
-    )
+    return render_dog_list(query, {}, foster_view=True)
 
 
 @dogs_bp.route("/dog/<int:dog_id>")
+@query_budget(1)
 @login_required
 def dog_detail(dog_id):
-    dog = Dog.query.get_or_404(dog_id)
-
-    documents = Document.query.filter_by(
-        dog_id=dog_id
-    ).order_by(
-        Document.uploaded_at.desc()
-    ).all()
-
-    messages = DogMessage.query.filter_by(
-        dog_id=dog_id
-    ).order_by(
-        DogMessage.created_at.asc()
-    ).all()
+    detail = load_dog_detail(
+        dog_id,
+        current_app.config.get("DOG_DETAIL_ITEMS", DEFAULT_DETAIL_ITEMS),
+        current_app.config.get("CHAT_PAGE_SIZE", DEFAULT_MESSAGE_PAGE_SIZE)
+    )
 
-    photos = DogPhoto.query.filter_by(
-        dog_id=dog_id
-    ).order_by(
-        DogPhoto.uploaded_at.desc()
-    ).all()
+    if detail is None:
+        abort(404)
 
     return render_template(
         "dog_detail.html",
-        dog=dog,
-        documents=documents,
-        messages=messages,
-        photos=photos
+        dog=detail.dog,
+        documents=detail.documents,
+        has_more_documents=detail.has_more_documents,
+        messages=detail.messages,
+        has_older_messages=detail.has_older_messages,
+        photos=detail.photos,
+        has_more_photos=detail.has_more_photos
     )
 
 
+@dogs_bp.route("/breeds/suggest")
+@query_budget(0)
+@login_required
+def suggest_breeds():
+    """
+    Breed typeahead, e.g. GET /breeds/suggest?q=lab returns
+    [{"id": 9, "name": "Labrador Retriever"}]. Answered from the
+    in-memory breed index, so a keystroke costs no query.
+    """
+    limit = request.args.get("limit", DEFAULT_SUGGESTIONS, type=int)
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+    return jsonify(breed_index().suggest(request.args.get("q", ""), limit))
+
+
 @dogs_bp.route("/dog/add", methods=["GET", "POST"])
+@query_budget(8)
 @login_required
 @roles_required("admin", "coordinator", "staff")
 def add_dog():
@@ -147,16 +304,12 @@ def add_dog():
         immediate_foster = bool(request.form.get("immediate_foster"))
 
         image_file = request.files.get("image")
-        image_url = None
 
         if not name:
             flash("Dog name is required.", "error")
             return redirect(url_for("dogs.add_dog"))
 
         try:
-            if image_file and image_file.filename:
-                image_url = upload_image_to_cloudinary(image_file)
-
             new_dog = Dog(
                 name=name,
                 breed=breed or None,
@@ -165,11 +318,17 @@ def add_dog():
                 size=size or None,
                 friendliness=friendliness or None,
                 status=status or "Available",
-                image_url=image_url or None,
                 immediate_foster=immediate_foster
             )
 
             db.session.add(new_dog)
+
+            if image_file and image_file.filename:
+                db.session.flush()
+                queue_dog_image(new_dog, image_file)
+
+            bump_version(DOGS_VERSION)
+            invalidate_responses()
             db.session.commit()
 
             flash(f"{new_dog.name} was added successfully.", "success")
@@ -184,6 +343,7 @@ def add_dog():
 
 
 @dogs_bp.route("/dog/<int:dog_id>/edit", methods=["GET", "POST"])
+@query_budget(8)
 @login_required
 @roles_required("admin", "coordinator", "staff")
 def edit_dog(dog_id):
@@ -216,8 +376,10 @@ def edit_dog(dog_id):
             dog.immediate_foster = immediate_foster
 
             if image_file and image_file.filename:
-                dog.image_url = upload_image_to_cloudinary(image_file)
+                queue_dog_image(dog, image_file)
 
+            bump_version(DOGS_VERSION)
+            invalidate_responses()
             db.session.commit()
 
             flash(f"{dog.name} was updated successfully.", "success")
@@ -232,6 +394,7 @@ def edit_dog(dog_id):
 
 
 @dogs_bp.route("/dog/<int:dog_id>/photos/add", methods=["POST"])
+@query_budget(7)
 @login_required
 @roles_required("admin", "coordinator", "staff")
 def add_photo(dog_id):
@@ -245,15 +408,16 @@ def add_photo(dog_id):
         return redirect(url_for("dogs.dog_detail", dog_id=dog.id))
 
     try:
-        image_url = upload_image_to_cloudinary(image_file)
-
         new_photo = DogPhoto(
             dog_id=dog.id,
-            image_url=image_url,
+            image_url=PENDING_IMAGE,
             caption=caption or None
         )
 
         db.session.add(new_photo)
+        db.session.flush()
+        queue_dog_photo(new_photo, image_file)
+        invalidate_responses()
         db.session.commit()
 
         flash("Photo added successfully.", "success")
@@ -266,6 +430,7 @@ def add_photo(dog_id):
 
 
 @dogs_bp.route("/dog/photo/<int:photo_id>/delete", methods=["POST"])
+@query_budget(5)
 @login_required
 @roles_required("admin", "coordinator")
 def delete_photo(photo_id):
@@ -274,6 +439,7 @@ def delete_photo(photo_id):
 
     try:
         db.session.delete(photo)
+        invalidate_responses()
         db.session.commit()
         flash("Photo deleted successfully.", "success")
 
@@ -285,6 +451,7 @@ def delete_photo(photo_id):
 
 
 @dogs_bp.route("/dog/<int:dog_id>/delete", methods=["POST"])
+@query_budget(14)
 @login_required
 @roles_required("admin", "coordinator")
 def delete_dog(dog_id):
@@ -292,6 +459,8 @@ def delete_dog(dog_id):
 
     try:
         db.session.delete(dog)
+        bump_version(DOGS_VERSION)
+        invalidate_responses()
         db.session.commit()
 
         flash(f"{dog.name} was deleted successfully.", "success")
@@ -301,3 +470,55 @@ def delete_dog(dog_id):
         flash(f"Error deleting dog: {str(e)}", "error")
 
     return redirect(url_for("dogs.index"))
+
+
+# -------------------------
+# Bulk import / export
+# -------------------------
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson"
+}
+
+
+@dogs_bp.route("/dogs/import", methods=["POST"])
+# One INSERT per 500-row batch, so it grows with the file.
+@query_budget(None)
+@login_required
+@roles_required("admin", "coordinator")
+def dog_import():
+    """
+    Import many dogs from an uploaded CSV or JSONL file (field "file").
+    The format comes from ?format= or the file extension. Returns a JSON
+    summary with an error for each row that was skipped.
+    """
+    file = request.files.get("file")
+
+    if not file or not file.filename:
+        return jsonify({"error": "Please choose a CSV or JSONL file."}), 400
+
+    fmt = request.args.get("format") or format_from_filename(file.filename)
+    if fmt not in FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl."}), 400
+
+    result = import_dogs(file.stream, fmt)
+    return jsonify(result.to_dict())
+
+
+@dogs_bp.route("/dogs/export")
+@query_budget(2)
+@login_required
+def dog_export():
+    """
+    Download every dog as CSV or JSONL (?format=). The file is streamed
+    as it is read from the database.
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        return jsonify({"error": "Format must be csv or jsonl."}), 400
+
+    return Response(
+        stream_with_context(export_dogs(fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=dogs.{fmt}"}
+    )
@@ -1,12 +1,12 @@
-DROP TABLE IF EXISTS dog_messages;
-DROP TABLE IF EXISTS documents;
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS dogs;
+-- Reference SQLite schema, kept in step with models.py and the migrations
+-- in services/migrations.py (update it with every migration).
+-- The live schema is managed by `python migrate.py`; this file only
+-- creates what is missing and never drops existing tables.
 
 -- =========================
 -- USERS
 -- =========================
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   username TEXT NOT NULL UNIQUE,
   password_hash TEXT NOT NULL,
@@ -17,22 +17,98 @@ CREATE TABLE users (
 -- =========================
 -- DOGS
 -- =========================
-CREATE TABLE dogs (
+CREATE TABLE IF NOT EXISTS dogs (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL,
   breed TEXT,
   age TEXT,
+  gender TEXT,
   size TEXT,
   friendliness TEXT,
   status TEXT NOT NULL DEFAULT 'Available',
   image_url TEXT,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  immediate_foster BOOLEAN NOT NULL DEFAULT 0,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  image_variants TEXT,
+  breed_id INTEGER,
+
+  FOREIGN KEY (breed_id) REFERENCES breeds(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_dogs_created_at_id ON dogs (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_dogs_status_created_at ON dogs (status, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_dogs_foster_created_at ON dogs (immediate_foster, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_dogs_breed_created_at ON dogs (breed_id, created_at, id);
+
+-- =========================
+-- DOG SEARCH (FTS5)
+-- =========================
+CREATE VIRTUAL TABLE IF NOT EXISTS dogs_fts USING fts5(
+  name, breed, gender, friendliness,
+  content='dogs',
+  content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS dogs_fts_vocab USING fts5vocab(dogs_fts, 'row');
+
+CREATE TRIGGER IF NOT EXISTS dogs_fts_ai AFTER INSERT ON dogs BEGIN
+  INSERT INTO dogs_fts(rowid, name, breed, gender, friendliness)
+  VALUES (new.id, new.name, new.breed, new.gender, new.friendliness);
+END;
+
+CREATE TRIGGER IF NOT EXISTS dogs_fts_ad AFTER DELETE ON dogs BEGIN
+  INSERT INTO dogs_fts(dogs_fts, rowid, name, breed, gender, friendliness)
+  VALUES ('delete', old.id, old.name, old.breed, old.gender, old.friendliness);
+END;
+
+CREATE TRIGGER IF NOT EXISTS dogs_fts_au AFTER UPDATE ON dogs BEGIN
+  INSERT INTO dogs_fts(dogs_fts, rowid, name, breed, gender, friendliness)
+  VALUES ('delete', old.id, old.name, old.breed, old.gender, old.friendliness);
+  INSERT INTO dogs_fts(rowid, name, breed, gender, friendliness)
+  VALUES (new.id, new.name, new.breed, new.gender, new.friendliness);
+END;
+
+-- =========================
+-- BREEDS
+-- =========================
+CREATE TABLE IF NOT EXISTS breeds (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL UNIQUE,
+  key TEXT NOT NULL UNIQUE
 );
 
+CREATE TABLE IF NOT EXISTS breed_aliases (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  breed_id INTEGER NOT NULL,
+  key TEXT NOT NULL UNIQUE,
+
+  FOREIGN KEY (breed_id) REFERENCES breeds(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_breed_aliases_breed_id ON breed_aliases (breed_id);
+
+-- =========================
+-- DOG PHOTOS
+-- =========================
+CREATE TABLE IF NOT EXISTS dog_photos (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  dog_id INTEGER NOT NULL,
+  image_url TEXT NOT NULL,
+  caption TEXT,
+  uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  image_variants TEXT,
+
+  FOREIGN KEY (dog_id) REFERENCES dogs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_dog_photos_dog_id_uploaded_at ON dog_photos (dog_id, uploaded_at);
+
 -- =========================
 -- DOCUMENTS
 -- =========================
-CREATE TABLE documents (
+CREATE TABLE IF NOT EXISTS documents (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   dog_id INTEGER NOT NULL,
   filename TEXT NOT NULL,
@@ -42,15 +118,48 @@ CREATE TABLE documents (
   uploaded_by INTEGER,
   uploaded_by_name TEXT,
   uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  blob_sha256 TEXT,
 
   FOREIGN KEY (dog_id) REFERENCES dogs(id) ON DELETE CASCADE,
-  FOREIGN KEY (uploaded_by) REFERENCES users(id)
+  FOREIGN KEY (uploaded_by) REFERENCES users(id),
+  FOREIGN KEY (blob_sha256) REFERENCES document_blobs(sha256)
+);
+
+CREATE INDEX IF NOT EXISTS ix_documents_dog_id_uploaded_at ON documents (dog_id, uploaded_at);
+CREATE INDEX IF NOT EXISTS ix_documents_blob_sha256 ON documents (blob_sha256);
+
+-- =========================
+-- DOCUMENT BLOBS (CONTENT-ADDRESSED FILES)
+-- =========================
+CREATE TABLE IF NOT EXISTS document_blobs (
+  sha256 TEXT PRIMARY KEY,
+  stored_filename TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  ref_count INTEGER NOT NULL DEFAULT 0,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =========================
+-- CHUNKED UPLOAD SESSIONS
+-- =========================
+CREATE TABLE IF NOT EXISTS upload_sessions (
+  id TEXT PRIMARY KEY,
+  dog_id INTEGER NOT NULL,
+  filename TEXT NOT NULL,
+  total_size INTEGER NOT NULL,
+  document_type TEXT,
+  notes TEXT,
+  uploaded_by INTEGER,
+  uploaded_by_name TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+  FOREIGN KEY (dog_id) REFERENCES dogs(id) ON DELETE CASCADE
 );
 
 -- =========================
 -- DOG MESSAGES (CHAT)
 -- =========================
-CREATE TABLE dog_messages (
+CREATE TABLE IF NOT EXISTS dog_messages (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   dog_id INTEGER NOT NULL,
   user_id INTEGER,
@@ -62,3 +171,46 @@ CREATE TABLE dog_messages (
   FOREIGN KEY (dog_id) REFERENCES dogs(id) ON DELETE CASCADE,
   FOREIGN KEY (user_id) REFERENCES users(id)
 );
+
+CREATE INDEX IF NOT EXISTS ix_dog_messages_dog_id_created_at ON dog_messages (dog_id, created_at, id);
+
+-- =========================
+-- CACHE VERSION STAMPS
+-- =========================
+CREATE TABLE IF NOT EXISTS cache_versions (
+  name TEXT PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0
+);
+
+-- =========================
+-- DOG STATS (PER-DOG SUMMARY)
+-- =========================
+CREATE TABLE IF NOT EXISTS dog_stats (
+  dog_id INTEGER PRIMARY KEY,
+  message_count INTEGER NOT NULL DEFAULT 0,
+  document_count INTEGER NOT NULL DEFAULT 0,
+  photo_count INTEGER NOT NULL DEFAULT 0,
+  last_activity_at DATETIME NOT NULL,
+
+  FOREIGN KEY (dog_id) REFERENCES dogs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_dog_stats_last_activity_at ON dog_stats (last_activity_at, dog_id);
+
+-- =========================
+-- BACKGROUND JOBS
+-- =========================
+CREATE TABLE IF NOT EXISTS jobs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  payload TEXT NOT NULL DEFAULT '{}',
+  status TEXT NOT NULL DEFAULT 'queued',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 5,
+  run_after DATETIME DEFAULT CURRENT_TIMESTAMP,
+  locked_at DATETIME,
+  last_error TEXT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_status_run_after ON jobs (status, run_after, id);
@@ -0,0 +1,216 @@
+import os
+import shutil
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Document, DocumentBlob
+from services.storage import content_addressed_name, delete_local_file, ensure_folder_exists
+
+
+# Blob references dropped by deleted documents, released after the flush.
+RELEASE_ON_FLUSH = "blob_references_released"
+
+# Files queued for removal once the current transaction commits, as a
+# list of (sha256, absolute_path) pairs in session.info.
+REMOVE_ON_COMMIT = "blob_files_released"
+
+# Incoming files store_blob took, handed back if the transaction rolls
+# back so the caller can retry: (sha256, blob_path, temp_path) for files
+# moved into place, and temp paths of duplicates to delete on commit.
+RESTORE_ON_ROLLBACK = "blob_files_created"
+DISCARD_ON_COMMIT = "blob_duplicate_files"
+
+
+def document_upload_folder():
+    """
+    Folder that finished document files are stored in.
+    """
+    return current_app.config.get(
+        "UPLOAD_FOLDER",
+        os.path.join(current_app.root_path, "static", "uploads", "documents")
+    )
+
+
+# -------------------------
+# Taking a reference
+# -------------------------
+def store_blob(temp_path, sha256, size, ext):
+    """
+    Take a reference to the blob for `sha256`, taking ownership of temp_path.
+
+    If the content is already stored, its ref_count goes up and the temp
+    file is deleted when the transaction commits. Otherwise the temp file
+    becomes the blob's file and a new row is added with ref_count 1.
+    Either way, if the transaction rolls back the temp file is back where
+    it was. Returns the DocumentBlob; the caller commits together with
+    the Document that points at it.
+    """
+    if increment_ref_count(sha256):
+        db.session.info.setdefault(DISCARD_ON_COMMIT, []).append(temp_path)
+        return db.session.get(DocumentBlob, sha256)
+
+    folder = document_upload_folder()
+    stored_filename = content_addressed_name(sha256, ext)
+    file_path = os.path.join(folder, stored_filename)
+
+    ensure_folder_exists(os.path.dirname(file_path))
+    shutil.move(temp_path, file_path)
+    db.session.info.setdefault(RESTORE_ON_ROLLBACK, []).append((sha256, file_path, temp_path))
+
+    blob = DocumentBlob(
+        sha256=sha256,
+        stored_filename=stored_filename,
+        size=size,
+        ref_count=1
+    )
+
+    try:
+        # A savepoint, so losing an insert race to another request only
+        # undoes this row, not the caller's whole transaction.
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        if not increment_ref_count(sha256):
+            raise
+        return db.session.get(DocumentBlob, sha256)
+
+    return blob
+
+
+def increment_ref_count(sha256):
+    updated = DocumentBlob.query.filter_by(sha256=sha256).update(
+        {DocumentBlob.ref_count: DocumentBlob.ref_count + 1},
+        synchronize_session=False
+    )
+    return bool(updated)
+
+
+# -------------------------
+# Dropping a reference
+# -------------------------
+@event.listens_for(Document, "after_delete")
+def release_blob(mapper, connection, document):
+    """
+    Note that a deleted document drops its reference to its blob. This
+    runs for direct deletes and for the cascade when a dog is deleted;
+    the references are released together once the flush is done.
+    """
+    if document.blob_sha256:
+        db.session.info.setdefault(RELEASE_ON_FLUSH, Counter())[document.blob_sha256] += 1
+
+
+@event.listens_for(db.session, "after_flush")
+def release_blobs(session, flush_context):
+    """
+    Drop the references noted during a flush in a fixed number of
+    statements, however many documents were deleted. Blobs whose last
+    reference went are deleted; their files go once the transaction
+    commits.
+    """
+    releases = session.info.pop(RELEASE_ON_FLUSH, None)
+    if not releases:
+        return
+
+    blobs = DocumentBlob.__table__
+    connection = session.connection()
+
+    # One UPDATE per distinct decrement, which is almost always just 1.
+    by_amount = {}
+    for sha256, amount in releases.items():
+        by_amount.setdefault(amount, []).append(sha256)
+
+    for amount, hashes in by_amount.items():
+        connection.execute(
+            blobs.update()
+            .where(blobs.c.sha256.in_(hashes))
+            .values(ref_count=blobs.c.ref_count - amount)
+        )
+
+    released = connection.execute(
+        blobs.delete()
+        .where(blobs.c.sha256.in_(list(releases)), blobs.c.ref_count <= 0)
+        .returning(blobs.c.sha256, blobs.c.stored_filename)
+    ).fetchall()
+
+    folder = document_upload_folder()
+    session.info.setdefault(REMOVE_ON_COMMIT, []).extend(
+        (row.sha256, os.path.join(folder, row.stored_filename)) for row in released
+    )
+
+
+# -------------------------
+# File cleanup
+# -------------------------
+def remove_unreferenced_files(session, pending):
+    """
+    Delete blob files whose row is gone. The row is checked again first,
+    because another request may have stored the same content meanwhile.
+    """
+    if not pending:
+        return
+
+    blobs = DocumentBlob.__table__
+
+    with session.get_bind().connect() as conn:
+        still_stored = set(conn.execute(
+            db.select(blobs.c.sha256).where(
+                blobs.c.sha256.in_([sha256 for sha256, _ in pending])
+            )
+        ).scalars())
+
+    for sha256, file_path in pending:
+        if sha256 not in still_stored:
+            delete_local_file(file_path)
+
+
+def restore_incoming_files(session, pending):
+    """
+    Put files store_blob moved into place back at their temp paths. A
+    blob file that another request has since committed a row for is
+    copied back rather than moved.
+    """
+    if not pending:
+        return
+
+    blobs = DocumentBlob.__table__
+
+    with session.get_bind().connect() as conn:
+        still_stored = set(conn.execute(
+            db.select(blobs.c.sha256).where(
+                blobs.c.sha256.in_([sha256 for sha256, _, _ in pending])
+            )
+        ).scalars())
+
+    for sha256, file_path, temp_path in pending:
+        if not os.path.exists(file_path):
+            continue
+        if sha256 in still_stored:
+            shutil.copyfile(file_path, temp_path)
+        else:
+            shutil.move(file_path, temp_path)
+
+
+@event.listens_for(db.session, "after_commit")
+def remove_released_files(session):
+    session.info.pop(RESTORE_ON_ROLLBACK, None)
+
+    for temp_path in session.info.pop(DISCARD_ON_COMMIT, None) or ():
+        delete_local_file(temp_path)
+
+    remove_unreferenced_files(session, session.info.pop(REMOVE_ON_COMMIT, None))
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def restore_created_files(session, previous_transaction):
+    # Left over by a flush that failed before after_flush ran.
+    session.info.pop(RELEASE_ON_FLUSH, None)
+
+    if previous_transaction.nested:
+        return
+
+    session.info.pop(REMOVE_ON_COMMIT, None)
+    session.info.pop(DISCARD_ON_COMMIT, None)
+    restore_incoming_files(session, session.info.pop(RESTORE_ON_ROLLBACK, None))
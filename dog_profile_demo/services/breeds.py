@@ -0,0 +1,358 @@
+import bisect
+import re
+import string
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Breed, BreedAlias, Dog
+from services.query_budget import unbudgeted
+from services.versions import BREEDS_VERSION, bump_version_on, read_version
+
+
+# How often (seconds) a worker checks whether the breed dictionary has
+# changed. Between checks, lookups are answered from memory.
+DEFAULT_BREED_INDEX_TTL = 5
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 25
+
+# session.info key: this session added breeds, so refresh after commit.
+BREEDS_ADDED = "breeds_added"
+
+# Words that make a dog a cross of a breed rather than another breed:
+# "Lab mix" is filed under Labrador Retriever.
+MIX_WORDS = frozenset(("mix", "mixed", "cross"))
+
+# Canonical breeds and their aliases, added by the migration. Breeds
+# typed in that aren't here are added as they come.
+SEED_BREEDS = {
+    "Australian Shepherd": ("aussie",),
+    "Beagle": (),
+    "Border Collie": (),
+    "Boxer": (),
+    "Chihuahua": ("chi",),
+    "Dachshund": ("doxie", "wiener dog"),
+    "German Shepherd": ("gsd", "german shepherd dog", "alsatian"),
+    "Golden Retriever": ("golden",),
+    "Labrador Retriever": ("lab", "labrador"),
+    "Mixed Breed": ("mix", "mixed", "mutt"),
+    "Pit Bull Terrier": ("pit bull", "pitbull", "pittie", "american pit bull terrier"),
+    "Poodle": (),
+    "Rottweiler": ("rottie",),
+    "Shih Tzu": ("shihtzu",),
+    "Siberian Husky": ("husky",),
+    "Yorkshire Terrier": ("yorkie",),
+}
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+_lock = threading.Lock()
+_cached = {"key": None, "index": None, "checked_at": None}
+
+
+# -------------------------
+# Normalizing
+# -------------------------
+def normalize_breed(text):
+    """
+    The key a breed is matched on: lowercase words, punctuation dropped.
+    "German Shepherd-Dog" and "german  shepherd dog" give the same key.
+    """
+    return " ".join(_SEPARATORS.sub(" ", (text or "").lower()).split())
+
+
+def breed_keys(text):
+    """
+    The keys to look `text` up by, most specific first: as typed, then
+    without "mix" and the like ("lab mix" -> "lab"), unless that's all
+    there is.
+    """
+    key = normalize_breed(text)
+    if not key:
+        return []
+
+    words = key.split(" ")
+    base = " ".join(w for w in words if w not in MIX_WORDS) or key
+    return [key] if base == key else [key, base]
+
+
+def breed_name(key):
+    """
+    A display name for a breed added from free text, given its key.
+    """
+    return string.capwords(key)
+
+
+# -------------------------
+# In-memory index
+# -------------------------
+class BreedIndex:
+    """
+    The breed dictionary held in memory, so filters and typeahead don't
+    query it. Every word start of every name and alias is a sorted key,
+    so "gol" and "retr" both find Golden Retriever by bisection.
+    """
+
+    def __init__(self, breeds, aliases):
+        self.names = {breed_id: name for breed_id, name, _ in breeds}
+
+        # Normalized name or alias -> breed id.
+        self.exact = {key: breed_id for breed_id, _, key in breeds}
+        self.exact.update({key: breed_id for breed_id, key in aliases})
+
+        self.name_keys = {breed_id: key for breed_id, _, key in breeds}
+
+        entries = set()
+        for key, breed_id in self.exact.items():
+            words = key.split(" ")
+            for i in range(len(words)):
+                entries.add((" ".join(words[i:]), breed_id))
+
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.ids = [breed_id for _, breed_id in entries]
+
+    def prefix_ids(self, prefix):
+        """
+        Ids of the breeds with a name or alias word starting with `prefix`.
+        """
+        found = {}
+        i = bisect.bisect_left(self.keys, prefix)
+
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            found[self.ids[i]] = True
+            i += 1
+
+        return list(found)
+
+    def lookup(self, text):
+        """
+        The id of the breed `text` names, by name or alias, or None.
+        """
+        for key in breed_keys(text):
+            if key in self.exact:
+                return self.exact[key]
+        return None
+
+    def match(self, text):
+        """
+        The breed ids a filter on `text` means: the breed it names, else
+        every breed it is a prefix of.
+        """
+        breed_id = self.lookup(text)
+        if breed_id is not None:
+            return [breed_id]
+
+        for key in breed_keys(text):
+            breed_ids = self.prefix_ids(key)
+            if breed_ids:
+                return breed_ids
+        return []
+
+    def suggest(self, text, limit=DEFAULT_SUGGESTIONS):
+        """
+        Up to `limit` breeds for a typeahead, those whose name starts with
+        `text` first, then alphabetical.
+        """
+        key = normalize_breed(text)
+        if not key:
+            return []
+
+        ids = self.prefix_ids(key)
+        ids.sort(key=lambda breed_id: (
+            not self.name_keys[breed_id].startswith(key),
+            self.names[breed_id]
+        ))
+
+        return [{"id": breed_id, "name": self.names[breed_id]} for breed_id in ids[:limit]]
+
+
+def load_breed_index(connection):
+    breeds = connection.execute(
+        db.select(Breed.id, Breed.name, Breed.key)
+    ).all()
+    aliases = connection.execute(
+        db.select(BreedAlias.breed_id, BreedAlias.key)
+    ).all()
+
+    return BreedIndex(breeds, aliases)
+
+
+def breed_index():
+    """
+    Return this process's BreedIndex.
+
+    The breeds version stamp is checked at most every BREED_INDEX_TTL
+    seconds, and the index reloaded when it has moved, on a separate
+    connection so it only ever holds committed breeds. Other calls,
+    i.e. nearly every typeahead keystroke, don't touch the database.
+    """
+    ttl = current_app.config.get("BREED_INDEX_TTL", DEFAULT_BREED_INDEX_TTL)
+    url = str(db.engine.url)
+    now = time.monotonic()
+
+    with _lock:
+        key, index, checked_at = _cached["key"], _cached["index"], _cached["checked_at"]
+
+    if index is not None and key[0] == url and checked_at is not None and now - checked_at < ttl:
+        return index
+
+    with unbudgeted(), db.engine.connect() as connection:
+        current_key = (url, read_version(connection, BREEDS_VERSION))
+        if current_key != key:
+            index = load_breed_index(connection)
+
+    with _lock:
+        _cached["key"] = current_key
+        _cached["index"] = index
+        _cached["checked_at"] = now
+
+    return index
+
+
+def cached_breed_index():
+    """
+    This process's BreedIndex as last loaded, without checking the version,
+    or None before the first load. For flush events, which mustn't take a
+    second pooled connection; a stale index only costs ensure_breed a
+    lookup.
+    """
+    with _lock:
+        key, index = _cached["key"], _cached["index"]
+
+    if index is None or key[0] != str(db.engine.url):
+        return None
+    return index
+
+
+@event.listens_for(db.session, "after_commit")
+def refresh_after_commit(session):
+    """
+    Check the version on the next lookup rather than after the TTL, so
+    this worker sees breeds it just added straight away.
+    """
+    if session.info.pop(BREEDS_ADDED, False):
+        with _lock:
+            _cached["checked_at"] = None
+
+
+@event.listens_for(db.session, "after_rollback")
+def forget_added_breeds(session):
+    session.info.pop(BREEDS_ADDED, None)
+
+
+# -------------------------
+# Writing
+# -------------------------
+def insert_ignoring_conflicts(connection, table, **values):
+    """
+    INSERT ... ON CONFLICT DO NOTHING, returning the new row's id, or
+    None if the row was already there.
+    """
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    return connection.execute(
+        dialect.insert(table).values(**values).on_conflict_do_nothing().returning(table.c.id)
+    ).scalar()
+
+
+def lookup_breed_id(connection, keys):
+    """
+    The id of the breed named by the first of `keys` that is a breed
+    name or alias, in one query.
+    """
+    rows = connection.execute(db.union_all(
+        db.select(Breed.key, Breed.id).where(Breed.key.in_(keys)),
+        db.select(BreedAlias.key, BreedAlias.breed_id).where(BreedAlias.key.in_(keys))
+    )).all()
+
+    found = dict(rows)
+    for key in keys:
+        if key in found:
+            return found[key]
+    return None
+
+
+def ensure_breed(connection, text, index=None):
+    """
+    Return the id of the breed `text` names, adding it to the dictionary
+    if it is new (None for blank text). Runs on `connection`, inside the
+    caller's transaction; `index` saves the lookup for known breeds.
+    """
+    keys = breed_keys(text)
+    if not keys:
+        return None
+
+    if index is not None:
+        breed_id = index.lookup(text)
+        if breed_id is not None:
+            return breed_id
+
+    breed_id = lookup_breed_id(connection, keys)
+    if breed_id is not None:
+        return breed_id
+
+    # New breeds are filed without "mix".
+    key = keys[-1]
+    breed_id = insert_ignoring_conflicts(connection, Breed.__table__, name=breed_name(key), key=key)
+
+    if breed_id is None:
+        # Another request added it first.
+        return lookup_breed_id(connection, [key])
+
+    bump_version_on(connection, BREEDS_VERSION)
+    db.session.info[BREEDS_ADDED] = True
+    return breed_id
+
+
+@event.listens_for(Dog, "before_insert")
+@event.listens_for(Dog, "before_update")
+def link_breed(mapper, connection, dog):
+    if db.inspect(dog).attrs.breed.history.has_changes():
+        dog.breed_id = ensure_breed(connection, dog.breed, cached_breed_index())
+
+
+def seed_breeds(connection):
+    """
+    Add SEED_BREEDS and their aliases, skipping any already there.
+    """
+    for name, aliases in SEED_BREEDS.items():
+        key = normalize_breed(name)
+        insert_ignoring_conflicts(connection, Breed.__table__, name=name, key=key)
+        breed_id = lookup_breed_id(connection, [key])
+
+        for alias in aliases:
+            insert_ignoring_conflicts(
+                connection, BreedAlias.__table__, breed_id=breed_id, key=normalize_breed(alias)
+            )
+
+    bump_version_on(connection, BREEDS_VERSION)
+
+
+def link_dog_breeds(connection):
+    """
+    Set breed_id on dogs that have a breed but no link yet (rows written
+    before the dictionary existed, or without the ORM). Returns the
+    number of dogs linked.
+    """
+    dogs = Dog.__table__
+    unlinked = dogs.c.breed_id.is_(None)
+
+    texts = connection.execute(
+        db.select(dogs.c.breed).where(unlinked, dogs.c.breed.isnot(None)).distinct()
+    ).scalars().all()
+
+    linked = 0
+    for text in texts:
+        breed_id = ensure_breed(connection, text)
+        if breed_id is None:
+            continue
+
+        linked += connection.execute(
+            dogs.update().where(unlinked, dogs.c.breed == text).values(breed_id=breed_id)
+        ).rowcount
+
+    return linked
@@ -0,0 +1,301 @@
+import codecs
+import csv
+import io
+import json
+
+from models import db, Dog
+from services.breeds import breed_index, ensure_breed
+from services.dog_stats import create_stats_rows
+from services.response_cache import invalidate_responses
+from services.versions import DOGS_VERSION, bump_version
+
+
+# Columns read on import and written on export, in file order.
+IMPORT_FIELDS = (
+    "name", "breed", "age", "gender", "size", "friendliness",
+    "status", "immediate_foster"
+)
+EXPORT_FIELDS = ("id",) + IMPORT_FIELDS + ("image_url", "created_at")
+
+FORMATS = ("csv", "jsonl")
+
+# Rows per INSERT executemany / commit, and rows fetched per export batch.
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+
+# Stop reporting errors after this many, so a wrong file doesn't produce
+# a huge response.
+MAX_REPORTED_ERRORS = 100
+
+NOT_UTF8 = "Line is not valid UTF-8 text. Save the file as UTF-8 and import it again."
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"", "0", "false", "no", "n", "off"}
+
+
+class ImportResult:
+    """
+    Outcome of an import: how many rows went in, and (line, message)
+    pairs for the rows that didn't.
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors
+        }
+
+
+def format_from_filename(filename, default="csv"):
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    if ext == "json":
+        ext = "jsonl"
+    return ext if ext in FORMATS else default
+
+
+# -------------------------
+# Reading rows
+# -------------------------
+def decode_lines(stream, bad_lines):
+    """
+    Yield the lines of a binary stream as text. A line that isn't UTF-8
+    is decoded with replacement characters and its number added to
+    `bad_lines`, so one mis-encoded row doesn't stop the import.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if line_number == 1:
+            line = line.removeprefix(codecs.BOM_UTF8)
+
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            bad_lines.add(line_number)
+            yield line.decode("utf-8", errors="replace")
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line_number, row_dict) from a binary stream, one row at a time.
+    A JSONL line that isn't a JSON object, or a row that isn't UTF-8, is
+    yielded as a ValueError instead of a dict so it can be reported
+    against its line.
+    """
+    bad_lines = set()
+    text = decode_lines(stream, bad_lines)
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        first_line = 1
+        for row in reader:
+            if any(first_line <= n <= reader.line_num for n in bad_lines):
+                yield reader.line_num, ValueError(NOT_UTF8)
+            else:
+                yield reader.line_num, row
+            first_line = reader.line_num + 1
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+
+        if line_number in bad_lines:
+            yield line_number, ValueError(NOT_UTF8)
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Each line must be a JSON object.")
+            continue
+
+        yield line_number, row
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+
+    text = str(value if value is not None else "").strip().lower()
+
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+
+    raise ValueError(f"immediate_foster must be yes/no, not '{value}'.")
+
+
+def validate_row(row):
+    """
+    Check one imported row against the dogs table and return the values
+    to insert. Raises ValueError with a message for the first problem.
+    """
+    columns = Dog.__table__.c
+    values = {}
+
+    for field in IMPORT_FIELDS[:-1]:
+        raw = row.get(field)
+        value = str(raw).strip() if raw is not None else ""
+
+        max_length = columns[field].type.length
+        if max_length and len(value) > max_length:
+            raise ValueError(f"{field} is longer than {max_length} characters.")
+
+        values[field] = value or None
+
+    if not values["name"]:
+        raise ValueError("name is required.")
+
+    values["status"] = values["status"] or "Available"
+    values["immediate_foster"] = parse_bool(row.get("immediate_foster"))
+    return values
+
+
+# -------------------------
+# Import
+# -------------------------
+def link_breeds(rows):
+    """
+    Set breed_id on rows about to be inserted without the ORM, which
+    skips the Dog events that otherwise set it. Breeds new to the
+    dictionary are added in the same transaction.
+    """
+    # Before the session takes its connection, so a refresh doesn't hold two.
+    index = breed_index()
+    connection = db.session.connection()
+
+    for values in rows:
+        values["breed_id"] = ensure_breed(connection, values.get("breed"), index)
+
+
+def insert_batch(batch, result):
+    """
+    Insert a batch of validated rows and their empty dog_stats rows,
+    one executemany each, and commit. If the batch fails, retry its rows
+    one by one so the bad ones are reported and the rest still go in.
+    """
+    try:
+        rows = [values for _, values in batch]
+        link_breeds(rows)
+        inserted = db.session.execute(
+            Dog.__table__.insert().returning(Dog.id, Dog.created_at), rows
+        )
+        create_stats_rows(inserted.all())
+        bump_version(DOGS_VERSION)
+        invalidate_responses()
+        db.session.commit()
+        result.inserted += len(batch)
+        return
+    except Exception:
+        db.session.rollback()
+
+    for line_number, values in batch:
+        try:
+            link_breeds([values])
+            inserted = db.session.execute(
+                Dog.__table__.insert().returning(Dog.id, Dog.created_at), values
+            )
+            create_stats_rows(inserted.all())
+            bump_version(DOGS_VERSION)
+            invalidate_responses()
+            db.session.commit()
+            result.inserted += 1
+        except Exception as e:
+            db.session.rollback()
+            result.add_error(line_number, str(e.__cause__ or e))
+
+
+def import_dogs(stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Stream rows from a CSV or JSONL file into the dogs table.
+
+    Rows are validated as they are read and inserted in batches, one
+    transaction per batch. Invalid rows are skipped and reported by line
+    number; they never stop the rest of the file.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use csv or jsonl.")
+
+    result = ImportResult()
+    batch = []
+
+    for line_number, row in read_rows(stream, fmt):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            batch.append((line_number, validate_row(row)))
+        except ValueError as e:
+            result.add_error(line_number, str(e))
+            continue
+
+        if len(batch) >= batch_size:
+            insert_batch(batch, result)
+            batch = []
+
+    if batch:
+        insert_batch(batch, result)
+
+    return result
+
+
+# -------------------------
+# Export
+# -------------------------
+def export_rows():
+    """
+    Yield every dog as a dict, oldest first. Rows are fetched in batches
+    with yield_per (a server-side cursor on Postgres), so the table is
+    never loaded into memory at once.
+    """
+    columns = [Dog.__table__.c[field] for field in EXPORT_FIELDS]
+    statement = db.select(*columns).order_by(Dog.id).execution_options(
+        yield_per=EXPORT_BATCH_SIZE
+    )
+
+    for row in db.session.execute(statement):
+        data = row._asdict()
+        data["created_at"] = data["created_at"].isoformat() if data["created_at"] else None
+        yield data
+
+
+def export_dogs(fmt):
+    """
+    Yield the export file as text chunks, ready to stream as a response.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'. Use csv or jsonl.")
+
+    if fmt == "jsonl":
+        for data in export_rows():
+            yield json.dumps(data) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+
+    for count, data in enumerate(export_rows(), start=1):
+        data["immediate_foster"] = "yes" if data["immediate_foster"] else "no"
+        writer.writerow(data)
+
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db, UploadSession
+from services.response_cache import invalidate_responses
+from services.storage import ensure_folder_exists
+
+
+# Bytes copied from the request stream per read. Chunks are written to
+# disk in blocks this size, so a chunk is never held in memory whole.
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkOffsetError(ValueError):
+    """
+    The client sent a chunk for the wrong position in the file.
+    `received` is where the server actually is, so the client can resume.
+    """
+
+    def __init__(self, received):
+        super().__init__(f"Expected a chunk at offset {received}.")
+        self.received = received
+
+
+class ChunkChecksumError(ValueError):
+    """
+    A chunk's bytes didn't match the checksum the client sent.
+    """
+
+
+# -------------------------
+# Partial files
+# -------------------------
+def partial_path(upload_id):
+    folder = current_app.config["CHUNK_UPLOAD_FOLDER"]
+    return os.path.join(folder, f"{upload_id}.part")
+
+
+def start_partial(upload_id):
+    """
+    Create the empty partial file for a new upload session.
+    """
+    ensure_folder_exists(current_app.config["CHUNK_UPLOAD_FOLDER"])
+    open(partial_path(upload_id), "wb").close()
+
+
+def received_bytes(upload_id):
+    """
+    How much of the file the server has. The partial file's size is the
+    source of truth, so it stays correct if a request died mid-chunk.
+    """
+    path = partial_path(upload_id)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def write_chunk(upload_id, offset, stream, total_size, expected_sha256=None):
+    """
+    Append one chunk from `stream` to the partial file, a block at a time.
+
+    The chunk must start exactly where the file ends. If the file would
+    grow past `total_size`, or the chunk doesn't match `expected_sha256`,
+    the file is cut back to `offset` and the error is raised.
+    Returns the new number of bytes received.
+    """
+    received = received_bytes(upload_id)
+
+    if offset != received:
+        raise ChunkOffsetError(received)
+
+    digest = hashlib.sha256()
+
+    with open(partial_path(upload_id), "r+b") as partial:
+        partial.seek(offset)
+
+        try:
+            while True:
+                block = stream.read(COPY_BLOCK_SIZE)
+                if not block:
+                    break
+
+                if partial.tell() + len(block) > total_size:
+                    raise ValueError("Chunk runs past the declared file size.")
+
+                partial.write(block)
+                digest.update(block)
+
+            if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+                raise ChunkChecksumError("Chunk checksum did not match.")
+
+        except Exception:
+            partial.truncate(offset)
+            raise
+
+        partial.truncate()
+        return partial.tell()
+
+
+def file_sha256(path):
+    """
+    Hash a file from disk in blocks.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def discard_partial(upload_id):
+    path = partial_path(upload_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# -------------------------
+# Expiry
+# -------------------------
+def expire_upload_sessions(max_age=None):
+    """
+    Delete upload sessions that haven't received a chunk for `max_age`
+    (default UPLOAD_SESSION_TTL_HOURS) with their partial files, and
+    partial files no session owns. Returns the number of sessions deleted.
+    """
+    if max_age is None:
+        max_age = timedelta(hours=current_app.config["UPLOAD_SESSION_TTL_HOURS"])
+
+    cutoff = datetime.utcnow() - max_age
+    idle_since = time.time() - max_age.total_seconds()
+
+    def idle(upload_id):
+        path = partial_path(upload_id)
+        return not os.path.exists(path) or os.path.getmtime(path) < idle_since
+
+    expired = [
+        upload.id
+        for upload in UploadSession.query.filter(UploadSession.created_at < cutoff)
+        if idle(upload.id)
+    ]
+
+    if expired:
+        UploadSession.query.filter(UploadSession.id.in_(expired)).delete(synchronize_session=False)
+        invalidate_responses()
+        db.session.commit()
+
+        for upload_id in expired:
+            discard_partial(upload_id)
+
+    # Files left by sessions deleted without them, or never committed.
+    folder = current_app.config["CHUNK_UPLOAD_FOLDER"]
+    if os.path.isdir(folder):
+        live = {row.id for row in db.session.query(UploadSession.id)}
+
+        for name in os.listdir(folder):
+            upload_id, ext = os.path.splitext(name)
+            if ext == ".part" and upload_id not in live and idle(upload_id):
+                discard_partial(upload_id)
+
+    db.session.commit()
+    return len(expired)
@@ -0,0 +1,47 @@
+import threading
+
+from models import db, Dog
+from services.versions import DOGS_VERSION, get_version
+
+
+# Statuses that count towards the "Available" dashboard tile.
+AVAILABLE_STATUSES = ("Available", "Intake", "Fostered", "Hold")
+
+_lock = threading.Lock()
+_cached = {"key": None, "counts": None}
+
+
+def query_dashboard_counts():
+    """
+    Compute all four dashboard counters in one conditional-aggregate query.
+    """
+    row = db.session.query(
+        db.func.count(Dog.id),
+        db.func.count(db.case((Dog.status.in_(AVAILABLE_STATUSES), 1))),
+        db.func.count(db.case((Dog.status == "Adopted", 1))),
+        db.func.count(db.case((Dog.immediate_foster.is_(True), 1)))
+    ).one()
+
+    return tuple(row)
+
+
+def get_dashboard_counts():
+    """
+    Return (total, available, adopted, foster_needed).
+
+    Counts are kept in-process and reused until the dogs version stamp
+    in the database changes, so a warm lookup costs one primary-key read.
+    """
+    key = (str(db.engine.url), get_version(DOGS_VERSION))
+
+    with _lock:
+        if _cached["key"] == key:
+            return _cached["counts"]
+
+    counts = query_dashboard_counts()
+
+    with _lock:
+        _cached["key"] = key
+        _cached["counts"] = counts
+
+    return counts
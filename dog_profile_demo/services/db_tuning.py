@@ -0,0 +1,87 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+# -------------------------
+# Engine options
+# -------------------------
+def sqlalchemy_url(database_url):
+    """
+    Heroku-style postgres:// URLs name no driver; use psycopg 3.
+    """
+    if database_url.startswith("postgres://"):
+        return database_url.replace("postgres://", "postgresql+psycopg://", 1)
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return database_url
+
+
+def is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config, database_url=None):
+    """
+    Build engine options for the primary (or `database_url`) from the
+    DB_* settings.
+
+    Each worker process has its own pool, so the server can open up to
+    workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections; keep that
+    under the database's connection limit.
+    """
+    url = make_url(database_url or config["SQLALCHEMY_DATABASE_URI"])
+    options = {}
+
+    # In-memory SQLite uses a single shared connection, not a queue pool.
+    if not is_memory_sqlite(url):
+        options.update(
+            pool_size=config["DB_POOL_SIZE"],
+            max_overflow=config["DB_MAX_OVERFLOW"],
+            pool_timeout=config["DB_POOL_TIMEOUT"],
+            pool_recycle=config["DB_POOL_RECYCLE"],
+            pool_pre_ping=config["DB_POOL_PRE_PING"]
+        )
+
+    timeout_ms = config["DB_STATEMENT_TIMEOUT_MS"]
+    if url.get_backend_name() == "postgresql" and timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+
+    return options
+
+
+# -------------------------
+# SQLite pragmas
+# -------------------------
+def sqlite_pragmas(config):
+    """
+    Pragmas run on every new SQLite connection.
+
+    WAL lets readers carry on while one writer commits, and busy_timeout
+    makes a second writer wait instead of failing with "database is
+    locked". synchronous=NORMAL is safe with WAL: a power cut can lose
+    the last commits but can't corrupt the file.
+    """
+    return (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", config["SQLITE_BUSY_TIMEOUT_MS"]),
+        # A negative cache_size is in KiB rather than pages.
+        ("cache_size", -config["SQLITE_CACHE_KB"]),
+        ("mmap_size", config["SQLITE_MMAP_BYTES"])
+    )
+
+
+def init_db_tuning(app, engine):
+    if engine.dialect.name != "sqlite" or is_memory_sqlite(engine.url):
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+from models import Dog, DogStats
+
+
+# =========================
+# Read model for the dog list
+# =========================
+# The list pages only render a card per dog, so they select the card
+# columns into plain tuples instead of loading Dog entities: no identity
+# map, no change tracking, no relationship state. Cards can't be
+# modified or lazy-load anything; pages that edit a dog load the entity.
+
+CARD_COLUMNS = (
+    Dog.id,
+    Dog.name,
+    Dog.breed,
+    Dog.gender,
+    Dog.age,
+    Dog.size,
+    Dog.friendliness,
+    Dog.status,
+    Dog.immediate_foster,
+    Dog.image_url,
+    Dog.image_variants,
+    Dog.created_at,
+)
+
+STATS_COLUMNS = (
+    DogStats.message_count,
+    DogStats.document_count,
+    DogStats.photo_count,
+    DogStats.last_activity_at,
+)
+
+# Same attribute names as Dog and DogStats, so templates can take either.
+DogCard = namedtuple(
+    "DogCard",
+    [column.key for column in CARD_COLUMNS] + ["stats", "search_rank"]
+)
+
+CardStats = namedtuple("CardStats", [column.key for column in STATS_COLUMNS])
+
+_CARD_WIDTH = len(CARD_COLUMNS)
+_STATS_WIDTH = len(STATS_COLUMNS)
+
+
+def card_query(query, rank_col=None, require_stats=False):
+    """
+    Turn a Dog query (filters, joins and all) into one that selects the
+    card columns, the activity summary and, for a ranked search, the rank
+    as `search_rank`. Rows keep the column names, so keyset pagination
+    reads its sort values and ids from them as it would from entities.
+
+    With require_stats, dogs without a summary row are left out (the
+    "recent activity" order sorts on it); otherwise their stats are None.
+    """
+    if require_stats:
+        query = query.join(DogStats, DogStats.dog_id == Dog.id)
+    else:
+        query = query.outerjoin(DogStats, DogStats.dog_id == Dog.id)
+
+    columns = CARD_COLUMNS + STATS_COLUMNS
+    if rank_col is not None:
+        columns += (rank_col.label("search_rank"),)
+
+    return query.with_entities(*columns)
+
+
+def to_card(row):
+    stats = row[_CARD_WIDTH:_CARD_WIDTH + _STATS_WIDTH]
+    search_rank = row[-1] if len(row) > _CARD_WIDTH + _STATS_WIDTH else None
+
+    return DogCard(
+        *row[:_CARD_WIDTH],
+        CardStats(*stats) if stats[-1] is not None else None,
+        search_rank
+    )
+
+
+def to_cards(rows):
+    return [to_card(row) for row in rows]
@@ -0,0 +1,126 @@
+from models import db, Dog, DogMessage, DogPhoto, DogStats, Document
+
+
+DEFAULT_DETAIL_ITEMS = 100
+
+
+class DogDetail:
+    """
+    Everything the dog detail page shows. Documents and photos are newest
+    first; messages are oldest first so they render top to bottom.
+    """
+
+    def __init__(self, dog, documents, has_more_documents, photos, has_more_photos,
+                 messages, has_older_messages):
+        self.dog = dog
+        self.documents = documents
+        self.has_more_documents = has_more_documents
+        self.photos = photos
+        self.has_more_photos = has_more_photos
+        self.messages = messages
+        self.has_older_messages = has_older_messages
+
+
+def newest(model, time_column, limit_param, name):
+    """
+    A CTE of the ids of a dog's newest rows in `model`, numbered from 1
+    (newest) in the column `slot`. It is a range scan on the
+    (dog_id, time, id) index that stops after `limit_param` rows.
+    """
+    order = (time_column.desc(), model.id.desc())
+
+    return db.select(
+        model.id,
+        db.func.row_number().over(order_by=order).label("slot")
+    ).where(
+        model.dog_id == db.bindparam("dog_id")
+    ).order_by(*order).limit(db.bindparam(limit_param)).cte(name)
+
+
+def detail_statement():
+    """
+    One statement for the whole page. Each collection is numbered
+    1..limit, and rows are lined up by that number: row N carries the Nth
+    document, photo and message (any may be null), and row 0 carries the
+    dog and its stats. The result has as many rows as the longest
+    collection and no cross product.
+    """
+    documents = newest(Document, Document.uploaded_at, "item_limit", "detail_documents")
+    photos = newest(DogPhoto, DogPhoto.uploaded_at, "item_limit", "detail_photos")
+    messages = newest(DogMessage, DogMessage.created_at, "message_limit", "detail_messages")
+
+    slots = db.union(
+        db.select(db.literal_column("0").label("slot")),
+        db.select(documents.c.slot),
+        db.select(photos.c.slot),
+        db.select(messages.c.slot)
+    ).cte("detail_slots")
+
+    return db.select(
+        Dog, Document, DogPhoto, DogMessage
+    ).select_from(
+        slots
+    ).outerjoin(
+        Dog, db.and_(slots.c.slot == 0, Dog.id == db.bindparam("dog_id"))
+    ).outerjoin(
+        DogStats, DogStats.dog_id == Dog.id
+    ).outerjoin(
+        documents, documents.c.slot == slots.c.slot
+    ).outerjoin(
+        Document, Document.id == documents.c.id
+    ).outerjoin(
+        photos, photos.c.slot == slots.c.slot
+    ).outerjoin(
+        DogPhoto, DogPhoto.id == photos.c.id
+    ).outerjoin(
+        messages, messages.c.slot == slots.c.slot
+    ).outerjoin(
+        DogMessage, DogMessage.id == messages.c.id
+    ).options(
+        db.contains_eager(Dog.stats)
+    ).order_by(slots.c.slot)
+
+
+# Built once: constructing it and computing its cache key would otherwise
+# cost about as much as running it.
+DETAIL_STATEMENT = detail_statement()
+
+
+def load_dog_detail(dog_id, item_limit, message_limit):
+    """
+    Load the dog, its stats and its newest `item_limit` documents and
+    photos and `message_limit` messages in one SQL statement, so the page
+    costs one database round trip however much the dog has.
+
+    Returns None if the dog doesn't exist.
+    """
+    # One extra row per collection tells us whether there are more.
+    params = {
+        "dog_id": dog_id,
+        "item_limit": item_limit + 1,
+        "message_limit": message_limit + 1
+    }
+
+    rows = db.session.execute(DETAIL_STATEMENT, params).all()
+
+    dog = rows[0].Dog
+    if dog is None:
+        return None
+
+    dog_documents = [row.Document for row in rows[1:] if row.Document is not None]
+    dog_photos = [row.DogPhoto for row in rows[1:] if row.DogPhoto is not None]
+    dog_messages = [row.DogMessage for row in rows[1:] if row.DogMessage is not None]
+
+    has_older_messages = len(dog_messages) > message_limit
+    dog_messages = dog_messages[:message_limit]
+    dog_messages.reverse()
+
+    return DogDetail(
+        dog,
+        dog_documents[:item_limit],
+        len(dog_documents) > item_limit,
+        dog_photos[:item_limit],
+        len(dog_photos) > item_limit,
+        dog_messages,
+        has_older_messages
+    )
@@ -0,0 +1,207 @@
+from collections import Counter
+
+from sqlalchemy import event
+
+from models import db, Dog, DogMessage, DogPhoto, DogStats, Document
+
+
+# session.info keys: changes noted during a flush, applied when it ends.
+STATS_CHANGES = "dog_stats_changes"
+DELETED_DOGS = "dog_stats_deleted_dogs"
+
+# Counted child tables: model -> (dog_stats column, timestamp column).
+COUNTED = {
+    DogMessage: ("message_count", "created_at"),
+    Document: ("document_count", "uploaded_at"),
+    DogPhoto: ("photo_count", "uploaded_at"),
+}
+
+
+class StatsChange:
+    """
+    Net change to one dog's summary within a flush.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.latest = None
+        self.removed = False
+
+    def add(self, column, at):
+        self.counts[column] += 1
+        if at is not None and (self.latest is None or at > self.latest):
+            self.latest = at
+
+    def remove(self, column):
+        self.counts[column] -= 1
+        self.removed = True
+
+
+def pending_change(dog_id):
+    changes = db.session.info.setdefault(STATS_CHANGES, {})
+    return changes.setdefault(dog_id, StatsChange())
+
+
+# -------------------------
+# Expected values
+# -------------------------
+def expected_counts(dog_id_col):
+    """
+    Correlated subqueries giving each counter's true value for the dog
+    whose id is `dog_id_col`.
+    """
+    return {
+        column: db.select(db.func.count(model.id)).where(
+            model.dog_id == dog_id_col
+        ).scalar_subquery()
+        for model, (column, _) in COUNTED.items()
+    }
+
+
+def expected_last_activity(dog_id_col, dialect_name):
+    """
+    The newest of the dog's own created_at and its latest message,
+    document and photo, as one expression.
+    """
+    created_at = db.select(Dog.created_at).where(Dog.id == dog_id_col).scalar_subquery()
+
+    latest = [created_at]
+    for model, (_, time_column) in COUNTED.items():
+        newest = db.select(db.func.max(getattr(model, time_column))).where(
+            model.dog_id == dog_id_col
+        ).scalar_subquery()
+        latest.append(db.func.coalesce(newest, created_at))
+
+    # SQLite's many-argument max() is Postgres's greatest().
+    if dialect_name == "sqlite":
+        return db.func.max(*latest)
+    return db.func.greatest(*latest)
+
+
+# -------------------------
+# Keeping stats current
+# -------------------------
+@event.listens_for(Dog, "after_insert")
+def create_stats(mapper, connection, dog):
+    connection.execute(
+        DogStats.__table__.insert().values(dog_id=dog.id, last_activity_at=dog.created_at)
+    )
+
+
+@event.listens_for(Dog, "before_delete")
+def delete_stats(mapper, connection, dog):
+    """
+    Drop the summary before the dog row goes (it references the dog), and
+    skip the changes noted for its messages, documents and photos, which
+    the same flush deletes by cascade.
+    """
+    stats = DogStats.__table__
+    connection.execute(stats.delete().where(stats.c.dog_id == dog.id))
+    db.session.info.setdefault(DELETED_DOGS, set()).add(dog.id)
+
+
+def note_insert(mapper, connection, target):
+    column, time_column = COUNTED[mapper.class_]
+    pending_change(target.dog_id).add(column, getattr(target, time_column))
+
+
+def note_delete(mapper, connection, target):
+    column, _ = COUNTED[mapper.class_]
+    pending_change(target.dog_id).remove(column)
+
+
+for counted_model in COUNTED:
+    event.listen(counted_model, "after_insert", note_insert)
+    event.listen(counted_model, "after_delete", note_delete)
+
+
+@event.listens_for(db.session, "after_flush")
+def apply_stats_changes(session, flush_context):
+    """
+    Apply the flush's changes with one UPDATE per affected dog, inside
+    the same transaction. Additions move last_activity_at forward; a
+    deletion recomputes it, since the latest item may be the one removed.
+    """
+    changes = session.info.pop(STATS_CHANGES, None)
+    deleted = session.info.pop(DELETED_DOGS, set())
+    if not changes:
+        return
+
+    stats = DogStats.__table__
+    connection = session.connection()
+
+    for dog_id, change in changes.items():
+        if dog_id in deleted:
+            continue
+
+        values = {
+            column: stats.c[column] + amount
+            for column, amount in change.counts.items()
+            if amount
+        }
+
+        if change.removed:
+            values["last_activity_at"] = expected_last_activity(
+                stats.c.dog_id, connection.dialect.name
+            )
+        elif change.latest is not None:
+            values["last_activity_at"] = db.case(
+                (stats.c.last_activity_at < change.latest, change.latest),
+                else_=stats.c.last_activity_at
+            )
+
+        if values:
+            connection.execute(stats.update().where(stats.c.dog_id == dog_id).values(**values))
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def discard_stats_changes(session, previous_transaction):
+    """
+    Drop changes noted by a flush that failed before after_flush ran, so
+    they aren't applied by the next one.
+    """
+    session.info.pop(STATS_CHANGES, None)
+    session.info.pop(DELETED_DOGS, None)
+
+
+def create_stats_rows(dogs):
+    """
+    Add empty summaries for dogs inserted without the ORM (bulk import),
+    given (id, created_at) pairs.
+    """
+    db.session.execute(DogStats.__table__.insert(), [
+        {"dog_id": dog_id, "last_activity_at": created_at}
+        for dog_id, created_at in dogs
+    ])
+
+
+# -------------------------
+# Reconciling
+# -------------------------
+def reconcile_dog_stats(connection):
+    """
+    Repair drift between dog_stats and the tables it summarizes: add
+    missing rows, drop rows for deleted dogs, and recompute rows whose
+    values are wrong. Returns the number of rows touched of each kind.
+    """
+    stats = DogStats.__table__
+    dogs = Dog.__table__
+
+    missing = db.select(dogs.c.id, dogs.c.created_at).where(
+        ~db.exists().where(stats.c.dog_id == dogs.c.id)
+    )
+    created = connection.execute(
+        stats.insert().from_select(["dog_id", "last_activity_at"], missing)
+    ).rowcount
+
+    removed = connection.execute(
+        stats.delete().where(~db.exists().where(dogs.c.id == stats.c.dog_id))
+    ).rowcount
+
+    expected = expected_counts(stats.c.dog_id)
+    expected["last_activity_at"] = expected_last_activity(stats.c.dog_id, connection.dialect.name)
+
+    drifted = db.or_(*(stats.c[column] != value for column, value in expected.items()))
+    repaired = connection.execute(stats.update().where(drifted).values(**expected)).rowcount
+
+    return {"created": created, "removed": removed, "repaired": repaired}
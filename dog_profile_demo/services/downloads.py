@@ -0,0 +1,121 @@
+import mimetypes
+import os
+
+from flask import Response, current_app, request, send_file
+
+from models import db, DocumentBlob
+from services.blobs import document_upload_folder
+
+
+# Values for app.config["DOCUMENT_SENDFILE"].
+SENDFILE_NONE = ""
+SENDFILE_X_ACCEL = "x-accel-redirect"
+SENDFILE_X_SENDFILE = "x-sendfile"
+
+
+# -------------------------
+# Locating the file
+# -------------------------
+def document_file(document):
+    """
+    Work out where a document's bytes are.
+
+    Returns (absolute_path, accel_uri, etag). Deduplicated documents use
+    their content hash as the ETag. Older documents stored under /static
+    get an ETag from the file's size and mtime instead. Returns None if
+    the document isn't stored locally.
+    """
+    if document.blob_sha256:
+        blob = db.session.get(DocumentBlob, document.blob_sha256)
+        if blob is None:
+            return None
+
+        prefix = current_app.config["DOCUMENT_ACCEL_PREFIX"].rstrip("/")
+        return (
+            os.path.join(document_upload_folder(), blob.stored_filename),
+            f"{prefix}/{blob.stored_filename}",
+            blob.sha256
+        )
+
+    if document.file_url and document.file_url.startswith("/static/"):
+        relative_path = document.file_url.replace("/static/", "", 1)
+        return (
+            os.path.join(current_app.root_path, "static", relative_path),
+            document.file_url,
+            None
+        )
+
+    return None
+
+
+def document_mimetype(document):
+    return mimetypes.guess_type(document.filename)[0] or "application/octet-stream"
+
+
+# -------------------------
+# Responses
+# -------------------------
+def send_document(document, as_attachment=False):
+    """
+    Build the download response for a document, or return None if the
+    file is missing.
+
+    Handles If-None-Match (304) and Range requests (206). With
+    DOCUMENT_SENDFILE set, only headers are sent and the front proxy
+    streams the file, so no worker thread is tied up with the bytes.
+    """
+    located = document_file(document)
+    if located is None:
+        return None
+
+    file_path, accel_uri, etag = located
+
+    if not os.path.isfile(file_path):
+        return None
+
+    mode = current_app.config["DOCUMENT_SENDFILE"]
+
+    if mode in (SENDFILE_X_ACCEL, SENDFILE_X_SENDFILE):
+        response = offloaded_response(document, file_path, accel_uri, etag, mode, as_attachment)
+    else:
+        response = send_file(
+            file_path,
+            mimetype=document_mimetype(document),
+            as_attachment=as_attachment,
+            download_name=document.filename,
+            conditional=True,
+            etag=etag or True,
+            max_age=current_app.config["DOCUMENT_CACHE_SECONDS"]
+        )
+
+    # Documents sit behind a login, so shared caches must not keep them.
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config["DOCUMENT_CACHE_SECONDS"]
+    return response
+
+
+def offloaded_response(document, file_path, accel_uri, etag, mode, as_attachment):
+    """
+    An empty response telling nginx (X-Accel-Redirect) or Apache/lighttpd
+    (X-Sendfile) which file to send. The proxy handles ranges itself; the
+    ETag check happens here so a 304 never reaches the proxy's file read.
+    """
+    response = Response(mimetype=document_mimetype(document))
+
+    disposition = "attachment" if as_attachment else "inline"
+    response.headers.set("Content-Disposition", disposition, filename=document.filename)
+
+    if mode == SENDFILE_X_ACCEL:
+        response.headers["X-Accel-Redirect"] = accel_uri
+    else:
+        response.headers["X-Sendfile"] = os.path.abspath(file_path)
+
+    if etag:
+        response.set_etag(etag)
+    else:
+        stat = os.stat(file_path)
+        response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+    response.headers.pop("Content-Length", None)
+    return response.make_conditional(request)
@@ -0,0 +1,87 @@
+from models import db, Dog
+from services.breeds import breed_index
+
+
+# Facets shown on the dog list, in form order. Each counts dogs under
+# every active filter except its own, so picking another value of the
+# same facet shows how many dogs it would return.
+GROUPED_FACETS = ("status", "size", "gender", "breed")
+
+# Only the most common breeds are listed; the breed box still takes any text.
+BREED_FACET_LIMIT = 12
+
+# Breeds are counted per dictionary entry, so "Lab" and "Labrador
+# Retriever" are one facet value, named from the in-memory breed index.
+FACET_COLUMNS = {"breed": Dog.breed_id}
+
+# Friendliness is free text, so it is faceted on common words, matched
+# the same way as the friendliness filter (case-insensitive "contains").
+FRIENDLINESS_TAGS = ("kids", "dogs", "cat", "shy")
+
+
+def grouped_counts(query, facet, limit=None):
+    column = FACET_COLUMNS.get(facet, getattr(Dog, facet))
+
+    if facet in FACET_COLUMNS:
+        # UNION ALL needs one type for the value column.
+        value = db.cast(column, db.String)
+        present = column.isnot(None)
+    else:
+        value = column
+        present = db.and_(column.isnot(None), column != "")
+
+    statement = query.with_entities(
+        db.literal(facet).label("facet"),
+        value.label("value"),
+        db.func.count(Dog.id).label("dogs")
+    ).filter(present).group_by(column).statement
+
+    if limit:
+        # A LIMIT inside UNION ALL needs its own subquery.
+        limited = statement.order_by(db.func.count(Dog.id).desc()).limit(limit).subquery()
+        statement = db.select(limited.c.facet, limited.c.value, limited.c.dogs)
+
+    return statement
+
+
+def tag_count(query, tag):
+    return query.with_entities(
+        db.literal("friendliness").label("facet"),
+        db.literal(tag).label("value"),
+        db.func.count(Dog.id).label("dogs")
+    ).filter(
+        Dog.friendliness.ilike(f"%{tag}%")
+    ).statement
+
+
+def facet_counts(base_query, filters, apply_filters):
+    """
+    Count dogs per facet value in one UNION ALL query.
+
+    `base_query` is the dog query before the form filters (it may already
+    be narrowed by a text search), and `apply_filters(query, filters)`
+    applies them. Returns {facet: {value: count}}, largest counts first.
+    """
+    def without(facet):
+        others = {name: value for name, value in filters.items() if name != facet}
+        return apply_filters(base_query, others)
+
+    parts = [
+        grouped_counts(without(facet), facet, BREED_FACET_LIMIT if facet == "breed" else None)
+        for facet in GROUPED_FACETS
+    ]
+    friendliness_query = without("friendliness")
+    parts.extend(tag_count(friendliness_query, tag) for tag in FRIENDLINESS_TAGS)
+
+    rows = db.session.execute(db.union_all(*parts)).all()
+
+    breed_names = breed_index().names
+
+    counts = {facet: {} for facet in GROUPED_FACETS + ("friendliness",)}
+    for facet, value, dogs in sorted(rows, key=lambda row: -row.dogs):
+        if facet == "breed":
+            value = breed_names.get(int(value))
+            if value is None:
+                continue
+        counts[facet][value] = dogs
+    return counts
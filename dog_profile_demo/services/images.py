@@ -0,0 +1,148 @@
+import json
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# Widths generated for every photo. Sources smaller than a width are
+# never upscaled; the source's own width is used as the largest size.
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+# -------------------------
+# Variant generation
+# -------------------------
+def load_normalized(source_path):
+    """
+    Open an image and rotate it upright according to its EXIF orientation.
+    The returned copy carries no EXIF data, so nothing saved from it
+    leaks camera or GPS metadata.
+    """
+    with Image.open(source_path) as img:
+        img.load()
+        upright = ImageOps.exif_transpose(img)
+
+    upright.info.pop("exif", None)
+    return upright
+
+
+def flatten_for_jpeg(img):
+    """
+    JPEG has no alpha channel, so composite transparent images onto white.
+    """
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+
+    return img.convert("RGB")
+
+
+def variant_widths(source_width):
+    widths = [width for width in VARIANT_WIDTHS if width < source_width]
+    widths.append(min(source_width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build_variants(source_path, output_folder):
+    """
+    Write resized JPEG and WebP copies of an image to output_folder.
+
+    Returns a list of (format, width, path), smallest first. Animated
+    images, and formats Pillow can't read, return an empty list and are
+    uploaded as they are.
+    """
+    try:
+        with Image.open(source_path) as probe:
+            if getattr(probe, "is_animated", False):
+                return []
+    except UnidentifiedImageError:
+        return []
+
+    img = load_normalized(source_path)
+    jpeg_base = flatten_for_jpeg(img)
+    webp_base = img if img.mode in ("RGB", "RGBA") else img.convert("RGBA")
+
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    variants = []
+
+    for width in variant_widths(img.width):
+        height = max(1, round(img.height * width / img.width))
+
+        jpeg_path = os.path.join(output_folder, f"{stem}-{width}.jpg")
+        jpeg_base.resize((width, height), Image.LANCZOS).save(
+            jpeg_path,
+            "JPEG",
+            quality=JPEG_QUALITY,
+            optimize=True,
+            progressive=True
+        )
+        variants.append(("jpeg", width, jpeg_path))
+
+        webp_path = os.path.join(output_folder, f"{stem}-{width}.webp")
+        webp_base.resize((width, height), Image.LANCZOS).save(
+            webp_path,
+            "WEBP",
+            quality=WEBP_QUALITY,
+            method=4
+        )
+        variants.append(("webp", width, webp_path))
+
+    return variants
+
+
+def process_and_upload(source_path, uploader):
+    """
+    Build the variants for a spooled image and upload each one.
+
+    Returns (image_url, variants_json). image_url is the largest JPEG,
+    so even clients that ignore srcset get an EXIF-free, upright image.
+    The variant files are removed once uploaded.
+    """
+    output_folder = os.path.dirname(source_path)
+    variants = build_variants(source_path, output_folder)
+
+    if not variants:
+        return uploader(source_path), None
+
+    urls = {"jpeg": {}, "webp": {}}
+
+    try:
+        for fmt, width, path in variants:
+            urls[fmt][str(width)] = uploader(path)
+    finally:
+        for _, _, path in variants:
+            if os.path.exists(path):
+                os.remove(path)
+
+    largest = str(max(width for _, width, _ in variants))
+    return urls["jpeg"][largest], json.dumps(urls)
+
+
+# -------------------------
+# Template helpers
+# -------------------------
+def parse_variants(variants_json):
+    if not variants_json:
+        return {}
+
+    try:
+        return json.loads(variants_json)
+    except ValueError:
+        return {}
+
+
+def srcset(variants_json, fmt="jpeg"):
+    """
+    Build a srcset attribute value ("url 160w, url 320w, ...") for one format.
+    """
+    sizes = parse_variants(variants_json).get(fmt, {})
+
+    return ", ".join(
+        f"{url} {width}w"
+        for width, url in sorted(sizes.items(), key=lambda item: int(item[0]))
+    )
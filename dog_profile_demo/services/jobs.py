@@ -0,0 +1,213 @@
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from models import db, Job
+
+
+logger = logging.getLogger(__name__)
+
+
+# Retry backoff: base * 2^attempt seconds, capped, with a little jitter.
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 15 * 60
+
+# A job left "running" this long is assumed to belong to a dead worker.
+LOCK_TIMEOUT_SECONDS = 10 * 60
+
+# How often a running worker looks for such jobs (and runs its
+# housekeeping), so one worker dying doesn't leave its job stuck until
+# the others restart.
+RELEASE_STALE_EVERY_SECONDS = 60
+
+# Jobs run between those checks when the queue never empties.
+JOBS_PER_PASS = 50
+
+JOB_HANDLERS = {}
+
+
+# -------------------------
+# Handler registry
+# -------------------------
+def job_handler(kind):
+    """
+    Register a function as the handler for a job kind.
+
+    Example:
+        @job_handler("upload_dog_image")
+        def upload_dog_image(payload): ...
+    """
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+# -------------------------
+# Producing jobs
+# -------------------------
+def enqueue(kind, payload, max_attempts=5):
+    """
+    Add a job to the current session. It becomes visible to workers
+    when the caller commits, together with the rest of the request's
+    changes.
+    """
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+
+# -------------------------
+# Consuming jobs
+# -------------------------
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), RETRY_MAX_SECONDS)
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def release_stale_jobs():
+    """
+    Put jobs whose worker died mid-run back in the queue.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+
+    released = Job.query.filter(
+        Job.status == "running",
+        Job.locked_at < cutoff
+    ).update(
+        {Job.status: "queued", Job.locked_at: None},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return released
+
+
+def claim_next_job():
+    """
+    Atomically claim the oldest runnable job, or return None.
+
+    The claim is a conditional UPDATE on status, so two workers racing
+    for the same row can't both win. On Postgres the candidate SELECT
+    also skips rows another worker has locked.
+    """
+    now = datetime.utcnow()
+
+    candidate = db.session.query(Job.id).filter(
+        Job.status == "queued",
+        Job.run_after <= now
+    ).order_by(Job.run_after, Job.id)
+
+    if db.engine.dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+
+    job_id = candidate.limit(1).scalar()
+
+    if job_id is None:
+        db.session.rollback()
+        return None
+
+    claimed = Job.query.filter(
+        Job.id == job_id,
+        Job.status == "queued"
+    ).update(
+        {Job.status: "running", Job.locked_at: now},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    if not claimed:
+        return None
+
+    return db.session.get(Job, job_id)
+
+
+def run_job(job):
+    """
+    Run one claimed job and record the outcome.
+    Returns True if the job succeeded.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'.")
+
+        handler(json.loads(job.payload))
+
+    except Exception as e:
+        db.session.rollback()
+
+        job.attempts += 1
+        job.last_error = str(e)
+        job.locked_at = None
+
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            logger.error("Job %s (%s) failed permanently: %s", job.id, job.kind, e)
+        else:
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning(
+                "Job %s (%s) failed on attempt %s, retrying: %s",
+                job.id, job.kind, job.attempts, e
+            )
+
+        db.session.commit()
+        return False
+
+    job.attempts += 1
+    job.status = "done"
+    job.locked_at = None
+    job.last_error = None
+    db.session.commit()
+    return True
+
+
+def run_pending_jobs(limit=None):
+    """
+    Run runnable jobs until the queue is empty (or `limit` jobs have run).
+    Returns the number of jobs processed.
+    """
+    processed = 0
+
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+
+        run_job(job)
+        processed += 1
+
+    return processed
+
+
+def work(poll_interval=2.0, stop=None, housekeeping=()):
+    """
+    Worker loop: drain the queue, then sleep until there's more to do.
+    `stop` is an optional callable that ends the loop when it returns True.
+    `housekeeping` callables run alongside the stale job check.
+    """
+    next_release = 0.0
+
+    while not (stop and stop()):
+        if time.monotonic() >= next_release:
+            release_stale_jobs()
+
+            for task in housekeeping:
+                try:
+                    task()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Housekeeping task %s failed.", task.__name__)
+
+            next_release = time.monotonic() + RELEASE_STALE_EVERY_SECONDS
+
+        if not run_pending_jobs(limit=JOBS_PER_PASS):
+            time.sleep(poll_interval)
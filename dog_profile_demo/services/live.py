@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import defaultdict
+
+
+# =========================
+# Live chat notifications
+# =========================
+# Gunicorn's gthread workers give every open response its own thread,
+# so a stream held open by an idle browser tab costs a whole thread.
+# This is not a push server: each live client holds a thread, from a
+# pool set aside for them, and the rest poll. To keep that bounded:
+#
+# - streams and long-polls are capped per worker (LIVE_MAX_WAITERS), and
+#   gunicorn.conf.py adds that many threads to each worker on top of
+#   WEB_THREADS, so waiters never starve page requests,
+# - clients over the cap get an immediate answer and fall back to
+#   short polling every LIVE_POLL_INTERVAL seconds,
+# - every stream ends after LIVE_STREAM_SECONDS and the browser
+#   reconnects with Last-Event-ID, so threads are recycled,
+# - waiters release their DB connection between checks.
+#
+# Posts and deletes in this worker wake waiters right away. Those in
+# the other worker are picked up by the periodic DB check.
+
+_condition = threading.Condition()
+_dog_versions = defaultdict(int)
+
+_slots_lock = threading.Lock()
+_slots = {"limit": None, "semaphore": None}
+
+
+def notify_thread_changed(dog_id):
+    """
+    Wake any stream or long-poll in this process that is waiting on
+    the given dog's thread, after a message is posted or deleted.
+    """
+    with _condition:
+        _dog_versions[dog_id] += 1
+        _condition.notify_all()
+
+
+def current_version(dog_id):
+    with _condition:
+        return _dog_versions[dog_id]
+
+
+def wait_for_message(dog_id, seen_version, timeout):
+    """
+    Block until the dog's thread changes in this process, or until
+    `timeout` seconds pass. Returns the latest local version.
+    """
+    with _condition:
+        _condition.wait_for(
+            lambda: _dog_versions[dog_id] != seen_version,
+            timeout=timeout
+        )
+        return _dog_versions[dog_id]
+
+
+def acquire_waiter_slot(limit):
+    """
+    Try to reserve one of the per-worker slots for a long-lived
+    request. Returns False straight away if they're all in use.
+    """
+    with _slots_lock:
+        if _slots["limit"] != limit:
+            _slots["limit"] = limit
+            _slots["semaphore"] = threading.BoundedSemaphore(limit)
+        semaphore = _slots["semaphore"]
+
+    return semaphore.acquire(blocking=False), semaphore
+
+
+def deadline(seconds):
+    return time.monotonic() + seconds
+
+
+def remaining(until):
+    return max(0.0, until - time.monotonic())
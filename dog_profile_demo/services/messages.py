@@ -0,0 +1,143 @@
+from models import db, DogMessage
+
+
+DEFAULT_MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
+# -------------------------
+# Thread queries
+# -------------------------
+# All of these are range scans on ix_dog_messages_dog_id_created_at
+# (dog_id, created_at, id), so cost depends on the page size and not
+# on how long the thread is.
+
+def thread_query(dog_id):
+    return DogMessage.query.filter(DogMessage.dog_id == dog_id)
+
+
+def recent_messages(dog_id, limit):
+    """
+    Return (messages, has_older) for the newest `limit` messages,
+    oldest first so they render top to bottom.
+    """
+    rows = thread_query(dog_id).order_by(
+        DogMessage.created_at.desc(),
+        DogMessage.id.desc()
+    ).limit(limit + 1).all()
+
+    has_older = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+
+    return rows, has_older
+
+
+def first_messages(dog_id, limit):
+    """
+    Return (messages, has_newer) for the oldest `limit` messages.
+    """
+    rows = thread_query(dog_id).order_by(
+        DogMessage.created_at.asc(),
+        DogMessage.id.asc()
+    ).limit(limit + 1).all()
+
+    has_newer = len(rows) > limit
+    return rows[:limit], has_newer
+
+
+def messages_before(dog_id, anchor, limit):
+    """
+    Return (messages, has_older) for up to `limit` messages older than
+    `anchor`, oldest first.
+    """
+    rows = thread_query(dog_id).filter(
+        db.or_(
+            DogMessage.created_at < anchor.created_at,
+            db.and_(
+                DogMessage.created_at == anchor.created_at,
+                DogMessage.id < anchor.id
+            )
+        )
+    ).order_by(
+        DogMessage.created_at.desc(),
+        DogMessage.id.desc()
+    ).limit(limit + 1).all()
+
+    has_older = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+
+    return rows, has_older
+
+
+def messages_after(dog_id, anchor, limit):
+    """
+    Return (messages, has_newer) for up to `limit` messages newer than
+    `anchor`, oldest first.
+    """
+    rows = thread_query(dog_id).filter(
+        db.or_(
+            DogMessage.created_at > anchor.created_at,
+            db.and_(
+                DogMessage.created_at == anchor.created_at,
+                DogMessage.id > anchor.id
+            )
+        )
+    ).order_by(
+        DogMessage.created_at.asc(),
+        DogMessage.id.asc()
+    ).limit(limit + 1).all()
+
+    has_newer = len(rows) > limit
+    return rows[:limit], has_newer
+
+
+def message_from(dog_id, message_id):
+    """
+    Return the thread's first message with an id of at least
+    `message_id`, or None.
+    """
+    return thread_query(dog_id).filter(
+        DogMessage.id >= message_id
+    ).order_by(DogMessage.id.asc()).first()
+
+
+def message_ids_between(dog_id, first, last, limit):
+    """
+    Return the ids of the messages from `first` to `last`, both
+    included, oldest first. Only the newest `limit` are returned.
+    """
+    rows = db.session.query(DogMessage.id).filter(
+        DogMessage.dog_id == dog_id,
+        db.or_(
+            DogMessage.created_at > first.created_at,
+            db.and_(
+                DogMessage.created_at == first.created_at,
+                DogMessage.id >= first.id
+            )
+        ),
+        db.or_(
+            DogMessage.created_at < last.created_at,
+            db.and_(
+                DogMessage.created_at == last.created_at,
+                DogMessage.id <= last.id
+            )
+        )
+    ).order_by(
+        DogMessage.created_at.desc(),
+        DogMessage.id.desc()
+    ).limit(limit).all()
+
+    return [row.id for row in reversed(rows)]
+
+
+def message_to_dict(message):
+    return {
+        "id": message.id,
+        "dog_id": message.dog_id,
+        "sender_name": message.sender_name,
+        "sender_role": message.sender_role,
+        "message": message.message,
+        "created_at": message.created_at.isoformat()
+    }
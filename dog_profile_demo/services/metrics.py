@@ -0,0 +1,184 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py), every worker
+# process writes its samples to files in that folder and /metrics merges
+# them, so a scrape sees totals for the whole server, not one worker.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+# -------------------------
+# Metric definitions
+# -------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, by endpoint.",
+    ["endpoint", "method"]
+)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests handled, by endpoint and status code.",
+    ["endpoint", "method", "status"]
+)
+
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size, by endpoint. Streamed responses are not counted.",
+    ["endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+
+DB_STATEMENTS = Histogram(
+    "db_statements_per_request",
+    "SQL statements run while handling one request.",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+
+DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent in SQL statements while handling one request.",
+    ["endpoint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+CLOUDINARY_LATENCY = Histogram(
+    "cloudinary_call_duration_seconds",
+    "Cloudinary API call latency.",
+    ["operation", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+
+
+# -------------------------
+# SQL statement timing
+# -------------------------
+# Listening on the Engine class covers every engine the app creates. The
+# handlers only touch a dict on the connection and `g`, so they cost a
+# couple of microseconds per statement.
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started_at")
+    if not started:
+        return
+
+    elapsed = time.perf_counter() - started.pop()
+
+    if has_request_context() and "metrics_db_statements" in g:
+        g.metrics_db_statements += 1
+        g.metrics_db_time += elapsed
+
+
+# -------------------------
+# Request instrumentation
+# -------------------------
+def endpoint_label():
+    return request.endpoint or "unmatched"
+
+
+def start_request_timer():
+    g.metrics_started_at = time.perf_counter()
+    g.metrics_db_statements = 0
+    g.metrics_db_time = 0.0
+
+
+def record_request(response):
+    started = g.pop("metrics_started_at", None)
+    if started is None:
+        return response
+
+    endpoint = endpoint_label()
+
+    REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    DB_STATEMENTS.labels(endpoint).observe(g.metrics_db_statements)
+    DB_TIME.labels(endpoint).observe(g.metrics_db_time)
+
+    if not response.is_streamed:
+        size = response.calculate_content_length()
+        if size is not None:
+            RESPONSE_SIZE.labels(endpoint).observe(size)
+
+    return response
+
+
+def init_metrics(app):
+    """
+    Time every request and count its SQL statements. Latency covers the
+    view and template render; for streamed responses (SSE, exports) it
+    stops when the headers are sent.
+    """
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
+
+
+# -------------------------
+# Cloudinary calls
+# -------------------------
+@contextmanager
+def observe_cloudinary(operation):
+    """
+    Time a Cloudinary call, labelled with whether it raised.
+
+    Example:
+        with observe_cloudinary("upload"):
+            cloudinary.uploader.upload(...)
+    """
+    started = time.perf_counter()
+    outcome = "error"
+
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        CLOUDINARY_LATENCY.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+# -------------------------
+# Exposition
+# -------------------------
+def metrics_registry():
+    if not MULTIPROCESS:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_response():
+    """
+    Render all metrics in the Prometheus text format. If METRICS_TOKEN is
+    set, the scraper must send it as a bearer token.
+    """
+    token = current_app.config.get("METRICS_TOKEN")
+
+    if token:
+        sent = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(sent, token):
+            return Response("Unauthorized\n", status=401, mimetype="text/plain")
+
+    return Response(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,372 @@
+from datetime import datetime
+
+from models import db
+from services.breeds import link_dog_breeds, seed_breeds
+from services.dog_stats import reconcile_dog_stats
+from services.search import POSTGRES_SEARCH_INDEXES, create_search_index, populate_search_index
+
+
+# =========================
+# Migration registry
+# =========================
+# Every migration is additive and idempotent: it creates what is missing
+# and never drops tables, columns or rows. Applied versions are recorded
+# in schema_migrations so each one runs once per database.
+#
+# Indexes are listed separately from the transactional DDL so that on
+# Postgres they can be built with CREATE INDEX CONCURRENTLY, which can't
+# run inside a transaction but doesn't block writes while it builds.
+# Each is (name, table, columns), optionally followed by a dict of
+# create_index options (index method, dialect).
+
+MIGRATIONS = []
+
+
+class Migration:
+    def __init__(self, version, description, apply=None, indexes=()):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.indexes = indexes
+
+
+def migration(version, description, indexes=()):
+    """
+    Register a migration function. The function receives a connection
+    inside a transaction.
+    """
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func, indexes))
+        return func
+    return decorator
+
+
+def index_only_migration(version, description, indexes):
+    """
+    Register a migration that only creates indexes.
+    """
+    MIGRATIONS.append(Migration(version, description, None, indexes))
+
+
+# -------------------------
+# Schema helpers
+# -------------------------
+def column_exists(conn, table_name, column_name):
+    columns = db.inspect(conn).get_columns(table_name)
+    return any(column["name"] == column_name for column in columns)
+
+
+def create_table_if_missing(conn, table_name):
+    """
+    Create a table from its model definition if it doesn't exist yet.
+    """
+    db.metadata.tables[table_name].create(conn, checkfirst=True)
+
+
+def add_column_if_missing(conn, table_name, column_name, column_ddl):
+    """
+    Add a column to an existing table if it isn't there yet.
+    """
+    if not column_exists(conn, table_name, column_name):
+        conn.exec_driver_sql(
+            f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}"
+        )
+
+
+def boolean_default(conn, value):
+    """
+    Return a BOOLEAN default literal the current database understands.
+    """
+    if conn.dialect.name == "postgresql":
+        return "true" if value else "false"
+    return "1" if value else "0"
+
+
+def create_index(engine, name, table_name, columns, using=None, dialect=None):
+    """
+    Create an index if it doesn't exist. `columns` may be expressions;
+    `using` names an index method (e.g. GIN), and `dialect` limits the
+    index to one database.
+
+    On Postgres this uses CREATE INDEX CONCURRENTLY on an autocommit
+    connection. A failed concurrent build leaves an INVALID index behind,
+    so one of those is dropped and rebuilt rather than skipped.
+    """
+    if dialect and engine.dialect.name != dialect:
+        return
+
+    column_list = ", ".join(columns)
+    method = f"USING {using} " if using else ""
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = conn.exec_driver_sql(
+                "SELECT 1 FROM pg_class c "
+                "JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = %(name)s AND NOT i.indisvalid",
+                {"name": name}
+            ).first()
+
+            if invalid:
+                conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+            conn.exec_driver_sql(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table_name} {method}({column_list})"
+            )
+    else:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} {method}({column_list})"
+            )
+
+
+# =========================
+# Baseline tables
+# =========================
+# Migration 1 creates the original tables as they were before any
+# migration, not from models.py: a later column with a foreign key to a
+# later table (documents.blob_sha256, dogs.breed_id) would otherwise be
+# created before the table it references. Later columns come from their
+# own migrations.
+BASELINE = db.MetaData()
+
+db.Table(
+    "users",
+    BASELINE,
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("username", db.String(100), unique=True, nullable=False),
+    db.Column("password_hash", db.String(255), nullable=False),
+    db.Column("role", db.String(50), nullable=False),
+    db.Column("created_at", db.DateTime, nullable=False),
+)
+
+db.Table(
+    "dogs",
+    BASELINE,
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("name", db.String(100), nullable=False),
+    db.Column("breed", db.String(100)),
+    db.Column("age", db.String(50)),
+    db.Column("gender", db.String(20)),
+    db.Column("size", db.String(50)),
+    db.Column("friendliness", db.String(255)),
+    db.Column("status", db.String(50), nullable=False),
+    db.Column("image_url", db.String(500)),
+    db.Column("immediate_foster", db.Boolean, nullable=False),
+    db.Column("created_at", db.DateTime, nullable=False),
+)
+
+db.Table(
+    "dog_photos",
+    BASELINE,
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("dog_id", db.Integer, db.ForeignKey("dogs.id"), nullable=False),
+    db.Column("image_url", db.String(500), nullable=False),
+    db.Column("caption", db.String(255)),
+    db.Column("uploaded_at", db.DateTime, nullable=False),
+)
+
+db.Table(
+    "documents",
+    BASELINE,
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("dog_id", db.Integer, db.ForeignKey("dogs.id"), nullable=False),
+    db.Column("filename", db.String(255), nullable=False),
+    db.Column("file_url", db.String(500), nullable=False),
+    db.Column("document_type", db.String(100)),
+    db.Column("notes", db.Text),
+    db.Column("uploaded_by", db.Integer, db.ForeignKey("users.id"), nullable=True),
+    db.Column("uploaded_by_name", db.String(100)),
+    db.Column("uploaded_at", db.DateTime, nullable=False),
+)
+
+db.Table(
+    "dog_messages",
+    BASELINE,
+    db.Column("id", db.Integer, primary_key=True),
+    db.Column("dog_id", db.Integer, db.ForeignKey("dogs.id"), nullable=False),
+    db.Column("user_id", db.Integer, db.ForeignKey("users.id"), nullable=True),
+    db.Column("sender_name", db.String(100)),
+    db.Column("sender_role", db.String(50)),
+    db.Column("message", db.Text, nullable=False),
+    db.Column("created_at", db.DateTime, nullable=False),
+)
+
+
+# =========================
+# Migrations
+# =========================
+@migration(1, "Create base tables")
+def create_base_tables(conn):
+    BASELINE.create_all(conn, checkfirst=True)
+
+
+@migration(2, "Add dog columns missing from the original schema.sql")
+def add_dog_profile_columns(conn):
+    add_column_if_missing(conn, "dogs", "gender", "VARCHAR(20)")
+    add_column_if_missing(
+        conn,
+        "dogs",
+        "immediate_foster",
+        f"BOOLEAN NOT NULL DEFAULT {boolean_default(conn, False)}"
+    )
+
+
+@migration(3, "Create cache version stamps")
+def create_cache_versions(conn):
+    create_table_if_missing(conn, "cache_versions")
+
+
+index_only_migration(
+    4,
+    "Index the dog list and per-dog collections",
+    indexes=(
+        ("ix_dogs_created_at_id", "dogs", ("created_at", "id")),
+        ("ix_dogs_status_created_at", "dogs", ("status", "created_at", "id")),
+        ("ix_dogs_foster_created_at", "dogs", ("immediate_foster", "created_at", "id")),
+        ("ix_documents_dog_id_uploaded_at", "documents", ("dog_id", "uploaded_at")),
+        ("ix_dog_messages_dog_id_created_at", "dog_messages", ("dog_id", "created_at", "id")),
+        ("ix_dog_photos_dog_id_uploaded_at", "dog_photos", ("dog_id", "uploaded_at")),
+    )
+)
+
+
+@migration(5, "Create the full-text search index", indexes=POSTGRES_SEARCH_INDEXES)
+def create_dog_search_index(conn):
+    create_search_index(conn)
+    populate_search_index(conn)
+
+
+@migration(
+    6,
+    "Create the background job queue",
+    indexes=(
+        ("ix_jobs_status_run_after", "jobs", ("status", "run_after", "id")),
+    )
+)
+def create_jobs(conn):
+    create_table_if_missing(conn, "jobs")
+
+
+@migration(7, "Store resized image variants for dogs and photos")
+def add_image_variants(conn):
+    add_column_if_missing(conn, "dogs", "image_variants", "TEXT")
+    add_column_if_missing(conn, "dog_photos", "image_variants", "TEXT")
+
+
+@migration(8, "Create chunked upload sessions")
+def create_upload_sessions(conn):
+    create_table_if_missing(conn, "upload_sessions")
+
+
+@migration(
+    9,
+    "Store documents as shared, content-addressed blobs",
+    indexes=(
+        ("ix_documents_blob_sha256", "documents", ("blob_sha256",)),
+    )
+)
+def create_document_blobs(conn):
+    create_table_if_missing(conn, "document_blobs")
+    add_column_if_missing(
+        conn,
+        "documents",
+        "blob_sha256",
+        "VARCHAR(64) REFERENCES document_blobs(sha256)"
+    )
+
+
+@migration(
+    10,
+    "Summarize each dog's messages, documents and photos",
+    indexes=(
+        ("ix_dog_stats_last_activity_at", "dog_stats", ("last_activity_at", "dog_id")),
+    )
+)
+def create_dog_stats(conn):
+    create_table_if_missing(conn, "dog_stats")
+    reconcile_dog_stats(conn)
+
+
+@migration(
+    11,
+    "Link dogs to a breed dictionary with aliases",
+    indexes=(
+        ("ix_dogs_breed_created_at", "dogs", ("breed_id", "created_at", "id")),
+    )
+)
+def create_breeds(conn):
+    create_table_if_missing(conn, "breeds")
+    create_table_if_missing(conn, "breed_aliases")
+    add_column_if_missing(conn, "dogs", "breed_id", "INTEGER REFERENCES breeds(id)")
+    seed_breeds(conn)
+    link_dog_breeds(conn)
+
+
+# =========================
+# Runner
+# =========================
+def ensure_migrations_table(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(255) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        )
+
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT version FROM schema_migrations").fetchall()
+    return {row[0] for row in rows}
+
+
+def pending_migrations(engine=None):
+    """
+    Return the migrations not yet applied to this database, in order.
+    """
+    engine = engine or db.engine
+    ensure_migrations_table(engine)
+    applied = applied_versions(engine)
+
+    return [
+        m for m in sorted(MIGRATIONS, key=lambda m: m.version)
+        if m.version not in applied
+    ]
+
+
+def run_migrations(engine=None, log=print):
+    """
+    Apply every pending migration and return the versions applied.
+    """
+    engine = engine or db.engine
+    applied = []
+
+    for m in pending_migrations(engine):
+        log(f"Applying migration {m.version}: {m.description}")
+
+        if m.apply:
+            with engine.begin() as conn:
+                m.apply(conn)
+
+        for name, table_name, columns, *options in m.indexes:
+            create_index(engine, name, table_name, columns, **(options[0] if options else {}))
+
+        with engine.begin() as conn:
+            conn.execute(
+                db.text(
+                    "INSERT INTO schema_migrations (version, description, applied_at) "
+                    "VALUES (:version, :description, :applied_at)"
+                ),
+                {
+                    "version": m.version,
+                    "description": m.description,
+                    "applied_at": datetime.utcnow()
+                }
+            )
+
+        applied.append(m.version)
+
+    return applied
@@ -0,0 +1,157 @@
+import base64
+from datetime import datetime
+
+from models import db
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """
+    A cursor for a different sort than the list it was sent to, e.g. a
+    date cursor reused on a ranked search after the query changed.
+    """
+
+
+# -------------------------
+# Cursor encoding
+# -------------------------
+def encode_cursor(sort_value, row_id):
+    """
+    Turn a (sort value, id) pair into an opaque, URL-safe cursor string.
+    The sort value is either a timestamp or a number (e.g. a search rank).
+    """
+    if isinstance(sort_value, datetime):
+        encoded_value = "d:" + sort_value.isoformat()
+    else:
+        encoded_value = "f:" + repr(float(sort_value))
+
+    raw = f"{encoded_value}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Turn a cursor string back into a (sort value, id) pair.
+    Returns None if the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        value_part, id_part = raw.rsplit("|", 1)
+        kind, value = value_part.split(":", 1)
+
+        if kind == "d":
+            sort_value = datetime.fromisoformat(value)
+        elif kind == "f":
+            sort_value = float(value)
+        else:
+            return None
+
+        return sort_value, int(id_part)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Read a page size from a request argument and clamp it to a sane range.
+    """
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+
+    return max(1, min(size, maximum))
+
+
+# -------------------------
+# Keyset pagination
+# -------------------------
+class KeysetPage:
+    """
+    One page of results plus the cursors needed to move forward or back.
+    """
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def paginate_keyset(query, sort_col, id_col, page_size, after=None, before=None,
+                    sort_attr=None):
+    """
+    Page through a query in descending (sort_col, id) order.
+
+    `after` continues past the given cursor (further down the list) and
+    `before` goes back towards the top. Each page is a single indexed
+    range scan of page_size + 1 rows, so page N costs the same as page 1.
+
+    `sort_attr` names the attribute holding the sort value on each row,
+    for when sort_col isn't a plain model column (e.g. a search rank).
+
+    Raises InvalidCursor if a cursor's value doesn't fit sort_col.
+    """
+    sort_attr = sort_attr or sort_col.key
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    expected = datetime if isinstance(sort_col.type, db.DateTime) else float
+    for key in (after_key, before_key):
+        if key and not isinstance(key[0], expected):
+            raise InvalidCursor("The cursor doesn't belong to this list; start from the first page.")
+
+    if before_key:
+        sort_value, row_id = before_key
+        query = query.filter(
+            db.or_(
+                sort_col > sort_value,
+                db.and_(sort_col == sort_value, id_col > row_id)
+            )
+        ).order_by(sort_col.asc(), id_col.asc())
+    else:
+        if after_key:
+            sort_value, row_id = after_key
+            query = query.filter(
+                db.or_(
+                    sort_col < sort_value,
+                    db.and_(sort_col == sort_value, id_col < row_id)
+                )
+            )
+        query = query.order_by(sort_col.desc(), id_col.desc())
+
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if before_key:
+        rows.reverse()
+
+    if not rows:
+        return KeysetPage([])
+
+    first_cursor = encode_cursor(getattr(rows[0], sort_attr), rows[0].id)
+    last_cursor = encode_cursor(getattr(rows[-1], sort_attr), rows[-1].id)
+
+    if before_key:
+        next_cursor = last_cursor
+        prev_cursor = first_cursor if has_more else None
+    else:
+        next_cursor = last_cursor if has_more else None
+        prev_cursor = first_cursor if after_key else None
+
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
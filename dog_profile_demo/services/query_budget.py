@@ -0,0 +1,177 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+# The same statement shape this many times in one request is reported
+# as a likely N+1 (a lazy load per row).
+REPEATED_SHAPE_THRESHOLD = 3
+
+# Writes that repeat by design rather than per row: a route bumps one
+# cache version stamp per cache it invalidates.
+_EXPECTED_REPEATS = re.compile(r"^(?:UPDATE|INSERT INTO) cache_versions\b", re.IGNORECASE)
+
+# Values for app.config["QUERY_BUDGET"]. Unset means "raise" in debug and
+# test mode, "off" otherwise.
+BUDGET_OFF = "off"
+BUDGET_WARN = "warn"
+BUDGET_RAISE = "raise"
+
+UNBOUNDED = object()
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    A request ran more SQL statements than its route's budget allows.
+    """
+
+
+# -------------------------
+# Declaring budgets
+# -------------------------
+def query_budget(max_statements):
+    """
+    Declare the most SQL statements a route may run per request.
+
+    Pass None for routes whose statement count grows with their input
+    by design (e.g. batched imports); those are recorded but never fail.
+
+    Example:
+        @dogs_bp.route("/dog/<int:dog_id>")
+        @query_budget(6)
+        def dog_detail(dog_id): ...
+    """
+    def decorator(view_func):
+        view_func.query_budget = UNBOUNDED if max_statements is None else max_statements
+        return view_func
+    return decorator
+
+
+def route_budget():
+    view_func = current_app.view_functions.get(request.endpoint)
+    return getattr(view_func, "query_budget", None)
+
+
+def budget_mode():
+    mode = current_app.config.get("QUERY_BUDGET")
+    if mode:
+        return mode
+    return BUDGET_RAISE if current_app.debug or current_app.testing else BUDGET_OFF
+
+
+# -------------------------
+# Recording statements
+# -------------------------
+@event.listens_for(Engine, "before_cursor_execute")
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "query_log" in g and not g.get("query_log_paused"):
+        g.query_log.append(statement)
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Don't count the statements run inside the block. For refreshing a
+    process-wide cache: whichever request happens to refresh it shouldn't
+    be held to a budget set for the many that don't.
+    """
+    if not has_request_context():
+        yield
+        return
+
+    paused = g.get("query_log_paused", False)
+    g.query_log_paused = True
+    try:
+        yield
+    finally:
+        g.query_log_paused = paused
+
+
+def statement_shape(statement):
+    """
+    Normalize a statement so loads that differ only in their parameters,
+    or in the length of an IN list, compare equal.
+    """
+    shape = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def repeated_shapes(statements):
+    counts = Counter(
+        shape
+        for shape in map(statement_shape, statements)
+        if not _EXPECTED_REPEATS.match(shape)
+    )
+    return [
+        (shape, count)
+        for shape, count in counts.most_common()
+        if count >= REPEATED_SHAPE_THRESHOLD
+    ]
+
+
+# -------------------------
+# Checking requests
+# -------------------------
+def start_query_log():
+    if budget_mode() != BUDGET_OFF:
+        g.query_log = []
+
+
+def check_query_budget(response):
+    """
+    Compare the statements a request ran with its route's budget.
+
+    Statements run while a streamed response is being sent (SSE, exports)
+    happen after this check and aren't counted.
+    """
+    statements = g.pop("query_log", None)
+    if statements is None:
+        return response
+
+    budget = route_budget()
+    response.headers["X-Query-Count"] = str(len(statements))
+
+    if budget is UNBOUNDED:
+        return response
+
+    for shape, count in repeated_shapes(statements):
+        logger.warning(
+            "Likely N+1 in %s: statement ran %s times: %s",
+            request.endpoint, count, shape[:300]
+        )
+
+    if budget is None:
+        if request.blueprint:
+            logger.warning("No query budget declared for %s.", request.endpoint)
+        return response
+
+    if len(statements) > budget:
+        message = (
+            f"{request.endpoint} ran {len(statements)} SQL statements; "
+            f"its budget is {budget}.\n" + "\n".join(
+                f"  {i}. {statement_shape(s)[:200]}" for i, s in enumerate(statements, 1)
+            )
+        )
+
+        if budget_mode() == BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+
+        logger.warning(message)
+
+    return response
+
+
+def init_query_budget(app):
+    app.before_request(start_query_log)
+    app.after_request(check_query_budget)
@@ -0,0 +1,109 @@
+import time
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+
+# Bind key of the replica engine in SQLALCHEMY_BINDS.
+REPLICA = "replica"
+
+# session.info keys: reads may use the replica / this session has written.
+READ_FROM_REPLICA = "read_from_replica"
+WROTE = "wrote"
+
+# Flask session key: until when this user's reads stay on the primary.
+PRIMARY_UNTIL = "db_primary_until"
+
+
+# -------------------------
+# Session routing
+# -------------------------
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to the replica while the session is allowed to
+    (see use_replica_for_request), and everything else to the primary:
+    flushes, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, raw
+    connections. Once the session has written, all of its reads go to
+    the primary too, so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(READ_FROM_REPLICA):
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info[WROTE] = True
+            elif not self.info.get(WROTE) and is_plain_select(clause):
+                return self._db.engines[REPLICA]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def is_plain_select(clause):
+    return (
+        clause is not None
+        and getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
+
+
+# -------------------------
+# Per-route declarations
+# -------------------------
+def use_primary(view_func):
+    """
+    Keep a GET route's reads on the primary, for views that must not lag
+    behind the latest write (e.g. live chat, upload progress polling).
+    """
+    view_func.use_primary = True
+    return view_func
+
+
+def view_wants_primary():
+    view_func = current_app.view_functions.get(request.endpoint)
+    return getattr(view_func, "use_primary", False)
+
+
+# -------------------------
+# Request hooks
+# -------------------------
+def use_replica_for_request():
+    """
+    GET and HEAD requests read from the replica, unless the view opts out
+    or this user wrote something in the last REPLICA_STICKY_SECONDS (so
+    the page after a form post shows the change).
+    """
+    if request.method not in ("GET", "HEAD") or view_wants_primary():
+        return
+
+    if session.get(PRIMARY_UNTIL, 0) > time.time():
+        return
+
+    db_session().info[READ_FROM_REPLICA] = True
+
+
+def remember_write(response):
+    """
+    Any POST, or a GET that wrote, pins this user's reads to the primary
+    for a few seconds.
+    """
+    if request.method not in ("GET", "HEAD") or db_session().info.get(WROTE):
+        session[PRIMARY_UNTIL] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+
+    return response
+
+
+def db_session():
+    # models imports this module for RoutingSession, so reach the
+    # extension through the app rather than importing `db`.
+    return current_app.extensions["sqlalchemy"].session
+
+
+def init_replicas(app):
+    """
+    Route reads to the replica if DATABASE_REPLICA_URL configured one.
+    """
+    if REPLICA not in app.config.get("SQLALCHEMY_BINDS", {}):
+        return
+
+    app.before_request(use_replica_for_request)
+    app.after_request(remember_write)
@@ -0,0 +1,240 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, current_app, make_response, request, session
+
+from services.versions import RESPONSES_VERSION, bump_version, get_version
+
+
+# -------------------------
+# Backends
+# -------------------------
+# A backend stores bytes by string key, evicting the least recently used
+# entry once it holds `max_entries`. get() returns None on a miss. Values
+# are the response's mimetype, a newline, then the body.
+
+class MemoryCache:
+    """
+    Per-process LRU cache. Fastest, but each gunicorn worker warms its own.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """
+    LRU cache in a local SQLite file, shared by every worker on the host.
+    Each call opens its own short-lived connection, so it is thread-safe.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "value BLOB NOT NULL, "
+                "used_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_responses_used_at ON responses (used_at)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """
+        A connection for one operation, committed and closed when the block
+        ends. sqlite3's own context manager only commits.
+        """
+        with closing(sqlite3.connect(self.path, timeout=5)) as conn, conn:
+            yield conn
+
+    def get(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is not None:
+                    conn.execute(
+                        "UPDATE responses SET used_at = ? WHERE key = ?",
+                        (time.time(), key)
+                    )
+        except sqlite3.OperationalError:
+            # A busy cache is a miss, never an error page.
+            return None
+
+        return row[0] if row else None
+
+    def set(self, key, value):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, used_at) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.OperationalError:
+            pass
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+class NullCache:
+    """
+    Caching switched off.
+    """
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+def init_response_cache(app):
+    """
+    Create the backend named by RESPONSE_CACHE ("memory", "sqlite" or "none").
+    """
+    backend = app.config["RESPONSE_CACHE"]
+    max_entries = app.config["RESPONSE_CACHE_SIZE"]
+
+    if backend == "sqlite":
+        cache = SQLiteCache(app.config["RESPONSE_CACHE_PATH"], max_entries)
+    elif backend == "memory":
+        cache = MemoryCache(max_entries)
+    elif backend == "none":
+        cache = NullCache()
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE backend '{backend}'.")
+
+    app.extensions["response_cache"] = cache
+    return cache
+
+
+def get_response_cache():
+    return current_app.extensions["response_cache"]
+
+
+# -------------------------
+# Invalidation
+# -------------------------
+def invalidate_responses():
+    """
+    Bump the response generation as part of the current transaction.
+    Call this before committing any write. Old entries are never read
+    again and age out of the LRU.
+    """
+    bump_version(RESPONSES_VERSION)
+
+
+# -------------------------
+# Caching views
+# -------------------------
+def response_cache_key(key_args):
+    """
+    Key for the current request: generation, role, endpoint and the
+    normalized (stripped, non-empty, sorted) values of `key_args`.
+    Other query args are ignored, so junk args can't fill the cache.
+    """
+    args = []
+    for name in key_args:
+        value = request.args.get(name, "").strip()
+        if value:
+            args.append((name, value))
+
+    return "|".join((
+        str(get_version(RESPONSES_VERSION)),
+        session.get("role") or "",
+        request.endpoint,
+        urlencode(sorted(args))
+    ))
+
+
+def cached_response(key_args):
+    """
+    Serve a GET view's 200 responses from the response cache, keyed on
+    the query args that affect the page.
+
+    Pages are only stored and reused when no flash messages are waiting,
+    because those are rendered into the page for one user only.
+
+    Example:
+        @cached_response(("q", "status", "after"))
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped_view(*args, **kwargs):
+            if request.method != "GET" or session.get("_flashes"):
+                return view_func(*args, **kwargs)
+
+            cache = get_response_cache()
+            key = response_cache_key(key_args)
+
+            cached = cache.get(key)
+            if cached is not None:
+                mimetype, body = cached.split(b"\n", 1)
+                response = Response(body, mimetype=mimetype.decode())
+                response.headers["X-Cache"] = "HIT"
+                return response
+
+            response = make_response(view_func(*args, **kwargs))
+
+            cacheable = (
+                response.status_code == 200
+                and not response.is_streamed
+                and not session.get("_flashes")
+            )
+
+            if cacheable:
+                cache.set(key, response.mimetype.encode() + b"\n" + response.get_data())
+
+            response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapped_view
+    return decorator
@@ -0,0 +1,302 @@
+import difflib
+import re
+
+from models import db, Dog
+
+
+# How close a word has to be to count as a typo of an indexed term.
+TYPO_CUTOFF = 0.75
+MIN_TYPO_LENGTH = 4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Cache of "is the search index installed?" per database URL.
+_index_ready = {}
+
+
+def tokenize(q):
+    """
+    Split a search string into lowercase word tokens.
+    Punctuation is dropped so user input can't inject query syntax.
+    """
+    return [token.lower() for token in _TOKEN_RE.findall(q or "")]
+
+
+# -------------------------
+# Index management
+# -------------------------
+SQLITE_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS dogs_fts USING fts5(
+        name, breed, gender, friendliness,
+        content='dogs',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS dogs_fts_vocab
+    USING fts5vocab(dogs_fts, 'row')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dogs_fts_ai AFTER INSERT ON dogs BEGIN
+        INSERT INTO dogs_fts(rowid, name, breed, gender, friendliness)
+        VALUES (new.id, new.name, new.breed, new.gender, new.friendliness);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dogs_fts_ad AFTER DELETE ON dogs BEGIN
+        INSERT INTO dogs_fts(dogs_fts, rowid, name, breed, gender, friendliness)
+        VALUES ('delete', old.id, old.name, old.breed, old.gender, old.friendliness);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dogs_fts_au AFTER UPDATE ON dogs BEGIN
+        INSERT INTO dogs_fts(dogs_fts, rowid, name, breed, gender, friendliness)
+        VALUES ('delete', old.id, old.name, old.breed, old.gender, old.friendliness);
+        INSERT INTO dogs_fts(rowid, name, breed, gender, friendliness)
+        VALUES (new.id, new.name, new.breed, new.gender, new.friendliness);
+    END
+    """,
+]
+
+SQLITE_DROP_DDL = [
+    "DROP TRIGGER IF EXISTS dogs_fts_ai",
+    "DROP TRIGGER IF EXISTS dogs_fts_ad",
+    "DROP TRIGGER IF EXISTS dogs_fts_au",
+    "DROP TABLE IF EXISTS dogs_fts_vocab",
+    "DROP TABLE IF EXISTS dogs_fts",
+]
+
+# Postgres keeps expression indexes in sync on its own, so no triggers.
+POSTGRES_SEARCH_VECTOR = (
+    "to_tsvector('simple', "
+    "coalesce(name, '') || ' ' || coalesce(breed, '') || ' ' || "
+    "coalesce(gender, '') || ' ' || coalesce(friendliness, ''))"
+)
+
+POSTGRES_SEARCH_TEXT = (
+    "(coalesce(name, '') || ' ' || coalesce(breed, '') || ' ' || "
+    "coalesce(friendliness, ''))"
+)
+
+POSTGRES_INDEX_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+]
+
+# The GIN indexes themselves are built outside the transaction, with
+# CREATE INDEX CONCURRENTLY, so building them doesn't block writes to
+# dogs. Same (name, table, columns, options) form as a migration's
+# `indexes`.
+POSTGRES_SEARCH_INDEXES = (
+    ("ix_dogs_search_tsv", "dogs", (f"({POSTGRES_SEARCH_VECTOR})",),
+     {"using": "GIN", "dialect": "postgresql"}),
+    ("ix_dogs_search_trgm", "dogs", (f"{POSTGRES_SEARCH_TEXT} gin_trgm_ops",),
+     {"using": "GIN", "dialect": "postgresql"}),
+)
+
+
+def create_search_index(conn):
+    """
+    Create the full-text index (and on SQLite, the sync triggers) if
+    missing, inside the caller's transaction. On Postgres this only
+    installs pg_trgm; see create_search_indexes for the indexes.
+    """
+    if conn.dialect.name == "sqlite":
+        for statement in SQLITE_INDEX_DDL:
+            conn.exec_driver_sql(statement)
+    elif conn.dialect.name == "postgresql":
+        for statement in POSTGRES_INDEX_DDL:
+            conn.exec_driver_sql(statement)
+
+    _index_ready.pop(str(conn.engine.url), None)
+
+
+def populate_search_index(conn):
+    """
+    Re-read every dog into the SQLite FTS table. Postgres expression
+    indexes are built from the table itself and need no populate step.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("INSERT INTO dogs_fts(dogs_fts) VALUES ('rebuild')")
+
+
+def create_search_indexes(engine):
+    """
+    Build the Postgres search indexes concurrently if missing (a no-op
+    on SQLite, whose index is the FTS table).
+    """
+    # Imported here: services.migrations imports this module.
+    from services.migrations import create_index
+
+    for name, table_name, columns, options in POSTGRES_SEARCH_INDEXES:
+        create_index(engine, name, table_name, columns, **options)
+
+
+def ensure_search_index(engine=None):
+    """
+    Create the full-text index if missing. Safe to run on every deploy.
+    """
+    engine = engine or db.engine
+
+    with engine.begin() as conn:
+        create_search_index(conn)
+
+    create_search_indexes(engine)
+
+
+def rebuild_search_index(engine=None):
+    """
+    Drop and rebuild the full-text index from the current dogs table.
+    """
+    engine = engine or db.engine
+
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            for statement in SQLITE_DROP_DDL:
+                conn.exec_driver_sql(statement)
+    elif engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name, *_ in POSTGRES_SEARCH_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    with engine.begin() as conn:
+        create_search_index(conn)
+        populate_search_index(conn)
+
+    create_search_indexes(engine)
+
+
+def search_index_ready(engine=None):
+    """
+    Return True if the full-text index exists for this database.
+    The answer is cached per process so requests don't re-check it.
+    """
+    engine = engine or db.engine
+    key = str(engine.url)
+
+    if key not in _index_ready:
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                found = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dogs_fts'"
+                ).first()
+            elif engine.dialect.name == "postgresql":
+                found = conn.exec_driver_sql(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+                ).first()
+            else:
+                found = None
+
+        _index_ready[key] = found is not None
+
+    return _index_ready[key]
+
+
+# -------------------------
+# Querying
+# -------------------------
+def _typo_candidates(conn, token):
+    """
+    Return indexed terms that look like a misspelling of `token`.
+    Only terms sharing the first letter are considered, which keeps
+    the vocabulary scan to a narrow range.
+    """
+    if len(token) < MIN_TYPO_LENGTH:
+        return []
+
+    first = token[0]
+    rows = conn.exec_driver_sql(
+        "SELECT term FROM dogs_fts_vocab WHERE term >= ? AND term < ?",
+        (first, chr(ord(first) + 1))
+    ).fetchall()
+
+    terms = [row[0] for row in rows]
+    return difflib.get_close_matches(token, terms, n=3, cutoff=TYPO_CUTOFF)
+
+
+def _sqlite_match_expression(tokens):
+    """
+    Build an FTS5 MATCH expression: every token must match, either as
+    a prefix or as a close spelling of an indexed term.
+    """
+    conn = db.session.connection()
+    clauses = []
+
+    for token in tokens:
+        options = [f'"{token}"*']
+        options.extend(f'"{term}"' for term in _typo_candidates(conn, token))
+        clauses.append("(" + " OR ".join(options) + ")")
+
+    return " AND ".join(clauses)
+
+
+def _sqlite_ranked(tokens):
+    match = _sqlite_match_expression(tokens)
+
+    return db.select(
+        db.literal_column("rowid").label("dog_id"),
+        (-db.func.bm25(db.literal_column("dogs_fts"))).label("rank")
+    ).select_from(
+        db.table("dogs_fts")
+    ).where(
+        db.text("dogs_fts MATCH :match").bindparams(match=match)
+    ).subquery("search")
+
+
+def _postgres_ranked(tokens):
+    tsquery = db.func.to_tsquery(
+        "simple",
+        " & ".join(f"{token}:*" for token in tokens)
+    )
+    vector = db.literal_column(POSTGRES_SEARCH_VECTOR)
+    text = db.literal_column(POSTGRES_SEARCH_TEXT)
+    phrase = " ".join(tokens)
+
+    # `text %> phrase` is the index-backed form of
+    # word_similarity(phrase, text) > pg_trgm.word_similarity_threshold,
+    # which is what lets "labrdor" still find Labradors.
+    return db.select(
+        Dog.id.label("dog_id"),
+        (
+            db.func.ts_rank(vector, tsquery)
+            + db.func.word_similarity(phrase, text)
+        ).label("rank")
+    ).where(
+        db.or_(
+            vector.op("@@")(tsquery),
+            text.op("%>")(phrase)
+        )
+    ).subquery("search")
+
+
+def ranked_search(query, q):
+    """
+    Restrict a Dog query to rows matching `q` and attach a relevance
+    score as Dog.search_rank (higher is better).
+
+    Returns (query, rank_column), or (None, None) when the search index
+    isn't available and callers should fall back to ILIKE filtering.
+    """
+    tokens = tokenize(q)
+
+    if not tokens or not search_index_ready():
+        return None, None
+
+    dialect = db.engine.dialect.name
+
+    if dialect == "sqlite":
+        ranked = _sqlite_ranked(tokens)
+    elif dialect == "postgresql":
+        ranked = _postgres_ranked(tokens)
+    else:
+        return None, None
+
+    query = query.join(
+        ranked, ranked.c.dog_id == Dog.id
+    ).options(
+        db.with_expression(Dog.search_rank, ranked.c.rank)
+    )
+
+    return query, ranked.c.rank
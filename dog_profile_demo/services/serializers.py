@@ -0,0 +1,99 @@
+from flask import url_for
+
+from services.images import parse_variants
+
+
+# Fields each resource exposes, in output order. ?fields= picks a subset.
+DOG_FIELDS = (
+    "id", "name", "breed", "age", "gender", "size", "friendliness",
+    "status", "immediate_foster", "image_url", "image_variants", "created_at"
+)
+PHOTO_FIELDS = ("id", "dog_id", "image_url", "image_variants", "caption", "uploaded_at")
+DOCUMENT_FIELDS = (
+    "id", "dog_id", "filename", "document_type", "notes",
+    "uploaded_by_name", "uploaded_at", "download_url"
+)
+# Messages use services.messages.message_to_dict.
+MESSAGE_FIELDS = ("id", "dog_id", "sender_name", "sender_role", "message", "created_at")
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def absolute_image_url(image_url):
+    """
+    The URL an API client can fetch an image from. Cloudinary URLs are
+    already absolute; anything else (a local upload, or the placeholder
+    shown while one is queued) is a file under /static.
+    """
+    if not image_url or image_url.startswith(("http://", "https://")):
+        return image_url
+    return url_for("static", filename=image_url, _external=True)
+
+
+def dog_to_dict(dog):
+    return {
+        "id": dog.id,
+        "name": dog.name,
+        "breed": dog.breed,
+        "age": dog.age,
+        "gender": dog.gender,
+        "size": dog.size,
+        "friendliness": dog.friendliness,
+        "status": dog.status,
+        "immediate_foster": bool(dog.immediate_foster),
+        "image_url": absolute_image_url(dog.image_url),
+        "image_variants": parse_variants(dog.image_variants) or None,
+        "created_at": isoformat(dog.created_at)
+    }
+
+
+def photo_to_dict(photo):
+    return {
+        "id": photo.id,
+        "dog_id": photo.dog_id,
+        "image_url": absolute_image_url(photo.image_url),
+        "image_variants": parse_variants(photo.image_variants) or None,
+        "caption": photo.caption,
+        "uploaded_at": isoformat(photo.uploaded_at)
+    }
+
+
+def document_to_dict(document):
+    return {
+        "id": document.id,
+        "dog_id": document.dog_id,
+        "filename": document.filename,
+        "document_type": document.document_type,
+        "notes": document.notes,
+        "uploaded_by_name": document.uploaded_by_name,
+        "uploaded_at": isoformat(document.uploaded_at),
+        "download_url": url_for(
+            "documents.download_document", document_id=document.id, _external=True
+        )
+    }
+
+
+# -------------------------
+# Field selection
+# -------------------------
+def parse_fields(value, allowed):
+    """
+    Turn "?fields=id,name" into a tuple of known field names.
+    Unknown names raise ValueError; an empty value means all fields.
+    """
+    if not value:
+        return allowed
+
+    fields = tuple(name.strip() for name in value.split(",") if name.strip())
+    unknown = [name for name in fields if name not in allowed]
+
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}.")
+
+    return fields
+
+
+def select_fields(data, fields):
+    return {name: data[name] for name in fields}
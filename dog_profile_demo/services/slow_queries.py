@@ -0,0 +1,193 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+# Plans are captured on one background thread. If it falls this far
+# behind, slow statements are logged without a plan rather than queued.
+MAX_PENDING_EXPLAINS = 50
+
+# Only read statements are explained; EXPLAIN never runs them, but there
+# is nothing useful to learn from a plan for an INSERT of one row.
+EXPLAINABLE_PREFIXES = ("select", "with")
+
+
+# -------------------------
+# Request ids
+# -------------------------
+def assign_request_id():
+    """
+    Use the proxy's X-Request-ID if there is one, so log lines can be
+    matched with the access log; otherwise make one up.
+    """
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+
+def add_request_id_header(response):
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+
+# -------------------------
+# Records
+# -------------------------
+def redact(value):
+    """
+    Keep values that say something about the plan (numbers, dates, null)
+    and replace anything that could hold personal data with its type.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters, executemany):
+    if executemany:
+        return {"rows": len(parameters)}
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    return None
+
+
+def request_fields():
+    if not has_request_context():
+        return {"route": None, "method": None, "path": None, "request_id": None}
+
+    return {
+        "route": request.endpoint,
+        "method": request.method,
+        "path": request.path,
+        "request_id": g.get("request_id")
+    }
+
+
+# -------------------------
+# Logger
+# -------------------------
+class SlowQueryLog:
+    """
+    Times every statement on one engine and logs those slower than
+    `threshold_ms` as a single JSON line, with the query plan when
+    `explain` is on.
+    """
+
+    def __init__(self, engine, threshold_ms, explain=True):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self.pending = 0
+        self.lock = threading.Lock()
+
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    # The start time goes on the statement's execution context rather
+    # than the connection, so a statement that raises (and never reaches
+    # after_cursor_execute) leaves nothing behind.
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.slow_query_started_at = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "slow_query_started_at", None)
+        if started is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold or statement.lstrip()[:7].lower() == "explain":
+            return
+
+        record = {
+            "event": "slow_query",
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement,
+            "parameters": redact_parameters(parameters, executemany),
+            "dialect": self.engine.dialect.name,
+            **request_fields()
+        }
+
+        wants_plan = (
+            self.explain
+            and not executemany
+            and statement.lstrip()[:6].lower().startswith(EXPLAINABLE_PREFIXES)
+        )
+
+        if wants_plan and self.reserve_slot():
+            self.executor.submit(self.explain_and_log, record, statement, parameters)
+        else:
+            record["plan"] = None
+            self.write(record)
+
+    def reserve_slot(self):
+        with self.lock:
+            if self.pending >= MAX_PENDING_EXPLAINS:
+                return False
+            self.pending += 1
+            return True
+
+    def explain_and_log(self, record, statement, parameters):
+        """
+        Runs on the background thread, on its own pooled connection.
+        """
+        try:
+            record["plan"] = self.capture_plan(statement, parameters)
+        except Exception as e:
+            record["plan"] = None
+            record["plan_error"] = str(e)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+        self.write(record)
+
+    def capture_plan(self, statement, parameters):
+        if self.engine.dialect.name == "sqlite":
+            prefix = "EXPLAIN QUERY PLAN "
+        else:
+            prefix = "EXPLAIN "
+
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+
+        # SQLite rows are (id, parent, notused, detail); Postgres rows are
+        # one line of the text plan each.
+        return [str(row[-1]) for row in rows]
+
+    def write(self, record):
+        logger.warning(json.dumps(record, default=str))
+
+
+def init_slow_query_log(app, engines):
+    """
+    Turn on the slow-query log for `engines` (primary and replica) if
+    SLOW_QUERY_MS is set.
+    """
+    threshold_ms = app.config.get("SLOW_QUERY_MS")
+    if not threshold_ms:
+        return None
+
+    app.before_request(assign_request_id)
+    app.after_request(add_request_id_header)
+
+    explain = app.config.get("SLOW_QUERY_EXPLAIN", True)
+    slow_logs = [SlowQueryLog(engine, threshold_ms, explain=explain) for engine in engines]
+    app.extensions["slow_query_log"] = slow_logs
+    return slow_logs
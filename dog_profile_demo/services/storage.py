@@ -1,8 +1,11 @@
+import hashlib
 import os
 import uuid
 import cloudinary.uploader
 from werkzeug.utils import secure_filename
 
+from services.metrics import observe_cloudinary
+
 
 ALLOWED_EXTENSIONS = {
     "pdf", "doc", "docx", "png", "jpg", "jpeg", "txt", "gif", "webp"
@@ -38,24 +41,72 @@ def generate_unique_filename(filename):
     return unique_name, safe_name
 
 
+# Block size for streaming uploads to disk.
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def content_addressed_name(sha256, ext):
+    """
+    Storage name for content with the given hash, fanned out into
+    256 subfolders so no single folder gets huge.
+    """
+    return f"{sha256[:2]}/{sha256}.{ext}"
+
+
+def save_stream_hashed(stream, folder):
+    """
+    Copy a stream to a temporary file in `folder`, hashing it on the way.
+    Returns (temp_path, sha256, size). The caller moves or removes the file.
+    """
+    ensure_folder_exists(folder)
+    temp_path = os.path.join(folder, f".incoming-{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(temp_path, "wb") as out:
+            for block in iter(lambda: stream.read(STREAM_BLOCK_SIZE), b""):
+                out.write(block)
+                digest.update(block)
+                size += len(block)
+    except Exception:
+        delete_local_file(temp_path)
+        raise
+
+    return temp_path, digest.hexdigest(), size
+
+
 def save_uploaded_file(file, upload_folder):
+    """
+    Save an upload under its SHA-256 content hash. Identical bytes are
+    only written to disk once.
+    """
     if not file or file.filename == "":
         raise ValueError("No file selected.")
 
     if not allowed_file(file.filename):
         raise ValueError("File type is not allowed.")
 
-    ensure_folder_exists(upload_folder)
+    original_filename = secure_filename(file.filename)
+    ext = original_filename.rsplit(".", 1)[1].lower()
 
-    stored_filename, original_filename = generate_unique_filename(file.filename)
+    temp_path, sha256, size = save_stream_hashed(file.stream, upload_folder)
+
+    stored_filename = content_addressed_name(sha256, ext)
     file_path = os.path.join(upload_folder, stored_filename)
 
-    file.save(file_path)
+    if os.path.exists(file_path):
+        delete_local_file(temp_path)
+    else:
+        ensure_folder_exists(os.path.dirname(file_path))
+        os.replace(temp_path, file_path)
 
     return {
         "original_filename": original_filename,
         "stored_filename": stored_filename,
-        "file_path": file_path
+        "file_path": file_path,
+        "sha256": sha256,
+        "size": size
     }
 
 
@@ -80,13 +131,32 @@ def upload_image_to_cloudinary(file):
     if not allowed_image(file.filename):
         raise ValueError("Invalid image type. Allowed: png, jpg, jpeg, gif, webp.")
 
-    result = cloudinary.uploader.upload(
-        file,
-        folder=os.getenv("CLOUDINARY_FOLDER", "dogs/images"),
-        resource_type="image",
-        use_filename=True,
-        unique_filename=True,
-        overwrite=False
-    )
+    with observe_cloudinary("upload"):
+        result = cloudinary.uploader.upload(
+            file,
+            folder=os.getenv("CLOUDINARY_FOLDER", "dogs/images"),
+            resource_type="image",
+            use_filename=True,
+            unique_filename=True,
+            overwrite=False
+        )
+
+    return result.get("secure_url")
+
+
+def upload_image_path_to_cloudinary(file_path):
+    """
+    Upload a dog photo from local disk to Cloudinary and return the image URL.
+    Used by the background worker for spooled uploads.
+    """
+    with observe_cloudinary("upload"):
+        result = cloudinary.uploader.upload(
+            file_path,
+            folder=os.getenv("CLOUDINARY_FOLDER", "dogs/images"),
+            resource_type="image",
+            use_filename=True,
+            unique_filename=True,
+            overwrite=False
+        )
 
     return result.get("secure_url")
@@ -0,0 +1,112 @@
+import os
+
+from flask import current_app
+
+from models import db, Dog, DogPhoto
+from services.images import process_and_upload
+from services.jobs import enqueue, job_handler
+from services.response_cache import invalidate_responses
+from services.storage import (
+    allowed_image,
+    delete_local_file,
+    ensure_folder_exists,
+    generate_unique_filename,
+    upload_image_path_to_cloudinary,
+)
+
+
+# Static image shown while a photo is waiting for the worker to upload it.
+PENDING_IMAGE = "placeholder-dog.svg"
+
+
+# -------------------------
+# Request side
+# -------------------------
+def spool_image(file):
+    """
+    Save an uploaded image to local spool storage and return its path.
+    This is a local disk write, so the request never waits on Cloudinary.
+    """
+    if not allowed_image(file.filename):
+        raise ValueError("Invalid image type. Allowed: png, jpg, jpeg, gif, webp.")
+
+    folder = current_app.config["SPOOL_FOLDER"]
+    ensure_folder_exists(folder)
+
+    stored_filename, _ = generate_unique_filename(file.filename)
+    file_path = os.path.join(folder, stored_filename)
+    file.save(file_path)
+
+    return file_path
+
+
+def queue_dog_image(dog, file):
+    """
+    Spool a dog's primary photo and queue the Cloudinary upload.
+    The dog shows the placeholder image until the worker is done.
+    Call after the dog has been flushed so it has an id.
+    """
+    spool_path = spool_image(file)
+    dog.image_url = PENDING_IMAGE
+    dog.image_variants = None
+
+    enqueue("upload_dog_image", {"dog_id": dog.id, "spool_path": spool_path})
+
+
+def queue_dog_photo(photo, file):
+    """
+    Spool a gallery photo and queue the Cloudinary upload.
+    Call after the photo has been flushed so it has an id.
+    """
+    spool_path = spool_image(file)
+    photo.image_url = PENDING_IMAGE
+
+    enqueue("upload_dog_photo", {"photo_id": photo.id, "spool_path": spool_path})
+
+
+# -------------------------
+# Worker side
+# -------------------------
+# Each job resizes the spooled original into JPEG/WebP variants (upright,
+# EXIF stripped), uploads them, and records their URLs on the row.
+
+def get_image_uploader():
+    """
+    Return the function that uploads a local image file and returns its URL.
+    Tests and offline runs can swap it out with app.config["IMAGE_UPLOADER"].
+    """
+    return current_app.config.get("IMAGE_UPLOADER") or upload_image_path_to_cloudinary
+
+
+@job_handler("upload_dog_image")
+def upload_dog_image(payload):
+    dog = db.session.get(Dog, payload["dog_id"])
+    spool_path = payload["spool_path"]
+
+    if dog is None:
+        delete_local_file(spool_path)
+        return
+
+    dog.image_url, dog.image_variants = process_and_upload(
+        spool_path,
+        get_image_uploader()
+    )
+    invalidate_responses()
+    delete_local_file(spool_path)
+
+
+@job_handler("upload_dog_photo")
+def upload_dog_photo(payload):
+    photo = db.session.get(DogPhoto, payload["photo_id"])
+    spool_path = payload["spool_path"]
+
+    if photo is None:
+        delete_local_file(spool_path)
+        return
+
+    photo.image_url, photo.image_variants = process_and_upload(
+        spool_path,
+        get_image_uploader()
+    )
+    invalidate_responses()
+    delete_local_file(spool_path)
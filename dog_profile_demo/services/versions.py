@@ -0,0 +1,67 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, CacheVersion
+
+
+# Version stamp bumped by every write to the dogs table.
+DOGS_VERSION = "dogs"
+
+# Generation for cached page responses, bumped by every write.
+RESPONSES_VERSION = "responses"
+
+# Bumped whenever a breed or alias is added to the breed dictionary.
+BREEDS_VERSION = "breeds"
+
+
+def get_version(name):
+    """
+    Return the current version stamp for a cached data set (0 if unset).
+    This is a single primary-key lookup.
+    """
+    version = db.session.query(CacheVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_statement(dialect_name, name):
+    """
+    INSERT ... ON CONFLICT DO UPDATE that starts a stamp at 1 or adds one
+    to it, in one statement, so two first bumps can't both insert.
+    """
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    versions = CacheVersion.__table__
+
+    return dialect.insert(versions).values(name=name, version=1).on_conflict_do_update(
+        index_elements=[versions.c.name],
+        set_={"version": versions.c.version + 1}
+    )
+
+
+def bump_version(name):
+    """
+    Increment a version stamp as part of the current transaction.
+    The caller's commit makes the bump visible to all workers.
+    """
+    db.session.execute(bump_statement(db.engine.dialect.name, name))
+
+
+# -------------------------
+# Outside the session
+# -------------------------
+def read_version(connection, name):
+    """
+    get_version on a given connection, e.g. a separate one that only
+    sees committed data.
+    """
+    versions = CacheVersion.__table__
+    version = connection.execute(
+        db.select(versions.c.version).where(versions.c.name == name)
+    ).scalar()
+    return version or 0
+
+
+def bump_version_on(connection, name):
+    """
+    bump_version on a given connection, for writers that run below the
+    session (flush events, migrations).
+    """
+    connection.execute(bump_statement(connection.dialect.name, name))
@@ -0,0 +1,132 @@
+// Incremental SHA-256, for hashing a file a slice at a time. WebCrypto's
+// digest() only takes the whole buffer, which is too much memory for
+// large uploads.
+//
+//     var hash = new Sha256();
+//     hash.update(new Uint8Array(buffer));   // as many times as needed
+//     hash.hex();                            // "e3b0c442...", once, at the end
+(function () {
+    var K = [
+        0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+        0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+        0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+        0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+        0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+        0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+        0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+        0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+    ];
+
+    function rotr(x, n) {
+        return (x >>> n) | (x << (32 - n));
+    }
+
+    function Sha256() {
+        this.h = [
+            0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+            0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+        ];
+        this.w = new Int32Array(64);
+        this.pending = new Uint8Array(64);
+        this.pendingLength = 0;
+        this.length = 0;
+    }
+
+    Sha256.prototype.block = function (bytes, offset) {
+        var w = this.w;
+        var h = this.h;
+        var i;
+
+        for (i = 0; i < 16; i++) {
+            var j = offset + i * 4;
+            w[i] = (bytes[j] << 24) | (bytes[j + 1] << 16) | (bytes[j + 2] << 8) | bytes[j + 3];
+        }
+
+        for (i = 16; i < 64; i++) {
+            var a = w[i - 15];
+            var b = w[i - 2];
+            var s0 = rotr(a, 7) ^ rotr(a, 18) ^ (a >>> 3);
+            var s1 = rotr(b, 17) ^ rotr(b, 19) ^ (b >>> 10);
+            w[i] = (w[i - 16] + s0 + w[i - 7] + s1) | 0;
+        }
+
+        var A = h[0], B = h[1], C = h[2], D = h[3], E = h[4], F = h[5], G = h[6], H = h[7];
+
+        for (i = 0; i < 64; i++) {
+            var t1 = (H + (rotr(E, 6) ^ rotr(E, 11) ^ rotr(E, 25)) + ((E & F) ^ (~E & G)) + K[i] + w[i]) | 0;
+            var t2 = ((rotr(A, 2) ^ rotr(A, 13) ^ rotr(A, 22)) + ((A & B) ^ (A & C) ^ (B & C))) | 0;
+            H = G;
+            G = F;
+            F = E;
+            E = (D + t1) | 0;
+            D = C;
+            C = B;
+            B = A;
+            A = (t1 + t2) | 0;
+        }
+
+        h[0] = (h[0] + A) | 0;
+        h[1] = (h[1] + B) | 0;
+        h[2] = (h[2] + C) | 0;
+        h[3] = (h[3] + D) | 0;
+        h[4] = (h[4] + E) | 0;
+        h[5] = (h[5] + F) | 0;
+        h[6] = (h[6] + G) | 0;
+        h[7] = (h[7] + H) | 0;
+    };
+
+    Sha256.prototype.update = function (bytes) {
+        var i = 0;
+        this.length += bytes.length;
+
+        // Top up a partial block left over from the last update.
+        if (this.pendingLength) {
+            while (this.pendingLength < 64 && i < bytes.length) {
+                this.pending[this.pendingLength++] = bytes[i++];
+            }
+            if (this.pendingLength < 64) {
+                return this;
+            }
+            this.block(this.pending, 0);
+            this.pendingLength = 0;
+        }
+
+        for (; i + 64 <= bytes.length; i += 64) {
+            this.block(bytes, i);
+        }
+
+        while (i < bytes.length) {
+            this.pending[this.pendingLength++] = bytes[i++];
+        }
+
+        return this;
+    };
+
+    Sha256.prototype.hex = function () {
+        var bits = this.length * 8;
+        var padding = new Uint8Array(((this.pendingLength < 56 ? 56 : 120) - this.pendingLength) + 8);
+        padding[0] = 0x80;
+
+        var high = Math.floor(bits / 0x100000000);
+        var low = bits >>> 0;
+        var end = padding.length;
+        padding[end - 8] = high >>> 24;
+        padding[end - 7] = high >>> 16;
+        padding[end - 6] = high >>> 8;
+        padding[end - 5] = high;
+        padding[end - 4] = low >>> 24;
+        padding[end - 3] = low >>> 16;
+        padding[end - 2] = low >>> 8;
+        padding[end - 1] = low;
+
+        var length = this.length;
+        this.update(padding);
+        this.length = length;
+
+        return this.h.map(function (word) {
+            return (word >>> 0).toString(16).padStart(8, "0");
+        }).join("");
+    };
+
+    window.Sha256 = Sha256;
+})();
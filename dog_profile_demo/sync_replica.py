@@ -0,0 +1,40 @@
+from app import create_app
+from models import db
+from services.replicas import REPLICA
+
+
+def sync_replica():
+    """
+    Copy the primary SQLite database over the replica file, to try out
+    replica routing locally. Run it again to "replicate" new writes;
+    until then the replica lags, as a real one would.
+    """
+    app = create_app()
+
+    with app.app_context():
+        primary = db.engines[None]
+        replica = db.engines.get(REPLICA)
+
+        if replica is None:
+            print("DATABASE_REPLICA_URL is not set.")
+            return
+
+        if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+            print("Only SQLite databases can be copied; use streaming replication for Postgres.")
+            return
+
+        replica.dispose()
+        source = primary.raw_connection()
+        target = replica.raw_connection()
+
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            target.close()
+            source.close()
+
+        print("Replica synced from primary.")
+
+
+if __name__ == "__main__":
+    sync_replica()
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """
+    Point the database and every folder the app writes to at tmp_path.
+    Returns monkeypatch, for tests that need more settings.
+    """
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'dogs.db'}")
+    for name in ("SPOOL_FOLDER", "CHUNK_UPLOAD_FOLDER", "UPLOAD_FOLDER"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    monkeypatch.setenv("RESPONSE_CACHE", "none")
+    monkeypatch.delenv("DATABASE_REPLICA_URL", raising=False)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    return monkeypatch
+
+
+def make_app():
+    from app import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+def migrate():
+    from services.migrations import run_migrations
+
+    run_migrations(log=lambda message: None)
+
+
+@pytest.fixture
+def app(app_env):
+    """
+    The app on a fresh, migrated SQLite database.
+    """
+    app = make_app()
+
+    with app.app_context():
+        migrate()
+        yield app
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Job
+from services import jobs
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """
+    Register a "test" job kind that records its payloads, and fails
+    while `calls["fail"]` is set.
+    """
+    calls = {"payloads": [], "fail": False}
+
+    def handler(payload):
+        calls["payloads"].append(payload)
+        if calls["fail"]:
+            raise RuntimeError("handler failed")
+
+    monkeypatch.setitem(jobs.JOB_HANDLERS, "test", handler)
+    return calls
+
+
+def queued_job(max_attempts=5):
+    job = jobs.enqueue("test", {"dog_id": 1}, max_attempts=max_attempts)
+    db.session.commit()
+    return job.id
+
+
+def test_enqueued_job_is_claimed_and_done(app, handled):
+    job_id = queued_job()
+
+    assert jobs.run_pending_jobs() == 1
+
+    job = db.session.get(Job, job_id)
+    assert handled["payloads"] == [{"dog_id": 1}]
+    assert job.status == "done"
+    assert job.attempts == 1
+    assert job.locked_at is None
+
+
+def test_running_job_is_not_claimed_twice(app, handled):
+    job_id = queued_job()
+
+    claimed = jobs.claim_next_job()
+
+    assert claimed.id == job_id
+    assert claimed.status == "running"
+    assert claimed.locked_at is not None
+    assert jobs.claim_next_job() is None
+
+
+def test_failed_job_is_retried_later(app, handled):
+    handled["fail"] = True
+    job_id = queued_job()
+
+    assert jobs.run_pending_jobs() == 1
+
+    job = db.session.get(Job, job_id)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert job.last_error == "handler failed"
+    assert job.run_after > datetime.utcnow()
+    assert jobs.claim_next_job() is None
+
+
+def test_job_fails_after_max_attempts(app, handled):
+    handled["fail"] = True
+    job_id = queued_job(max_attempts=1)
+
+    jobs.run_pending_jobs()
+
+    assert db.session.get(Job, job_id).status == "failed"
+
+
+def test_stale_running_job_is_released(app, handled):
+    stale_id = queued_job()
+    fresh_id = queued_job()
+    jobs.claim_next_job()
+    jobs.claim_next_job()
+
+    stale = db.session.get(Job, stale_id)
+    stale.locked_at = datetime.utcnow() - timedelta(seconds=jobs.LOCK_TIMEOUT_SECONDS + 1)
+    db.session.commit()
+
+    assert jobs.release_stale_jobs() == 1
+
+    db.session.expire_all()
+    assert db.session.get(Job, stale_id).status == "queued"
+    assert db.session.get(Job, fresh_id).status == "running"
+
+    assert jobs.run_pending_jobs() == 1
+    assert db.session.get(Job, stale_id).status == "done"
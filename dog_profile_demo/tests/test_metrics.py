@@ -0,0 +1,97 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from conftest import PROJECT_DIR
+
+pytest.importorskip("gunicorn")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode()
+
+
+def wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            pytest.fail("gunicorn exited before it was ready.")
+        try:
+            return get(url)
+        except OSError:
+            time.sleep(0.2)
+
+    pytest.fail("gunicorn did not start in time.")
+
+
+def request_count(metrics_text, endpoint):
+    total = 0.0
+    for line in metrics_text.splitlines():
+        if line.startswith("http_requests_total{") and f'endpoint="{endpoint}"' in line:
+            total += float(line.rsplit(" ", 1)[1])
+    return total
+
+
+def test_gunicorn_workers_report_shared_counters(tmp_path):
+    """
+    Run the app the way the Procfile does, with gunicorn.conf.py and two
+    workers, and check /metrics counts requests served by both.
+
+    PROMETHEUS_MULTIPROC_DIR is left to gunicorn.conf.py's default. The
+    config is copied to tmp_path so that default (next to the config)
+    isn't the checkout's instance folder.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    config = tmp_path / "gunicorn.conf.py"
+    shutil.copy(os.path.join(PROJECT_DIR, "gunicorn.conf.py"), config)
+    metrics_dir = tmp_path / "instance" / "metrics"
+
+    env = dict(os.environ)
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.update(
+        DATABASE_URL=f"sqlite:///{tmp_path / 'dogs.db'}",
+        RESPONSE_CACHE="none",
+    )
+
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "app:app",
+            "--config", str(config),
+            "--workers", "2",
+            "--threads", "2",
+            "--worker-class", "gthread",
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning"
+        ],
+        cwd=PROJECT_DIR,
+        env=env
+    )
+
+    try:
+        wait_until_ready(base_url + "/health", process)
+        for _ in range(19):
+            get(base_url + "/health")
+
+        metrics = get(base_url + "/metrics")
+        worker_files = [name for name in os.listdir(metrics_dir) if name.startswith("counter_")]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    assert request_count(metrics, "health") >= 20
+    assert worker_files
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import make_app, migrate
+from models import db, Dog
+from services.replicas import use_primary
+from sync_replica import sync_replica
+
+
+def count_dogs():
+    return str(Dog.query.count())
+
+
+@use_primary
+def count_dogs_on_primary():
+    return count_dogs()
+
+
+def add_dog():
+    db.session.add(Dog(name="Written"))
+    db.session.flush()
+    count = count_dogs()
+    db.session.commit()
+    return count
+
+
+@pytest.fixture
+def app(app_env, tmp_path, capsys):
+    """
+    The app with a SQLite replica. The replica is copied from the
+    primary before one dog is added, so a read's answer shows where it
+    went: "0" from the replica, "1" or more from the primary.
+    """
+    app_env.setenv("DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    app = make_app()
+
+    app.add_url_rule("/test/dogs", "dogs", count_dogs)
+    app.add_url_rule("/test/dogs/primary", "dogs_primary", count_dogs_on_primary)
+    app.add_url_rule("/test/dogs/write", "write", add_dog, methods=["GET", "POST"])
+
+    with app.app_context():
+        migrate()
+        sync_replica()
+        db.session.add(Dog(name="Primary only"))
+        db.session.commit()
+
+    capsys.readouterr()
+    return app
+
+
+def test_get_reads_from_replica(app):
+    assert app.test_client().get("/test/dogs").text == "0"
+
+
+def test_use_primary_view_reads_from_primary(app):
+    assert app.test_client().get("/test/dogs/primary").text == "1"
+
+
+def test_post_pins_reads_to_primary(app):
+    client = app.test_client()
+
+    client.post("/test/dogs/write")
+
+    assert client.get("/test/dogs").text == "2"
+    assert app.test_client().get("/test/dogs").text == "0"
+
+
+def test_get_that_writes_reads_its_own_write(app):
+    client = app.test_client()
+
+    assert client.get("/test/dogs/write").text == "2"
+    assert client.get("/test/dogs").text == "2"
+
+
+def test_primary_pin_expires(app):
+    app.config["REPLICA_STICKY_SECONDS"] = 0
+    client = app.test_client()
+
+    client.post("/test/dogs/write")
+
+    assert client.get("/test/dogs").text == "0"
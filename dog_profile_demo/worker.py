@@ -0,0 +1,33 @@
+import logging
+import os
+
+from prometheus_client import start_http_server
+
+from app import create_app
+from services.chunked_uploads import expire_upload_sessions
+from services.jobs import work
+
+# Importing the handlers registers them with the job queue.
+import services.uploads  # noqa: F401
+
+
+def run_worker():
+    logging.basicConfig(level=logging.INFO)
+    app = create_app()
+
+    # The worker makes the Cloudinary calls, so it serves its own metrics
+    # (the web dyno's /metrics can't see another process's samples).
+    metrics_port = os.getenv("WORKER_METRICS_PORT")
+    if metrics_port:
+        start_http_server(int(metrics_port))
+
+    with app.app_context():
+        print("Worker started.")
+        work(
+            poll_interval=float(os.getenv("WORKER_POLL_INTERVAL", 2)),
+            housekeeping=(expire_upload_sessions,)
+        )
+
+
+if __name__ == "__main__":
+    run_worker()